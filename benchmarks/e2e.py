@@ -0,0 +1,232 @@
+"""End-to-end benchmark: run the downloader against the local fake gallery and report throughput.
+
+Each run starts ``download.py`` in a fresh download folder with ``FAVORITES_URL`` pointed at the fake
+gallery and ``TRACE_DIR`` set, then reports cards/minute, bytes/second and per-phase times from the trace.
+Pass ``--env KEY=VALUE`` to benchmark a mode (``ENGINE=async``, ``WORKERS=4``, ``UPSCALE_MODE=pipelined``...),
+``--output`` to keep the results and ``--baseline`` to compare against an earlier result file.
+
+    python -m benchmarks.e2e --cards 40 --env WORKERS=2 --output results/workers2.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from .fake_gallery import FakeGalleryServer, add_settings_arguments, settings_from_arguments
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEDIA_PREFIXES = ("grok-video-", "grok-image-")
+
+
+def _parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, separator, value = pair.partition("=")
+        if not separator or not key:
+            raise SystemExit(f"--env expects KEY=VALUE, got {pair!r}")
+        env[key.strip()] = value
+    return env
+
+
+def _run_environment(workdir: str, favorites_url: str, overrides: Dict[str, str]) -> Dict[str, str]:
+    download_dir = os.path.join(workdir, "downloads")
+    cookie_file = os.path.join(workdir, "cookies.txt")
+    with open(cookie_file, "w", encoding="utf-8") as handle:
+        handle.write("benchmark=1")
+    env = dict(os.environ)
+    env.update(
+        {
+            "FAVORITES_URL": favorites_url,
+            "COOKIE_FILE": cookie_file,
+            "DOWNLOAD_DIR": download_dir,
+            "MEDIA_MANIFEST_FILE": os.path.join(download_dir, "manifest.sqlite3"),
+            "DEFERRED_UPSCALES_FILE": os.path.join(download_dir, "deferred_upscales.json"),
+            "VERIFY_REPORT_FILE": os.path.join(download_dir, "corrupt_media.json"),
+            "TRACE_DIR": os.path.join(workdir, "trace"),
+            "HEADLESS": "true",
+            "ENABLE_ASSET_ROUTING": "false",
+            "NO_COLOR": "1",
+            "PYTHONUNBUFFERED": "1",
+        }
+    )
+    env.update(overrides)
+    return env
+
+
+def _saved_media(download_dir: str) -> Dict[str, int]:
+    saved = {}
+    for path in glob.glob(os.path.join(download_dir, "grok-*")):
+        name = os.path.basename(path)
+        if name.startswith(MEDIA_PREFIXES) and name.endswith((".mp4", ".png")):
+            saved[name] = os.path.getsize(path)
+    return saved
+
+
+def _card_identifier(filename: str) -> str:
+    for prefix in MEDIA_PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+    return os.path.splitext(filename)[0]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def phase_times(trace_dir: str) -> Dict[str, dict]:
+    """Per span name: count, total, mean, p50 and p95 in milliseconds from the run's JSONL trace."""
+    durations: Dict[str, List[float]] = {}
+    for path in glob.glob(os.path.join(trace_dir, "trace-*.jsonl")):
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                durations.setdefault(span["name"], []).append(span["duration_us"] / 1000)
+    return {
+        name: {
+            "count": len(values),
+            "total_ms": round(sum(values), 1),
+            "mean_ms": round(statistics.fmean(values), 1),
+            "p50_ms": round(_percentile(values, 0.5), 1),
+            "p95_ms": round(_percentile(values, 0.95), 1),
+        }
+        for name, values in sorted(durations.items())
+    }
+
+
+def run_once(server: FakeGalleryServer, overrides: Dict[str, str], timeout: float, verbose: bool, keep: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix="grok-e2e-")
+    env = _run_environment(workdir, server.favorites_url, overrides)
+    log_path = os.path.join(workdir, "run.log")
+    started = time.perf_counter()
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            completed = subprocess.run(
+                [sys.executable, os.path.join(REPO_ROOT, "download.py")],
+                cwd=REPO_ROOT,
+                env=env,
+                stdout=None if verbose else log,
+                stderr=subprocess.STDOUT,
+                timeout=timeout,
+            )
+        exit_code = completed.returncode
+    except subprocess.TimeoutExpired:
+        exit_code = None
+    elapsed = time.perf_counter() - started
+
+    saved = _saved_media(env["DOWNLOAD_DIR"])
+    cards = {_card_identifier(name) for name in saved}
+    total_bytes = sum(saved.values())
+    result = {
+        "exit_code": exit_code,
+        "seconds": round(elapsed, 2),
+        "cards": len(cards),
+        "files": len(saved),
+        "bytes": total_bytes,
+        "cards_per_minute": round(len(cards) / elapsed * 60, 2) if elapsed else 0.0,
+        "bytes_per_second": round(total_bytes / elapsed) if elapsed else 0,
+        "phases": phase_times(env["TRACE_DIR"]),
+    }
+    if keep:
+        result["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def summarize(runs: List[dict]) -> dict:
+    """Median of each headline number across runs, and the median mean time of each phase."""
+    summary = {key: statistics.median(run[key] for run in runs) for key in ("seconds", "cards", "bytes", "cards_per_minute", "bytes_per_second")}
+    phases: Dict[str, List[float]] = {}
+    for run in runs:
+        for name, stats in run["phases"].items():
+            phases.setdefault(name, []).append(stats["mean_ms"])
+    summary["phase_mean_ms"] = {name: round(statistics.median(values), 1) for name, values in sorted(phases.items())}
+    return summary
+
+
+def _delta(current: float, previous: float) -> str:
+    if not previous:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+
+def print_report(summary: dict, expected_cards: int, baseline: Optional[dict] = None) -> None:
+    previous = (baseline or {}).get("summary", {})
+    print(f"\nCards completed : {summary['cards']:.0f} / {expected_cards}")
+    print(f"Wall time       : {summary['seconds']:.1f}s{_delta(summary['seconds'], previous.get('seconds', 0))}")
+    print(f"Cards / minute  : {summary['cards_per_minute']:.1f}{_delta(summary['cards_per_minute'], previous.get('cards_per_minute', 0))}")
+    print(f"Bytes / second  : {summary['bytes_per_second'] / 1024 / 1024:.2f} MiB/s{_delta(summary['bytes_per_second'], previous.get('bytes_per_second', 0))}")
+    if summary["phase_mean_ms"]:
+        print("\nPhase                          mean ms")
+        previous_phases = previous.get("phase_mean_ms", {})
+        for name, mean in summary["phase_mean_ms"].items():
+            print(f"  {name:<28} {mean:>9.1f}{_delta(mean, previous_phases.get(name, 0))}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark download.py end to end against a local fake gallery.")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="configuration override for the downloader (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs; the report shows the median")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds before a run is stopped")
+    parser.add_argument("--output", help="write the settings, every run and the summary to this JSON file")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--max-regression", type=float, default=None, metavar="PERCENT", help="exit with status 1 when cards/minute drops more than this versus --baseline")
+    parser.add_argument("--keep", action="store_true", help="keep each run's download folder, trace and log")
+    parser.add_argument("--verbose", action="store_true", help="show the downloader output instead of logging it")
+    add_settings_arguments(parser)
+    arguments = parser.parse_args(argv)
+
+    settings = settings_from_arguments(arguments)
+    overrides = _parse_env(arguments.env)
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    runs = []
+    for attempt in range(max(1, arguments.repeat)):
+        # A fresh server per run so upscale state does not carry over.
+        with FakeGalleryServer(settings) as server:
+            print(f"Run {attempt + 1}/{max(1, arguments.repeat)} against {server.favorites_url} ...")
+            run = run_once(server, overrides, arguments.timeout, arguments.verbose, arguments.keep)
+            run["bytes_served"] = dict(server.gallery.bytes_served)
+            expected_cards = sum(1 for post in server.gallery.posts if post.has_video or overrides.get("DOWNLOAD_IMAGES", "").lower() == "true")
+        runs.append(run)
+        status = "timed out" if run["exit_code"] is None else f"exit {run['exit_code']}"
+        print(f"  {run['cards']} cards, {run['bytes'] / 1024 / 1024:.1f} MiB in {run['seconds']:.1f}s ({status})")
+
+    summary = summarize(runs)
+    print_report(summary, expected_cards, baseline)
+
+    if arguments.output:
+        os.makedirs(os.path.dirname(os.path.abspath(arguments.output)), exist_ok=True)
+        with open(arguments.output, "w", encoding="utf-8") as handle:
+            json.dump({"settings": asdict(settings), "env": overrides, "runs": runs, "summary": summary}, handle, indent=2)
+
+    if baseline is not None and arguments.max_regression is not None:
+        previous = baseline.get("summary", {}).get("cards_per_minute", 0)
+        if previous and summary["cards_per_minute"] < previous * (1 - arguments.max_regression / 100):
+            print(f"\nRegression: cards/minute dropped more than {arguments.max_regression}% against {arguments.baseline}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,601 @@
+"""Local stand-in for the Grok favorites gallery, used by the end-to-end benchmark.
+
+The page reproduces the DOM contract the downloader relies on:
+- masonry cards matching ``CARDS_XPATH`` inside ``div[role='listitem']`` items, loaded page by page from a listing API;
+- the More options menu with an "Upscale video" item that carries ``aria-disabled`` once upscaled;
+- the HD button, the video/image toggle, ``video#sd-video`` / ``video#hd-video`` and the Download button.
+
+Latencies, file sizes and the card mix are configurable through ``FakeGallerySettings``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+SD_SIZE = (464, 688)
+HD_SIZE = (928, 1376)
+IMAGE_SIZE = (928, 1376)
+STREAM_CHUNK = 64 * 1024
+
+
+@dataclass
+class FakeGallerySettings:
+    cards: int = 60
+    page_size: int = 24
+    video_ratio: float = 0.75
+    upscaled_ratio: float = 0.25
+    video_kb: int = 2048
+    image_kb: int = 256
+    initial_render_ms: int = 300
+    listing_latency_ms: int = 150
+    detail_latency_ms: int = 200
+    upscale_latency_ms: int = 3000
+    download_latency_ms: int = 100
+    bandwidth_kbps: int = 0  # per response, 0 = unthrottled
+    virtualize_viewports: float = 0  # drop card contents this many viewports away from the visible area, 0 = off
+    autoplay_previews: bool = True
+    seed: int = 1
+
+
+@dataclass
+class FakePost:
+    id: str
+    has_video: bool
+    height: int
+    upscaled: bool = False
+    upscale_started: Optional[float] = None
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type: bytes, payload: bytes, version: int = 0, flags: int = 0) -> bytes:
+    return _box(box_type, struct.pack(">I", (version << 24) | flags) + payload)
+
+
+def build_mp4(width: int, height: int, size: int, duration_s: int = 6) -> bytes:
+    """A structurally valid MP4 (ftyp, moov, mdat) of about ``size`` bytes with one video track of the given size."""
+    timescale = 1000
+    matrix = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+    mvhd = _full_box(b"mvhd", struct.pack(">IIII", 0, 0, timescale, duration_s * timescale) + struct.pack(">IH10x", 0x00010000, 0x0100) + matrix + bytes(24) + struct.pack(">I", 2))
+    tkhd = _full_box(
+        b"tkhd",
+        struct.pack(">III4xI8xHHH2x", 0, 0, 1, duration_s * timescale, 0, 0, 0) + matrix + struct.pack(">II", width << 16, height << 16),
+        flags=3,
+    )
+    mdhd = _full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, timescale, duration_s * timescale, 0x55C4, 0))
+    hdlr = _full_box(b"hdlr", struct.pack(">I4s12x", 0, b"vide") + b"VideoHandler\x00")
+    avc1 = _box(b"avc1", bytes(6) + struct.pack(">H", 1) + bytes(16) + struct.pack(">HHIIIH", width, height, 0x00480000, 0x00480000, 0, 1) + bytes(32) + struct.pack(">Hh", 0x18, -1))
+    stsd = _full_box(b"stsd", struct.pack(">I", 1) + avc1)
+    stts = _full_box(b"stts", struct.pack(">III", 1, 1, duration_s * timescale))
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+
+    def moov_with_offset(chunk_offset: int, sample_size: int) -> bytes:
+        stco = _full_box(b"stco", struct.pack(">II", 1, chunk_offset))
+        stsz = _full_box(b"stsz", struct.pack(">III", 0, 1, sample_size))
+        stbl = _box(b"stbl", stsd + stts + stsz + stco)
+        minf = _box(b"minf", _full_box(b"vmhd", bytes(8), flags=1) + stbl)
+        mdia = _box(b"mdia", mdhd + hdlr + minf)
+        return _box(b"moov", mvhd + _box(b"trak", tkhd + mdia))
+
+    header_size = len(ftyp) + len(moov_with_offset(0, 0)) + 8
+    mdat_payload = max(1, size - header_size)
+    moov = moov_with_offset(header_size, mdat_payload)
+    return ftyp + moov + _box(b"mdat", bytes(mdat_payload))
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+
+def build_png(width: int, height: int, size: int) -> bytes:
+    """A PNG with a real header and trailer, padded to about ``size`` bytes with a private ancillary chunk."""
+    head = b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    tail = _png_chunk(b"IEND", b"")
+    padding = max(0, size - len(head) - len(tail) - 12)
+    return head + _png_chunk(b"grOk", bytes(padding)) + tail
+
+
+APP_HTML = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Favorites (benchmark)</title>
+<style>
+body { margin: 0; background: #111; color: #eee; font-family: sans-serif; }
+#gallery { display: grid; grid-template-columns: repeat(4, 1fr); gap: 8px; padding: 8px; }
+.card { position: relative; height: 100%; overflow: hidden; border-radius: 8px; background: #222; cursor: pointer; }
+.card img { width: 100%; height: 100%; object-fit: cover; display: block; }
+#detail { position: fixed; inset: 0; background: #000; display: none; z-index: 10; padding: 60px 20px 20px; }
+#detail.open { display: block; }
+#detail video, #detail .media-image { max-width: 60vw; max-height: 70vh; display: block; }
+#detail .toolbar { position: absolute; top: 12px; left: 12px; right: 12px; display: flex; gap: 8px; }
+[role=menu] { position: absolute; top: 48px; right: 12px; background: #333; padding: 4px; z-index: 11; }
+[role=menu][hidden] { display: none; }
+[role=menuitem] { padding: 6px 12px; cursor: pointer; }
+[role=menuitem][aria-disabled=true] { opacity: 0.4; cursor: default; }
+.fade { animation: fade 150ms ease-out; }
+@keyframes fade { from { opacity: 0; } to { opacity: 1; } }
+</style>
+</head>
+<body>
+<div id="gallery" role="list"></div>
+<div id="detail"></div>
+<script>
+const SETTINGS = __SETTINGS__;
+const gallery = document.getElementById("gallery");
+const detail = document.getElementById("detail");
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+let cursor = null;
+let exhausted = false;
+let loading = false;
+let currentId = null;
+
+function el(tag, attrs, text) {
+  const node = document.createElement(tag);
+  for (const [key, value] of Object.entries(attrs || {})) node.setAttribute(key, value);
+  if (text) node.textContent = text;
+  return node;
+}
+
+function cardContent(post) {
+  const link = el("a", { href: "/imagine/post/" + post.id });
+  link.appendChild(el("img", { class: "object-cover", src: "/assets/images/" + post.id + ".png", alt: "" }));
+  return link;
+}
+
+function addCard(post) {
+  const item = el("div", { role: "listitem", "data-post-id": post.id });
+  item.style.height = post.height + "px";
+  const card = el("div", { class: "group/media-post-masonry-card card fade" });
+  card.appendChild(cardContent(post));
+  card.addEventListener("click", (event) => {
+    event.preventDefault();
+    openDetail(post.id, true);
+  });
+  item.__post = post;
+  item.appendChild(card);
+  gallery.appendChild(item);
+}
+
+async function loadPage() {
+  if (loading || exhausted) return;
+  loading = true;
+  try {
+    let url = "/rest/media/post/list?limit=" + SETTINGS.page_size;
+    if (cursor !== null) url += "&cursor=" + encodeURIComponent(cursor);
+    const payload = await (await fetch(url)).json();
+    payload.posts.forEach(addCard);
+    cursor = payload.nextCursor || null;
+    exhausted = cursor === null;
+  } finally {
+    loading = false;
+  }
+  virtualize();
+}
+
+function virtualize() {
+  if (!(SETTINGS.virtualize_viewports > 0)) return;
+  const margin = SETTINGS.virtualize_viewports * window.innerHeight;
+  for (const item of gallery.children) {
+    const rect = item.getBoundingClientRect();
+    const far = rect.bottom < -margin || rect.top > window.innerHeight + margin;
+    const card = item.firstChild;
+    if (far && card.firstChild) card.replaceChildren();
+    else if (!far && !card.firstChild) card.appendChild(cardContent(item.__post));
+  }
+}
+
+let scrollQueued = false;
+window.addEventListener("scroll", () => {
+  if (scrollQueued) return;
+  scrollQueued = true;
+  requestAnimationFrame(() => {
+    scrollQueued = false;
+    virtualize();
+    const root = document.documentElement;
+    if (window.scrollY + window.innerHeight >= root.scrollHeight - window.innerHeight) loadPage();
+  });
+});
+
+detail.addEventListener("click", (event) => {
+  const menu = detail.querySelector("[role=menu]");
+  if (menu && !menu.contains(event.target)) menu.hidden = true;
+});
+
+function closeDetail() {
+  if (history.state && history.state.id) {
+    history.back();
+  } else {
+    location.href = "/imagine/favorites";
+  }
+}
+
+window.addEventListener("popstate", (event) => {
+  if (event.state && event.state.id) openDetail(event.state.id, false);
+  else hideDetail();
+});
+
+function hideDetail() {
+  currentId = null;
+  detail.className = "";
+  detail.replaceChildren();
+}
+
+async function openDetail(id, push) {
+  if (push) history.pushState({ id: id }, "", "/imagine/post/" + id);
+  currentId = id;
+  await sleep(SETTINGS.detail_latency_ms);
+  const state = await (await fetch("/api/post/" + id)).json();
+  if (currentId === id) renderDetail(state);
+}
+
+function renderDetail(state) {
+  const id = state.id;
+  let mode = state.has_video ? "video" : "image";
+  detail.replaceChildren();
+  detail.className = "open fade";
+
+  const toolbar = el("div", { class: "toolbar" });
+  const back = el("button", { "aria-label": "Back" }, "Back");
+  back.addEventListener("click", closeDetail);
+  toolbar.appendChild(back);
+  const more = el("button", { "aria-label": "More options" }, "...");
+  toolbar.appendChild(more);
+  const download = el("button", { "aria-label": "Download" }, "Download");
+  toolbar.appendChild(download);
+  detail.appendChild(toolbar);
+
+  const menu = el("div", { role: "menu", hidden: "" });
+  const upscaleItem = el("div", { role: "menuitem" }, "Upscale video");
+  if (state.upscaled) upscaleItem.setAttribute("aria-disabled", "true");
+  menu.appendChild(upscaleItem);
+  detail.appendChild(menu);
+  more.addEventListener("click", (event) => {
+    event.stopPropagation();
+    menu.hidden = !menu.hidden;
+  });
+
+  const stage = el("div", {});
+  detail.appendChild(stage);
+
+  function showHd() {
+    if (currentId !== id) return;
+    state.upscaled = true;
+    upscaleItem.setAttribute("aria-disabled", "true");
+    if (!detail.querySelector(".hd-badge")) {
+      const hd = el("button", { class: "hd-badge" });
+      hd.appendChild(el("div", {}, "HD"));
+      toolbar.appendChild(hd);
+    }
+    renderStage();
+  }
+
+  function renderStage() {
+    stage.replaceChildren();
+    if (mode === "video") {
+      const quality = state.upscaled ? "hd" : "sd";
+      const video = el("video", { id: quality + "-video", src: "/assets/videos/" + id + "-" + quality + ".mp4", muted: "", loop: "" });
+      if (SETTINGS.autoplay_previews) video.setAttribute("autoplay", "");
+      else video.setAttribute("preload", "none");
+      stage.appendChild(video);
+    } else {
+      stage.appendChild(el("img", { class: "object-cover media-image", src: "/assets/images/" + id + ".png", alt: "" }));
+    }
+  }
+
+  if (state.has_video) {
+    const toggle = el("div", { "aria-label": "Text alignment" });
+    const videoButton = el("button", {}, "Video");
+    const imageButton = el("button", {}, "Image");
+    videoButton.addEventListener("click", () => { mode = "video"; renderStage(); });
+    imageButton.addEventListener("click", () => { mode = "image"; renderStage(); });
+    toggle.appendChild(videoButton);
+    toggle.appendChild(imageButton);
+    toolbar.appendChild(toggle);
+  }
+
+  upscaleItem.addEventListener("click", async (event) => {
+    event.stopPropagation();
+    menu.hidden = true;
+    if (upscaleItem.getAttribute("aria-disabled") === "true") return;
+    const started = await (await fetch("/api/post/" + id + "/upscale", { method: "POST" })).json();
+    setTimeout(showHd, started.ready_in_ms);
+  });
+
+  download.addEventListener("click", async () => {
+    await sleep(SETTINGS.download_latency_ms);
+    const url = mode === "video"
+      ? "/assets/videos/" + id + "-" + (state.upscaled ? "hd" : "sd") + ".mp4"
+      : "/assets/images/" + id + ".png";
+    const anchor = el("a", { href: url + "?download=1", download: "" });
+    document.body.appendChild(anchor);
+    anchor.click();
+    anchor.remove();
+  });
+
+  renderStage();
+  if (state.upscaled) showHd();
+  else if (state.ready_in_ms !== null) setTimeout(showHd, state.ready_in_ms);
+}
+
+(async () => {
+  const match = location.pathname.match(/^\\/imagine\\/post\\/([^/]+)/);
+  if (match) {
+    openDetail(decodeURIComponent(match[1]), false);
+    return;
+  }
+  await sleep(SETTINGS.initial_render_ms);
+  await loadPage();
+})();
+</script>
+</body>
+</html>
+"""
+
+
+class FakeGallery:
+    """Server-side state: the posts, their upscale progress and what was served."""
+
+    def __init__(self, settings: FakeGallerySettings):
+        self.settings = settings
+        rng = random.Random(settings.seed)
+        self.posts: List[FakePost] = []
+        for index in range(settings.cards):
+            post_id = f"{index:08x}-{rng.getrandbits(48):012x}"
+            post = FakePost(id=post_id, has_video=rng.random() < settings.video_ratio, height=rng.choice((220, 260, 300, 340, 380)))
+            post.upscaled = post.has_video and rng.random() < settings.upscaled_ratio
+            self.posts.append(post)
+        self.by_id: Dict[str, FakePost] = {post.id: post for post in self.posts}
+        self._lock = threading.Lock()
+        self._media: Dict[str, bytes] = {}
+        self.bytes_served: Dict[str, int] = {"video": 0, "image": 0}
+        self.requests = 0
+
+    def media(self, kind: str) -> bytes:
+        with self._lock:
+            if kind not in self._media:
+                if kind == "image":
+                    self._media[kind] = build_png(*IMAGE_SIZE, self.settings.image_kb * 1024)
+                else:
+                    width, height = HD_SIZE if kind == "hd" else SD_SIZE
+                    self._media[kind] = build_mp4(width, height, self.settings.video_kb * 1024)
+            return self._media[kind]
+
+    def listing(self, base_url: str, cursor: Optional[str], limit: int) -> dict:
+        start = int(cursor) if cursor and cursor.isdigit() else 0
+        end = min(len(self.posts), start + max(1, limit))
+        payload = {
+            "posts": [
+                {
+                    "id": post.id,
+                    "thumbnailImageUrl": f"{base_url}/assets/images/{post.id}.png",
+                    "height": post.height,
+                }
+                for post in self.posts[start:end]
+            ]
+        }
+        if end < len(self.posts):
+            payload["nextCursor"] = str(end)
+        return payload
+
+    def _ready_in_ms(self, post: FakePost) -> Optional[int]:
+        if post.upscaled or post.upscale_started is None:
+            return None
+        remaining = post.upscale_started + self.settings.upscale_latency_ms / 1000 - time.monotonic()
+        if remaining <= 0:
+            post.upscaled = True
+            return None
+        return int(remaining * 1000)
+
+    def post_state(self, post: FakePost) -> dict:
+        with self._lock:
+            ready_in_ms = self._ready_in_ms(post)
+            return {"id": post.id, "has_video": post.has_video, "upscaled": post.upscaled, "ready_in_ms": ready_in_ms}
+
+    def start_upscale(self, post: FakePost) -> dict:
+        with self._lock:
+            if not post.upscaled and post.upscale_started is None:
+                post.upscale_started = time.monotonic()
+            ready_in_ms = self._ready_in_ms(post)
+            return {"id": post.id, "ready_in_ms": ready_in_ms or 0}
+
+
+_LISTING_PATH = "/rest/media/post/list"
+_POST_API_RE = re.compile(r"^/api/post/([^/]+)(/upscale)?$")
+_IMAGE_RE = re.compile(r"^/assets/images/([^/]+)\.png$")
+_VIDEO_RE = re.compile(r"^/assets/videos/([^/]+)-(sd|hd)\.mp4$")
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    gallery: FakeGallery
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):
+        pass
+
+    def _send_json(self, payload, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_app(self) -> None:
+        settings = json.dumps(asdict(self.gallery.settings))
+        body = APP_HTML.replace("__SETTINGS__", settings).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_media(self, data: bytes, content_type: str, kind: str, filename: str, attachment: bool) -> None:
+        start, end = 0, len(data)
+        match = _RANGE_RE.match(self.headers.get("range") or "")
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(end, int(match.group(2)) + 1)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        if attachment:
+            self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.end_headers()
+
+        bandwidth = self.gallery.settings.bandwidth_kbps * 1024
+        view = memoryview(data)[start:end]
+        try:
+            for offset in range(0, len(view), STREAM_CHUNK):
+                chunk = view[offset:offset + STREAM_CHUNK]
+                self.wfile.write(chunk)
+                with self.gallery._lock:
+                    self.gallery.bytes_served[kind] += len(chunk)
+                if bandwidth:
+                    time.sleep(len(chunk) / bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+        gallery = self.gallery
+        with gallery._lock:
+            gallery.requests += 1
+
+        if path in ("/", "/imagine/favorites") or path.startswith("/imagine/post/"):
+            self._send_app()
+            return
+        if path == _LISTING_PATH:
+            time.sleep(gallery.settings.listing_latency_ms / 1000)
+            limit = int((query.get("limit") or [gallery.settings.page_size])[0])
+            base_url = f"http://{self.headers.get('host') or '127.0.0.1'}"
+            self._send_json(gallery.listing(base_url, (query.get("cursor") or [None])[0], limit))
+            return
+        attachment = "download" in query
+        match = _POST_API_RE.match(path)
+        if match and not match.group(2) and match.group(1) in gallery.by_id:
+            self._send_json(gallery.post_state(gallery.by_id[match.group(1)]))
+            return
+        match = _IMAGE_RE.match(path)
+        if match and match.group(1) in gallery.by_id:
+            self._send_media(gallery.media("image"), "image/png", "image", f"{match.group(1)}.png", attachment)
+            return
+        match = _VIDEO_RE.match(path)
+        if match and match.group(1) in gallery.by_id and gallery.by_id[match.group(1)].has_video:
+            post = gallery.by_id[match.group(1)]
+            quality = match.group(2)
+            if quality == "hd" and not gallery.post_state(post)["upscaled"]:
+                self.send_error(404)
+                return
+            self._send_media(gallery.media(quality), "video/mp4", "video", f"{post.id}-{quality}.mp4", attachment)
+            return
+        self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        if length:
+            self.rfile.read(length)
+        match = _POST_API_RE.match(urlparse(self.path).path)
+        if match and match.group(2) and match.group(1) in self.gallery.by_id:
+            self._send_json(self.gallery.start_upscale(self.gallery.by_id[match.group(1)]))
+            return
+        self.send_error(404)
+
+
+class FakeGalleryServer:
+    """Runs a ``FakeGallery`` on a local port in a background thread."""
+
+    def __init__(self, settings: Optional[FakeGallerySettings] = None, host: str = "127.0.0.1", port: int = 0):
+        self.gallery = FakeGallery(settings or FakeGallerySettings())
+        handler = type("FakeGalleryHandler", (_Handler,), {"gallery": self.gallery})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def favorites_url(self) -> str:
+        return f"{self.base_url}/imagine/favorites"
+
+    def start(self) -> "FakeGalleryServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-gallery", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGalleryServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeGallerySettings()
+    for item in fields(FakeGallerySettings):
+        default = getattr(defaults, item.name)
+        flag = "--" + item.name.replace("_", "-")
+        if isinstance(default, bool):
+            parser.add_argument(flag, type=lambda value: value.lower() in {"1", "true", "yes", "on"}, default=default, metavar="BOOL")
+        else:
+            parser.add_argument(flag, type=type(default), default=default)
+
+
+def settings_from_arguments(arguments: argparse.Namespace) -> FakeGallerySettings:
+    return FakeGallerySettings(**{item.name: getattr(arguments, item.name) for item in fields(FakeGallerySettings)})
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake favorites gallery for manual testing.")
+    parser.add_argument("--port", type=int, default=8765)
+    add_settings_arguments(parser)
+    arguments = parser.parse_args(argv)
+    server = FakeGalleryServer(settings_from_arguments(arguments), port=arguments.port).start()
+    print(f"Fake gallery: {server.favorites_url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Microbenchmarks for the helpers that run once per card or per file.
+
+Covers ``_read_image_resolution`` (PNG, GIF, JPEG, WebP), ``xpath_literal``, ``cookie_header_to_list``,
+``decide_media_action`` + ``media_requirements`` in a download folder of 100k files, ``probe_video_width``
+and ``t()``. Fixtures are generated once into ``--fixtures`` and reused while their parameters match.
+
+    python -m benchmarks.micro --save benchmarks/baselines/local.json
+    python -m benchmarks.micro --compare benchmarks/baselines/local.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import struct
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from .fake_gallery import HD_SIZE, IMAGE_SIZE, SD_SIZE, build_mp4, build_png
+
+
+FIXTURE_VERSION = 1
+
+
+@dataclass
+class Case:
+    name: str
+    number: int  # calls per timing sample
+    setup: Callable[["Fixtures"], Callable[[], object]]
+
+
+@dataclass
+class Fixtures:
+    root: str
+    download_dir: str
+    images: Dict[str, str]
+    videos: Dict[str, str]
+    identifiers: List[str]
+
+
+def build_jpeg(width: int, height: int, exif_kb: int = 0, size: int = 0) -> bytes:
+    """A baseline JPEG header (optionally after a large APP1 segment) with padded scan data and an EOI marker."""
+    data = bytearray(b"\xff\xd8")
+    remaining = exif_kb * 1024
+    while remaining > 0:
+        # Several APP segments, as cameras write them, so the parser has to walk past each one.
+        payload = min(remaining, 65000)
+        data += b"\xff\xe1" + struct.pack(">H", payload + 2) + b"Exif\x00\x00" + bytes(payload - 6)
+        remaining -= payload
+    data += b"\xff\xdb" + struct.pack(">H", 67) + bytes(65)
+    data += b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + bytes(9)
+    data += b"\xff\xda" + struct.pack(">H", 12) + bytes(10)
+    data += bytes(max(0, size - len(data) - 2))
+    return bytes(data + b"\xff\xd9")
+
+
+def build_gif(width: int, height: int, size: int) -> bytes:
+    head = b"GIF89a" + struct.pack("<HHBBB", width, height, 0, 0, 0)
+    return head + bytes(max(0, size - len(head) - 1)) + b"\x3b"
+
+
+def _riff(chunk_type: bytes, chunk: bytes, size: int) -> bytes:
+    body = b"WEBP" + chunk_type + struct.pack("<I", len(chunk)) + chunk
+    padding = max(0, size - len(body) - 8)
+    if padding:
+        padding = max(8, padding)
+        body += b"JUNK" + struct.pack("<I", padding - 8) + bytes(padding - 8)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def build_webp_vp8x(width: int, height: int, size: int) -> bytes:
+    chunk = bytes(4) + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    return _riff(b"VP8X", chunk, size)
+
+
+def build_webp_vp8l(width: int, height: int, size: int) -> bytes:
+    bits = (width - 1) | ((height - 1) << 14)
+    return _riff(b"VP8L", b"\x2f" + struct.pack("<I", bits), size)
+
+
+def build_webp_vp8(width: int, height: int, size: int) -> bytes:
+    chunk = b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", width, height)
+    return _riff(b"VP8 ", chunk, size)
+
+
+def _write(path: str, data: bytes) -> str:
+    with open(path, "wb") as handle:
+        handle.write(data)
+    return path
+
+
+def _moov_at_end(data: bytes) -> bytes:
+    """Move the ``moov`` box behind ``mdat`` as non-faststart encoders write it (offsets are not needed here)."""
+    boxes = []
+    offset = 0
+    while offset < len(data):
+        size = struct.unpack(">I", data[offset:offset + 4])[0]
+        boxes.append(data[offset:offset + size])
+        offset += size
+    ftyp, moov, mdat = boxes
+    return ftyp + mdat + moov
+
+
+def prepare_fixtures(root: str, file_count: int) -> Fixtures:
+    """Generate (or reuse) the fixture files under ``root``."""
+    os.makedirs(root, exist_ok=True)
+    download_dir = os.path.join(root, "downloads")
+    marker_path = os.path.join(root, "fixtures.json")
+    marker = {"version": FIXTURE_VERSION, "file_count": file_count}
+    identifiers = [f"{index:08x}-bench" for index in range(file_count // 2)]
+
+    images = {
+        "png": os.path.join(root, "image.png"),
+        "gif": os.path.join(root, "image.gif"),
+        "jpeg": os.path.join(root, "image.jpg"),
+        "jpeg_exif_256k": os.path.join(root, "image-exif.jpg"),
+        "webp_vp8x": os.path.join(root, "image-vp8x.webp"),
+        "webp_vp8l": os.path.join(root, "image-vp8l.webp"),
+        "webp_vp8": os.path.join(root, "image-vp8.webp"),
+    }
+    videos = {
+        "mp4_faststart": os.path.join(root, "video-faststart.mp4"),
+        "mp4_moov_at_end": os.path.join(root, "video-moov-end.mp4"),
+    }
+
+    try:
+        with open(marker_path, "r", encoding="utf-8") as handle:
+            if json.load(handle) == marker:
+                return Fixtures(root, download_dir, images, videos, identifiers)
+    except (OSError, ValueError):
+        pass
+
+    width, height = IMAGE_SIZE
+    image_size = 2 * 1024 * 1024
+    _write(images["png"], build_png(width, height, image_size))
+    _write(images["gif"], build_gif(width, height, image_size))
+    _write(images["jpeg"], build_jpeg(width, height, size=image_size))
+    _write(images["jpeg_exif_256k"], build_jpeg(width, height, exif_kb=256, size=image_size))
+    _write(images["webp_vp8x"], build_webp_vp8x(width, height, image_size))
+    _write(images["webp_vp8l"], build_webp_vp8l(width, height, image_size))
+    _write(images["webp_vp8"], build_webp_vp8(width, height, image_size))
+    video = build_mp4(*HD_SIZE, 16 * 1024 * 1024)
+    _write(videos["mp4_faststart"], video)
+    _write(videos["mp4_moov_at_end"], _moov_at_end(video))
+
+    # Every identifier has an image; half of them have a small SD video and the other half a leftover
+    # ``.part`` file, so the folder holds ``file_count`` entries and decide_media_action sees both outcomes.
+    os.makedirs(download_dir, exist_ok=True)
+    small_video = build_mp4(*SD_SIZE, 2048)
+    small_image = build_png(width, height, 256)
+    for index, identifier in enumerate(identifiers):
+        _write(os.path.join(download_dir, f"grok-image-{identifier}.png"), small_image)
+        if index % 2 == 0:
+            _write(os.path.join(download_dir, f"grok-video-{identifier}.mp4"), small_video)
+        else:
+            _write(os.path.join(download_dir, f"grok-video-{identifier}.mp4.part"), small_video[:1024])
+
+    with open(marker_path, "w", encoding="utf-8") as handle:
+        json.dump(marker, handle)
+    return Fixtures(root, download_dir, images, videos, identifiers)
+
+
+def _cycle(values):
+    iterator = itertools.cycle(values)
+    return lambda: next(iterator)
+
+
+def _image_case(kind: str) -> Case:
+    def setup(fixtures: Fixtures):
+        from src.image_downloader import _read_image_resolution
+
+        path = fixtures.images[kind]
+        return lambda: _read_image_resolution(path)
+
+    return Case(f"read_image_resolution[{kind}]", 200, setup)
+
+
+def _video_case(kind: str) -> Case:
+    def setup(fixtures: Fixtures):
+        from src.video_downloader import probe_video_width
+
+        path = fixtures.videos[kind]
+        return lambda: probe_video_width(path)
+
+    return Case(f"probe_video_width[{kind}]", 200, setup)
+
+
+def _xpath_literal_setup(_fixtures: Fixtures):
+    from src.playwright_utils import xpath_literal
+
+    values = _cycle(["0a1b2c3d-4e5f-6789-abcd-ef0123456789.png", "it's a card.png", "mixed 'single' and \"double\" quotes.png"])
+    return lambda: xpath_literal(values())
+
+
+def _cookie_setup(_fixtures: Fixtures):
+    from src.cookies import cookie_header_to_list
+
+    header = "; ".join(f"cookie_{index}={'v' * 96}" for index in range(200))
+    return lambda: cookie_header_to_list(header, ".grok.com")
+
+
+def _decide_setup(fixtures: Fixtures):
+    from src.downloader import decide_media_action, media_requirements
+
+    next_identifier = _cycle([f"{identifier}.png" for identifier in fixtures.identifiers])
+
+    def op():
+        _, info = decide_media_action(next_identifier())
+        return media_requirements(info)
+
+    return op
+
+
+def _translate_setup(_fixtures: Fixtures):
+    from src.localization import t
+
+    return lambda: t("card_processing", index=42, identifier="0a1b2c3d-4e5f-6789-abcd-ef0123456789.png")
+
+
+def _translate_plain_setup(_fixtures: Fixtures):
+    from src.localization import t
+
+    return lambda: t("back_to_gallery")
+
+
+CASES: List[Case] = [
+    *(_image_case(kind) for kind in ("png", "gif", "jpeg", "jpeg_exif_256k", "webp_vp8x", "webp_vp8l", "webp_vp8")),
+    Case("xpath_literal", 20000, _xpath_literal_setup),
+    Case("cookie_header_to_list[200 cookies]", 500, _cookie_setup),
+    Case("decide_media_action+media_requirements[download dir]", 2000, _decide_setup),
+    *(_video_case(kind) for kind in ("mp4_faststart", "mp4_moov_at_end")),
+    Case("t[format]", 20000, _translate_setup),
+    Case("t[plain]", 20000, _translate_plain_setup),
+]
+
+
+def measure(op: Callable[[], object], number: int, repeat: int) -> dict:
+    op()  # warm caches and imports outside the timed samples
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        samples.append((time.perf_counter_ns() - started) / number)
+    return {
+        "ns_per_op_min": round(min(samples), 1),
+        "ns_per_op_median": round(statistics.median(samples), 1),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _format_ns(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:8.2f} ms"
+    if value >= 1e3:
+        return f"{value / 1e3:8.2f} µs"
+    return f"{value:8.1f} ns"
+
+
+def print_table(results: Dict[str, dict], baseline: Optional[dict] = None) -> None:
+    previous = (baseline or {}).get("results", {})
+    print(f"\n{'benchmark':<52} {'min':>11} {'median':>11}  vs baseline")
+    for name, result in results.items():
+        line = f"{name:<52} {_format_ns(result['ns_per_op_min']):>11} {_format_ns(result['ns_per_op_median']):>11}"
+        before = previous.get(name, {}).get("ns_per_op_min")
+        if before:
+            line += f"  {(result['ns_per_op_min'] - before) / before * 100:+7.1f}%"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the per-card and per-file helpers.")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "grok-microbench"), help="fixture folder (generated on first use)")
+    parser.add_argument("--files", type=int, default=100_000, help="number of files in the synthetic download folder")
+    parser.add_argument("--repeat", type=int, default=7, help="timing samples per benchmark")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--save", help="write the results to this JSON file (a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    arguments = parser.parse_args(argv)
+
+    print(f"Preparing fixtures in {arguments.fixtures} ...")
+    fixtures = prepare_fixtures(arguments.fixtures, arguments.files)
+
+    # The helpers read their configuration at import time, so point it at the fixtures first.
+    os.environ["DOWNLOAD_DIR"] = fixtures.download_dir
+    os.environ["ENABLE_MEDIA_MANIFEST"] = "false"
+    os.environ["FFPROBE_CROSS_CHECK"] = "false"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    results: Dict[str, dict] = {}
+    for case in CASES:
+        if arguments.filter and arguments.filter not in case.name:
+            continue
+        results[case.name] = measure(case.setup(fixtures), case.number, arguments.repeat)
+        print(f"  {case.name}: {_format_ns(results[case.name]['ns_per_op_min']).strip()}")
+
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    print_table(results, baseline)
+
+    if arguments.save:
+        os.makedirs(os.path.dirname(os.path.abspath(arguments.save)), exist_ok=True)
+        with open(arguments.save, "w", encoding="utf-8") as handle:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "files": arguments.files,
+                    "results": results,
+                },
+                handle,
+                indent=2,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
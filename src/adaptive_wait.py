@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import inspect
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from playwright.sync_api import TimeoutError as PWTimeout
+
+from . import config
+from .localization import t
+
+
+# A readiness signal is ``signal(page, timeout_ms)``: it returns once the UI is ready and raises a Playwright
+# timeout otherwise. The same signal works on sync and async pages because it only calls page methods.
+ReadySignal = Callable[[object, int], object]
+
+ANIMATIONS_DONE_SCRIPT = """
+() => document.getAnimations().every(animation => {
+  if (animation.playState !== 'running') return true;
+  const timing = animation.effect && animation.effect.getTiming ? animation.effect.getTiming() : null;
+  return !!timing && timing.iterations === Infinity;
+})
+"""
+
+SCROLL_SETTLED_SCRIPT = """
+() => {
+  const root = document.scrollingElement || document.documentElement;
+  const current = { y: window.scrollY, height: root.scrollHeight };
+  const previous = window.__grokScrollProbe;
+  window.__grokScrollProbe = current;
+  return !!previous && previous.y === current.y && previous.height === current.height;
+}
+"""
+
+SCROLL_SETTLED_POLL_MS = 100
+
+
+CARDS_ADDED_SCRIPT = """
+([selector, count]) => document.querySelectorAll(selector).length > count
+"""
+
+
+def selector_ready(selector: str, state: str = "visible") -> ReadySignal:
+    return lambda page, timeout_ms: page.wait_for_selector(selector, state=state, timeout=timeout_ms)
+
+
+def cards_added(previous_count: int) -> ReadySignal:
+    """Ready once the gallery holds more cards than ``previous_count``."""
+    return lambda page, timeout_ms: page.wait_for_function(
+        CARDS_ADDED_SCRIPT, arg=[config.CARDS_CSS_SELECTOR, previous_count], timeout=timeout_ms
+    )
+
+
+def animations_done() -> ReadySignal:
+    """Ready once no finite CSS/Web animation is still running (looping spinners are ignored)."""
+    return lambda page, timeout_ms: page.wait_for_function(ANIMATIONS_DONE_SCRIPT, timeout=timeout_ms)
+
+
+def scroll_settled() -> ReadySignal:
+    """Ready once scroll position and page height stop changing between two polls."""
+    return lambda page, timeout_ms: page.wait_for_function(SCROLL_SETTLED_SCRIPT, polling=SCROLL_SETTLED_POLL_MS, timeout=timeout_ms)
+
+
+class WaitStats:
+    """Sleep time the fixed delays would have cost against the time actually spent waiting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.budget_ms = 0.0
+        self.spent_ms = 0.0
+
+    def record(self, budget_ms: float, spent_ms: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.budget_ms += budget_ms
+            self.spent_ms += min(spent_ms, budget_ms)
+
+    @property
+    def saved_ms(self) -> float:
+        return max(0.0, self.budget_ms - self.spent_ms)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.waits = 0
+            self.budget_ms = 0.0
+            self.spent_ms = 0.0
+
+
+wait_stats = WaitStats()
+
+
+def _budget_ms(base_ms: int) -> int:
+    return base_ms + random.randint(0, max(0, config.WAIT_JITTER_MS))
+
+
+def _floor_ms(budget_ms: int) -> int:
+    return min(budget_ms, max(0, config.ADAPTIVE_WAIT_FLOOR_MS))
+
+
+def wait_until(page, base_ms: int, ready: Optional[ReadySignal] = None) -> None:
+    """Wait up to the jittered ``base_ms`` delay but return as soon as ``ready`` fires (after the floor).
+
+    Without a signal, or with ``ADAPTIVE_WAITS`` off, this is the plain fixed jittered sleep.
+    """
+    budget = _budget_ms(base_ms)
+    if ready is None or not config.ADAPTIVE_WAITS:
+        page.wait_for_timeout(budget)
+        return
+    started = time.perf_counter()
+    floor = _floor_ms(budget)
+    if floor:
+        page.wait_for_timeout(floor)
+    remaining = budget - floor
+    if remaining > 0:
+        try:
+            ready(page, remaining)
+        except PWTimeout:
+            pass
+    wait_stats.record(budget, (time.perf_counter() - started) * 1000)
+
+
+async def wait_until_async(page, base_ms: int, ready: Optional[ReadySignal] = None) -> None:
+    """``wait_until`` for ``playwright.async_api`` pages."""
+    budget = _budget_ms(base_ms)
+    if ready is None or not config.ADAPTIVE_WAITS:
+        await page.wait_for_timeout(budget)
+        return
+    started = time.perf_counter()
+    floor = _floor_ms(budget)
+    if floor:
+        await page.wait_for_timeout(floor)
+    remaining = budget - floor
+    if remaining > 0:
+        try:
+            result = ready(page, remaining)
+            if inspect.isawaitable(result):
+                await result
+        except PWTimeout:
+            pass
+    wait_stats.record(budget, (time.perf_counter() - started) * 1000)
+
+
+def print_wait_savings() -> None:
+    if not config.ADAPTIVE_WAITS or wait_stats.waits == 0:
+        return
+    print(
+        t(
+            "adaptive_wait_summary",
+            saved=f"{wait_stats.saved_ms / 1000:.1f}",
+            budget=f"{wait_stats.budget_ms / 1000:.1f}",
+            count=wait_stats.waits,
+        )
+    )
+
+
+__all__ = [
+    "ReadySignal",
+    "selector_ready",
+    "cards_added",
+    "animations_done",
+    "scroll_settled",
+    "wait_stats",
+    "wait_until",
+    "wait_until_async",
+    "print_wait_savings",
+]
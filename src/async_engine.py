@@ -0,0 +1,852 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+from typing import List, Optional
+
+from playwright.async_api import TimeoutError as PWTimeout, async_playwright
+
+from . import config, metrics
+from .adaptive_wait import (
+    ReadySignal,
+    animations_done,
+    cards_added,
+    print_wait_savings,
+    scroll_settled,
+    selector_ready,
+    wait_until_async,
+)
+from .browser import (
+    asset_request_headers,
+    context_options,
+    cookies_need_import,
+    launch_options,
+    mark_cookies_imported,
+    persistent_context_options,
+    profile_dir,
+)
+from .checkpoint import RunCheckpoint, resume_checkpoint
+from .cookies import cookie_header_to_list, cookies_to_header, load_cookie_header
+from .downloader import (
+    card_failure_recorder,
+    card_needs_work,
+    media_requirements,
+    print_run_summary,
+    record_card_not_found,
+    record_image_saved,
+    record_video_saved,
+    triage_card,
+)
+from .gallery_scanner import DRAIN_SCRIPT, build_scanner_script
+from .http_session import close_session
+from .image_downloader import _download_image_from_url, _log_image_success
+from .localization import print_error, t
+from .manifest import MediaManifest, open_manifest
+from .metrics import record_fallback, start_metrics, stop_metrics, upscale_timeouts
+from .playwright_utils import (
+    ANCHOR_DOWNLOAD_SCRIPT,
+    BACK_BUTTON_SELECTOR,
+    CARD_ANCESTOR_XPATH,
+    DOWNLOAD_BUTTON_SELECTOR,
+    HARVEST_CARDS_SCRIPT,
+    IMAGE_BUTTON_SELECTOR,
+    MORE_OPTIONS_BUTTON_SELECTOR,
+    SCROLL_TO_OFFSET_SCRIPT,
+    UPSCALE_MENU_ACTIVE_XPATH,
+    UPSCALE_MENU_DISABLED_XPATH,
+    VIDEO_IMAGE_TOGGLE_SELECTOR,
+    VIDEO_SOURCE_SELECTORS,
+    card_detail_url,
+    card_image_xpath,
+    is_browser_closed_error,
+    parse_harvested_cards,
+    safe_area_point,
+)
+from .resource_policy import configured_policy, print_block_savings
+from .tracing import finish_tracing, set_track, span, start_tracing, traced
+from .transfers import finalize_part, has_resumable_part, part_path, remove_quietly
+from .verify import requeue_corrupt_media
+from .video_downloader import _download_video_via_http
+
+
+async def scroll_to_load_more(page, direction: str = "down", ready: Optional[ReadySignal] = None):
+    direction = (direction or "down").lower()
+    if direction not in {"down", "up"}:
+        direction = "down"
+
+    jitter = random.randint(0, config.MOUSE_SCROLL_JITTER_MS)
+    distance = config.MOUSE_SCROLL + jitter
+    delta_y = distance if direction == "down" else -distance
+    label = (t("scroll_direction_down") if direction == "down" else t("scroll_direction_up"))
+    print(t("scrolling", direction=label))
+
+    viewport = page.viewport_size or {"width": 1280, "height": 800}
+    await page.mouse.move(int(viewport["width"] * 0.6), int(viewport["height"] * 0.5))
+
+    await page.mouse.wheel(0, delta_y)
+    await wait_until_async(page, config.SCROLL_PAUSE_MS, ready)
+
+
+async def click_safe_area(page):
+    x, y = safe_area_point(page)
+    await page.mouse.click(x, y)
+
+
+async def extract_video_source(page):
+    for selector in VIDEO_SOURCE_SELECTORS:
+        try:
+            await page.wait_for_selector(selector, timeout=3000)
+        except PWTimeout:
+            continue
+
+        locator = page.locator(selector)
+        if await locator.count() == 0:
+            continue
+
+        try:
+            src = await locator.first.get_attribute("src")
+        except Exception:
+            src = None
+
+        if src:
+            return src
+    return None
+
+
+async def find_card_by_identifier(page, target_identifier: str):
+    img_locator = page.locator(card_image_xpath(target_identifier))
+    if await img_locator.count() == 0:
+        return None
+    return img_locator.first.locator(CARD_ANCESTOR_XPATH).first
+
+
+async def locate_card(page, identifier: str, offset: Optional[float] = None):
+    card = await find_card_by_identifier(page, identifier)
+    if card is not None:
+        return card
+
+    card_rendered = selector_ready(card_image_xpath(identifier), state="attached")
+    if offset is not None:
+        previous_height = -1
+        while True:
+            height = int(await page.evaluate(SCROLL_TO_OFFSET_SCRIPT, offset) or 0)
+            await wait_until_async(page, config.SCROLL_PAUSE_MS, card_rendered)
+            card = await find_card_by_identifier(page, identifier)
+            if card is not None:
+                return card
+            if height > offset or height <= previous_height:
+                break
+            previous_height = height
+
+    print(t("card_search_scroll", identifier=identifier))
+    for _ in range(config.SEARCH_SCROLL_UP_ATTEMPTS):
+        await scroll_to_load_more(page, direction="up", ready=card_rendered)
+        card = await find_card_by_identifier(page, identifier)
+        if card is not None:
+            return card
+
+    for _ in range(config.SEARCH_SCROLL_DOWN_ATTEMPTS):
+        await scroll_to_load_more(page, direction="down", ready=card_rendered)
+        card = await find_card_by_identifier(page, identifier)
+        if card is not None:
+            return card
+    return None
+
+
+async def scroll_toward(page, offset: float) -> None:
+    previous_height = -1
+    while True:
+        card_count = await page.locator(config.CARDS_CSS_SELECTOR).count()
+        height = int(await page.evaluate(SCROLL_TO_OFFSET_SCRIPT, offset) or 0)
+        await wait_until_async(page, config.SCROLL_PAUSE_MS, cards_added(card_count))
+        if height > offset or height <= previous_height:
+            return
+        previous_height = height
+
+
+async def drain_cards(page, scanner_installed: bool):
+    raw_cards = None
+    try:
+        if scanner_installed:
+            raw_cards = await page.evaluate(DRAIN_SCRIPT)
+        if raw_cards is None:
+            raw_cards = await page.evaluate(HARVEST_CARDS_SCRIPT, config.CARDS_XPATH)
+    except Exception as error:
+        if is_browser_closed_error(error):
+            raise
+        print(t("card_identifier_error"))
+        return []
+    return parse_harvested_cards(raw_cards)
+
+
+async def card_has_video_toggle(page) -> bool:
+    try:
+        await page.wait_for_selector(VIDEO_IMAGE_TOGGLE_SELECTOR, timeout=config.VIDEO_IMAGE_TOGGLE_TIMEOUT_MS)
+    except PWTimeout:
+        return False
+    try:
+        return await page.locator(VIDEO_IMAGE_TOGGLE_SELECTOR).count() > 0
+    except Exception:
+        return False
+
+
+@traced("video.fallback")
+async def _attempt_video_fallback(page, filepath: str, filename: str, record_failure) -> bool:
+    fallback_url = await extract_video_source(page)
+    if not fallback_url:
+        record_failure(t("video_src_not_found"))
+        return False
+
+    print(t("alternative_download", url=fallback_url))
+
+    try:
+        browser_cookie_header = cookies_to_header(await page.context.cookies(fallback_url)) or None
+    except Exception:
+        browser_cookie_header = None
+    if browser_cookie_header and fallback_url.startswith(("http://", "https://")):
+        with span("video.fallback.browser_cookies"):
+            success = await asyncio.to_thread(_download_video_via_http, fallback_url, filepath, filename, lambda _reason: None, browser_cookie_header)
+        record_fallback("browser_cookies", success)
+        if success:
+            return True
+
+    try:
+        with span("video.fallback.anchor"):
+            async with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
+                await page.evaluate(ANCHOR_DOWNLOAD_SCRIPT, fallback_url)
+            download = await dl_info.value
+            part = part_path(filepath)
+            await download.save_as(part)
+            size = finalize_part(part, filepath)
+        record_fallback("anchor", size > 0)
+        if size > 0:
+            print(t("alternative_download_success", filename=filename, size=size))
+            return True
+    except Exception:
+        record_fallback("anchor", False)
+        remove_quietly(part_path(filepath))
+
+    with span("video.fallback.cookie_file"):
+        success = await asyncio.to_thread(_download_video_via_http, fallback_url, filepath, filename, record_failure)
+    record_fallback("cookie_file", success)
+    return success
+
+
+@traced("video")
+async def download_video_for_card(
+    page,
+    identifier: str,
+    media_info,
+    item_index: int,
+    upscale_failures: List[str],
+    record_failure,
+) -> bool:
+    if config.UPSCALE_VIDEOS:
+        await page.wait_for_selector(MORE_OPTIONS_BUTTON_SELECTOR, timeout=config.MORE_OPTIONS_BUTTON_TIMEOUT_MS)
+        await page.locator(MORE_OPTIONS_BUTTON_SELECTOR).first.click()
+        print(t("menu_opened"))
+
+        disabled = page.locator(UPSCALE_MENU_DISABLED_XPATH)
+        active = page.locator(UPSCALE_MENU_ACTIVE_XPATH)
+        await wait_until_async(page, config.WAIT_AFTER_CARD_SCROLL_MS, selector_ready(f"{UPSCALE_MENU_DISABLED_XPATH} | {UPSCALE_MENU_ACTIVE_XPATH}"))
+
+        if await disabled.count() > 0:
+            print(t("already_upscaled"))
+            await click_safe_area(page)
+        else:
+            print(t("upscale_start"))
+            await active.first.click()
+            await wait_until_async(page, config.WAIT_AFTER_MENU_INTERACTION_MS, animations_done())
+            await click_safe_area(page)
+            try:
+                with span("video.upscale_wait"):
+                    await page.wait_for_selector(config.HD_BUTTON_SELECTOR, timeout=config.UPSCALE_TIMEOUT_MS)
+                print(t("upscale_success"))
+            except PWTimeout:
+                print(t("upscale_timeout"))
+                upscale_failures.append(identifier)
+                upscale_timeouts.inc()
+
+        await wait_until_async(page, config.WAIT_AFTER_MENU_INTERACTION_MS, animations_done())
+    else:
+        print(t("upscale_disabled"))
+
+    dl_button = page.locator(DOWNLOAD_BUTTON_SELECTOR)
+    if await dl_button.count() == 0:
+        record_failure(t("no_download_button"))
+        return False
+
+    video_path = media_info.video_path
+    video_filename = os.path.basename(video_path)
+    accent_video_filename = f"{config.COLOR_ACCENT}{video_filename}{config.COLOR_RESET}"
+    button = dl_button.first
+    await button.wait_for(state="visible", timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS)
+
+    if os.path.exists(video_path):
+        print(t("already_exists_overwrite", filename=video_filename))
+
+    if has_resumable_part(video_path):
+        resume_url = await extract_video_source(page)
+        if resume_url and resume_url.startswith(("http://", "https://")):
+            try:
+                resume_cookie_header = cookies_to_header(await page.context.cookies(resume_url)) or None
+            except Exception:
+                resume_cookie_header = None
+            if await asyncio.to_thread(_download_video_via_http, resume_url, video_path, video_filename, lambda _reason: None, resume_cookie_header):
+                return True
+
+    download_event = None
+    fallback_needed = False
+
+    try:
+        with span("video.expect_download"):
+            async with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
+                await button.click()
+            download_event = await dl_info.value
+    except PWTimeout:
+        fallback_needed = True
+    except Exception as error:
+        record_failure(t("video_processing_error", index=item_index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        fallback_needed = True
+
+    if download_event is not None:
+        try:
+            part = part_path(video_path)
+            with span("video.save"):
+                await download_event.save_as(part)
+                size = finalize_part(part, video_path)
+            if size == 0:
+                print_error(t("zero_byte_file_delete_retry"))
+                fallback_needed = True
+            else:
+                print(t("download_success", filename=accent_video_filename))
+                return True
+        except Exception as error:
+            record_failure(t("video_processing_error", index=item_index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            return False
+
+    if not fallback_needed:
+        return False
+
+    return await _attempt_video_fallback(page, video_path, video_filename, record_failure)
+
+
+async def _card_has_image_button(page) -> bool:
+    try:
+        await page.wait_for_selector(IMAGE_BUTTON_SELECTOR, timeout=config.VIDEO_IMAGE_TOGGLE_TIMEOUT_MS)
+    except PWTimeout:
+        return False
+    try:
+        return await page.locator(IMAGE_BUTTON_SELECTOR).count() > 0
+    except Exception:
+        return False
+
+
+async def _resolve_image_src(page, identifier: str) -> str | None:
+    candidate = (identifier or "").strip()
+    if candidate.startswith("http"):
+        return candidate
+    if candidate:
+        return f"https://imagine-public.x.ai/imagine-public/images/{candidate}"
+
+    try:
+        selector = config.IMAGE_FALLBACK_SELECTOR
+        await page.wait_for_selector(selector, timeout=config.CARD_VISIBILITY_TIMEOUT_MS)
+        img_locator = page.locator(selector)
+        if await img_locator.count() > 0:
+            src = await img_locator.first.get_attribute("src")
+            if src:
+                return src
+    except Exception:
+        pass
+    return None
+
+
+async def _download_image_from_popup(popup, target_path: str) -> bool:
+    try:
+        await popup.wait_for_load_state("load", timeout=5000)
+    except PWTimeout:
+        pass
+
+    image_src = None
+    try:
+        img_locator = popup.locator("img[src]")
+        if await img_locator.count() > 0:
+            image_src = await img_locator.first.get_attribute("src")
+    except Exception:
+        image_src = None
+
+    if not image_src:
+        image_src = popup.url
+
+    if not image_src:
+        return False
+
+    return await asyncio.to_thread(_download_image_from_url, image_src, target_path)
+
+
+@traced("image.popup_fallback")
+async def _handle_image_popup(page, identifier: str, target_path: str, popups: list) -> bool:
+    for popup in list(popups):
+        try:
+            if await _download_image_from_popup(popup, target_path):
+                record_fallback("image_popup", True)
+                return True
+        finally:
+            try:
+                await popup.close()
+            except Exception:
+                pass
+
+    image_src = await _resolve_image_src(page, identifier)
+    if not image_src:
+        print_error(t("no_image_src"))
+        record_fallback("image_http", False)
+        return False
+    success = await asyncio.to_thread(_download_image_from_url, image_src, target_path)
+    record_fallback("image_http", success)
+    return success
+
+
+@traced("image")
+async def download_image_for_card(
+    page,
+    identifier: str,
+    media_info,
+    has_video_option: bool,
+    record_failure,
+) -> bool:
+    if has_video_option:
+        if not await _card_has_image_button(page):
+            print(t("no_image_element"))
+        else:
+            img_button = page.locator(IMAGE_BUTTON_SELECTOR)
+            try:
+                await img_button.first.click()
+                await wait_until_async(page, config.WAIT_AFTER_MENU_INTERACTION_MS, animations_done())
+            except Exception:
+                print(t("no_image_element"))
+
+    dl_button = page.locator(DOWNLOAD_BUTTON_SELECTOR)
+    if await dl_button.count() == 0:
+        record_failure(t("no_download_button"))
+        return False
+
+    button = dl_button.first
+    await button.wait_for(state="visible", timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS)
+    image_path = media_info.image_path
+    # Every worker page lives in the same context, so only popups opened by this page are ours to use and close.
+    popups: list = []
+    on_popup = popups.append
+    page.on("popup", on_popup)
+    success = False
+
+    try:
+        async with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
+            await button.click()
+        download = await dl_info.value
+
+        part = part_path(image_path)
+        try:
+            await download.save_as(part)
+            if finalize_part(part, image_path) == 0:
+                success = await _handle_image_popup(page, identifier, image_path, popups)
+            else:
+                _log_image_success(image_path)
+                success = True
+        except Exception as error:
+            print_error(t("image_download_error", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            remove_quietly(part)
+            success = await _handle_image_popup(page, identifier, image_path, popups)
+
+    except PWTimeout:
+        success = await _handle_image_popup(page, identifier, image_path, popups)
+    except Exception as error:
+        print_error(t("image_download_error", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        success = await _handle_image_popup(page, identifier, image_path, popups)
+    finally:
+        page.remove_listener("popup", on_popup)
+        for popup in popups:
+            try:
+                await popup.close()
+            except Exception:
+                pass
+
+    if success:
+        return True
+
+    record_failure(t("image_download_error", error=f"{config.COLOR_GRAY}UI download failed{config.COLOR_RESET}"))
+    return False
+
+
+async def _open_card(page, card, identifier: str, record_failure) -> bool:
+    for attempt in range(2):
+        try:
+            await card.scroll_into_view_if_needed()
+            await card.wait_for(state="visible", timeout=config.CARD_VISIBILITY_TIMEOUT_MS)
+            await wait_until_async(page, config.WAIT_AFTER_CARD_SCROLL_MS, scroll_settled())
+            await card.click()
+            print(t("card_click"))
+            return True
+        except PWTimeout:
+            if attempt == 0:
+                print(t("card_disappeared_retry"))
+                refreshed = await find_card_by_identifier(page, identifier)
+                if refreshed is None:
+                    record_failure(t("card_not_found_for_clicking"))
+                    return False
+                card = refreshed
+                continue
+            record_failure(t("card_click_timeout"))
+            return False
+    return False
+
+
+async def _open_card_detail(page, identifier: str, record_failure) -> bool:
+    url = card_detail_url(identifier)
+    try:
+        response = await page.goto(url, wait_until="domcontentloaded")
+        if response is not None and response.status >= 400:
+            record_failure(t("card_detail_failed", status=response.status, url=url))
+            return False
+        await page.locator(BACK_BUTTON_SELECTOR).first.wait_for(state="visible", timeout=config.BACK_BUTTON_TIMEOUT_MS)
+    except PWTimeout:
+        record_failure(t("card_detail_timeout", url=url))
+        return False
+    print(t("card_click"))
+    return True
+
+
+async def _return_to_gallery(page):
+    try:
+        back_button = page.locator(BACK_BUTTON_SELECTOR).first
+        await back_button.wait_for(state="visible", timeout=config.BACK_BUTTON_TIMEOUT_MS)
+        await wait_until_async(page, config.WAIT_AFTER_BACK_BUTTON_MS, animations_done())
+        await back_button.click()
+        await page.wait_for_selector(config.GALLERY_LISTITEM_SELECTOR, timeout=config.GALLERY_LOAD_TIMEOUT_MS)
+        print(t("back_to_gallery"))
+    except Exception:
+        print(t("back_failed_continue"))
+    await wait_until_async(page, config.WAIT_AFTER_BACK_BUTTON_MS, animations_done())
+
+
+async def _download_card_media(page, index: int, identifier: str, upscale_failures: List[str], record_failure, media_info, manifest) -> None:
+    need_video_download, need_image_download = media_requirements(media_info)
+    has_video_option = await card_has_video_toggle(page)
+
+    if need_video_download:
+        if not has_video_option:
+            print(t("skipping_no_video_option", identifier=identifier))
+        else:
+            if await download_video_for_card(page, identifier, media_info, index, upscale_failures, record_failure):
+                await asyncio.to_thread(record_video_saved, identifier, media_info, upscale_failures, manifest)
+
+    if need_image_download:
+        if await download_image_for_card(page, identifier, media_info, has_video_option, record_failure):
+            record_image_saved(identifier, media_info, manifest)
+
+
+async def process_one_card(
+    page,
+    card,
+    index: int,
+    identifier: str,
+    upscale_failures: List[str],
+    download_failures: List[tuple],
+    media_info,
+    manifest: Optional[MediaManifest] = None,
+):
+    if not card_needs_work(identifier, media_info):
+        return
+
+    print(f"\n{t('card_processing', index=index + 1, identifier=identifier)}")
+    record_failure = card_failure_recorder(identifier, download_failures)
+
+    with span("card", identifier=identifier, index=index):
+        with span("card.open"):
+            if card is not None:
+                opened = await _open_card(page, card, identifier, record_failure)
+            else:
+                opened = await _open_card_detail(page, identifier, record_failure)
+        if not opened:
+            return
+
+        try:
+            with span("card.media"):
+                await _download_card_media(page, index, identifier, upscale_failures, record_failure, media_info, manifest)
+        except Exception as error:
+            if is_browser_closed_error(error):
+                raise
+            record_failure(t("video_processing_error", index=index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        finally:
+            if card is not None:
+                with span("card.back"):
+                    await _return_to_gallery(page)
+            metrics.cards_processed.inc()
+
+
+async def prepare_page(page):
+    if config.ENABLE_ASSET_ROUTING and page.context.browser is not None:
+
+        async def asset_header_rewrite(route, request):
+            await route.continue_(headers=asset_request_headers(request.headers))
+
+        await page.route(config.ASSET_URL_PATTERN, asset_header_rewrite)
+
+    policy = configured_policy()
+    if policy is not None:
+        await page.route("**/*", policy.handle_async)
+
+    await page.add_init_script(config.INIT_SCRIPT)
+    return page
+
+
+async def open_gallery(page) -> bool:
+    print(t("gallery_opening"))
+    response = await page.goto(config.FAVORITES_URL, wait_until="domcontentloaded")
+
+    if response and response.status == 403:
+        print_error(t("forbidden_error"))
+        print(t("forbidden_help"))
+        return False
+
+    if await page.query_selector(config.GALLERY_LISTITEM_SELECTOR) is None:
+        await wait_until_async(page, config.INITIAL_PAGE_WAIT_MS, selector_ready(config.GALLERY_LISTITEM_SELECTOR))
+    try:
+        await page.wait_for_selector(config.GALLERY_LISTITEM_SELECTOR, timeout=config.GALLERY_LOAD_TIMEOUT_MS)
+    except PWTimeout:
+        print_error(t("gallery_load_failed"))
+        return False
+    return True
+
+
+async def _card_worker(worker_id: int, context, card_queue: asyncio.Queue, state: dict):
+    set_track(f"worker-{worker_id}")
+    page = await prepare_page(await context.new_page())
+    # With CARD_NAVIGATION=tab the worker page only opens detail routes and never needs the gallery.
+    by_route = config.CARD_NAVIGATION == "tab"
+    try:
+        if not by_route and not await open_gallery(page):
+            return
+        while True:
+            item = await card_queue.get()
+            try:
+                if item is None:
+                    break
+                identifier, media_info, offset = item
+                card = None
+                if not by_route:
+                    with span("card.locate", identifier=identifier):
+                        card = await locate_card(page, identifier, offset)
+                    if card is None:
+                        record_card_not_found(identifier, state["download_failures"])
+                        continue
+                index = state["processed_count"]
+                state["processed_count"] += 1
+                await process_one_card(page, card, index, identifier, state["upscale_failures"], state["download_failures"], media_info, state["manifest"])
+                state["checkpoint"].finish(identifier)
+            except Exception as error:
+                if is_browser_closed_error(error):
+                    raise
+                print_error(t("worker_card_error", worker=worker_id, identifier=item[0], error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            finally:
+                card_queue.task_done()
+    finally:
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+
+async def launch_context(playwright, cookies):
+    if config.BROWSER_SERVER_URL:
+        try:
+            browser = await playwright.chromium.connect_over_cdp(config.BROWSER_SERVER_URL)
+        except Exception as error:
+            print_error(t("browser_server_connect_failed", url=config.BROWSER_SERVER_URL, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        else:
+            context = await browser.new_context(**context_options())
+            await context.add_cookies(cookies)
+            return context
+    if not config.PERSISTENT_PROFILE:
+        browser = await playwright.chromium.launch(**launch_options())
+        context = await browser.new_context(**context_options())
+        await context.add_cookies(cookies)
+        return context
+    # All async workers share one context, so a single profile is enough.
+    user_data_dir = profile_dir("main")
+    context = await playwright.chromium.launch_persistent_context(**persistent_context_options(user_data_dir))
+    if cookies_need_import(user_data_dir):
+        await context.add_cookies(cookies)
+        mark_cookies_imported(user_data_dir)
+    return context
+
+
+async def close_context(context) -> None:
+    browser = context.browser
+    try:
+        await context.close()
+    finally:
+        if browser is not None:
+            await browser.close()
+
+
+def unsupported_options() -> List[str]:
+    """Settings that are on but only implemented by the sync runner; the async engine refuses to start with them."""
+    options = []
+    if config.BACKGROUND_TRANSFERS:
+        options.append("BACKGROUND_TRANSFERS")
+    if config.UPSCALE_MODE == "pipelined" and config.UPSCALE_VIDEOS:
+        options.append("UPSCALE_MODE=pipelined")
+    if config.DISCOVERY_MODE == "network":
+        options.append("DISCOVERY_MODE=network")
+    return options
+
+
+async def run_async():
+    if not config.DOWNLOAD_VIDEOS and not config.DOWNLOAD_IMAGES:
+        print_error(t("no_media_enabled"))
+        return
+    unsupported = unsupported_options()
+    if unsupported:
+        for option in unsupported:
+            print_error(t("async_option_unsupported", option=option))
+        return
+
+    cookie_header = load_cookie_header(config.COOKIE_FILE)
+    cookies = cookie_header_to_list(cookie_header, ".grok.com")
+    start_tracing()
+    start_metrics()
+
+    async with async_playwright() as playwright:
+        context = await launch_context(playwright, cookies)
+        page = await prepare_page(await context.new_page())
+        if config.ENABLE_INCREMENTAL_SCAN:
+            await page.add_init_script(build_scanner_script(config.CARDS_CSS_SELECTOR))
+
+        with span("gallery.open"):
+            gallery_opened = await open_gallery(page)
+        if not gallery_opened:
+            finish_tracing()
+            stop_metrics()
+            await close_context(context)
+            return
+
+        requeue_corrupt_media()
+        previous = resume_checkpoint()
+        checkpoint = previous if previous is not None else RunCheckpoint(config.CHECKPOINT_FILE)
+        resume_settled = set(previous.settled) if previous is not None else set()
+        state = {
+            "upscale_failures": [],
+            "download_failures": [],
+            "processed_count": 0,
+            "manifest": open_manifest(),
+            "checkpoint": checkpoint,
+        }
+        worker_count = max(1, config.WORKERS)
+        card_queue: asyncio.Queue = asyncio.Queue()
+        metrics.queue_depth.set_function(card_queue.qsize, queue="cards")
+        workers = [asyncio.create_task(_card_worker(worker_id, context, card_queue, state)) for worker_id in range(1, worker_count + 1)]
+        print(t("workers_started", count=worker_count))
+
+        seen_ids = set()
+        no_new_card_scrolls = 0
+        completed = False
+
+        try:
+            if previous is not None:
+                for identifier, offset in previous.retry_items():
+                    seen_ids.add(identifier)
+                    checkpoint.queue(identifier, offset)
+                    media_info = await asyncio.to_thread(triage_card, identifier, state["manifest"], checkpoint)
+                    if media_info is not None:
+                        card_queue.put_nowait((identifier, media_info, offset))
+                # After a completed run the gallery is scanned from the top again to pick up new cards.
+                if previous.scan_offset and not previous.complete:
+                    with span("gallery.resume_scroll"):
+                        await scroll_toward(page, previous.scan_offset)
+
+            while True:
+                any_new_cards_found = False
+                checkpoint.record_failures(state["upscale_failures"], state["download_failures"])
+                checkpoint.save_if_due()
+
+                with span("gallery.drain"):
+                    harvested_cards = await drain_cards(page, config.ENABLE_INCREMENTAL_SCAN)
+                for harvested in harvested_cards:
+                    identifier = harvested.identifier
+                    if identifier in seen_ids:
+                        continue
+                    seen_ids.add(identifier)
+                    any_new_cards_found = True
+                    metrics.cards_discovered.inc()
+                    checkpoint.seen_at(harvested.top)
+                    if identifier in resume_settled:
+                        metrics.cards_skipped.inc(reason="checkpoint")
+                        continue
+
+                    media_info = await asyncio.to_thread(triage_card, identifier, state["manifest"], checkpoint)
+                    if media_info is None:
+                        continue
+                    checkpoint.queue(identifier, harvested.top)
+                    card_queue.put_nowait((identifier, media_info, harvested.top))
+
+                if any_new_cards_found:
+                    no_new_card_scrolls = 0
+                    continue
+
+                no_new_card_scrolls += 1
+                if no_new_card_scrolls >= config.MAX_SCROLLS_WITHOUT_NEW_CARDS:
+                    print(f"\n{t('processing_complete')}")
+                    completed = True
+                    break
+
+                attempt_txt = f" ({no_new_card_scrolls + 1}/{config.MAX_SCROLLS_WITHOUT_NEW_CARDS})"
+                print(f"{t('no_cards_scroll')}{attempt_txt}")
+                with span("gallery.scroll", attempt=no_new_card_scrolls + 1):
+                    card_count = await page.locator(config.CARDS_CSS_SELECTOR).count()
+                    await wait_until_async(page, config.WAIT_IDLE_LOOP_MS, cards_added(card_count))
+                    await scroll_to_load_more(page, direction="down", ready=cards_added(card_count))
+                    await wait_until_async(page, config.WAIT_IDLE_LOOP_MS, cards_added(card_count))
+
+            print(t("workers_waiting", count=card_queue.qsize()))
+            for _ in workers:
+                card_queue.put_nowait(None)
+            results = await asyncio.gather(*workers, return_exceptions=True)
+            for worker_id, result in enumerate(results, start=1):
+                if isinstance(result, Exception):
+                    print_error(t("worker_crashed", worker=worker_id, error=f"{config.COLOR_GRAY}{result}{config.COLOR_RESET}"))
+        except Exception as error:
+            combined = f"{t('process_interrupted')}\n\n{config.COLOR_GRAY}{error}{config.COLOR_RESET}"
+            print_error(combined)
+            if not is_browser_closed_error(error):
+                raise
+        finally:
+            unfinished = [worker for worker in workers if not worker.done()]
+            for worker in unfinished:
+                worker.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+            while not card_queue.empty():
+                item = card_queue.get_nowait()
+                if item is not None:
+                    state["download_failures"].append((item[0], t("worker_unavailable_reason")))
+                    metrics.download_failures.inc()
+            checkpoint.record_failures(state["upscale_failures"], state["download_failures"])
+            checkpoint.close(completed)
+            print_run_summary(state["upscale_failures"], state["download_failures"])
+            print_wait_savings()
+            print_block_savings()
+            finish_tracing()
+            metrics.queue_depth.set_function(None, queue="cards")
+            stop_metrics()
+            if state["manifest"] is not None:
+                state["manifest"].close()
+            close_session()
+            try:
+                await close_context(context)
+            except Exception:
+                pass
+
+
+__all__ = ["run_async", "unsupported_options"]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import os
+
+from playwright.sync_api import TimeoutError as PWTimeout
+
+from . import config
+from .adaptive_wait import selector_ready, wait_until
+from .localization import print_error, t
+from .resource_policy import configured_policy
+
+
+def launch_options() -> dict:
+    return {"channel": config.BROWSER_CHANNEL, "headless": config.HEADLESS, "args": config.BROWSER_LAUNCH_ARGS}
+
+
+def context_options() -> dict:
+    return {
+        "accept_downloads": True,
+        "user_agent": config.USER_AGENT,
+        "viewport": {"width": config.VIEWPORT_WIDTH, "height": config.VIEWPORT_HEIGHT},
+        "locale": config.BROWSER_LOCALE,
+        "timezone_id": config.BROWSER_TIMEZONE,
+        "color_scheme": config.BROWSER_COLOR_SCHEME,
+        "extra_http_headers": config.CONTEXT_HEADERS,
+    }
+
+
+def asset_request_headers(request_headers: dict) -> dict:
+    headers = dict(request_headers)
+    headers.update(config.ASSET_BASE_HEADERS)
+    headers.setdefault("user-agent", config.USER_AGENT)
+    return headers
+
+
+def launch_browser(playwright):
+    return playwright.chromium.launch(**launch_options())
+
+
+def new_browser_context(browser, cookies):
+    context = browser.new_context(**context_options())
+    context.add_cookies(cookies)
+    return context
+
+
+COOKIE_STAMP_FILE = "cookies-imported"
+
+
+def profile_dir(name: str) -> str:
+    """User-data dir of one browser; Chromium locks a profile, so every concurrent browser gets its own."""
+    path = os.path.abspath(os.path.join(config.BROWSER_PROFILE_DIR, name))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def persistent_context_options(user_data_dir: str) -> dict:
+    options = launch_options()
+    options.update(context_options())
+    options["user_data_dir"] = user_data_dir
+    return options
+
+
+def _cookie_file_stamp() -> str:
+    try:
+        stat = os.stat(config.COOKIE_FILE)
+    except OSError:
+        return ""
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def cookies_need_import(user_data_dir: str) -> bool:
+    """True for a new profile or when the cookie file changed since it was last imported.
+
+    Otherwise the profile's own session is kept, including cookies the site refreshed during earlier runs.
+    """
+    try:
+        with open(os.path.join(user_data_dir, COOKIE_STAMP_FILE), "r", encoding="utf-8") as handle:
+            return handle.read().strip() != _cookie_file_stamp()
+    except OSError:
+        return True
+
+
+def mark_cookies_imported(user_data_dir: str) -> None:
+    with open(os.path.join(user_data_dir, COOKIE_STAMP_FILE), "w", encoding="utf-8") as handle:
+        handle.write(_cookie_file_stamp())
+
+
+def connect_browser_server(playwright):
+    """The browser kept running by ``browser_server.py``, or None (with a warning) when it cannot be reached."""
+    try:
+        return playwright.chromium.connect_over_cdp(config.BROWSER_SERVER_URL)
+    except Exception as error:
+        print_error(t("browser_server_connect_failed", url=config.BROWSER_SERVER_URL, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        return None
+
+
+def launch_context(playwright, cookies, profile: str = "main"):
+    """A new context in the browser server, a fresh browser, or the persistent ``profile`` when ``PERSISTENT_PROFILE`` is on."""
+    if config.BROWSER_SERVER_URL:
+        browser = connect_browser_server(playwright)
+        if browser is not None:
+            return new_browser_context(browser, cookies)
+    if not config.PERSISTENT_PROFILE:
+        return new_browser_context(launch_browser(playwright), cookies)
+    user_data_dir = profile_dir(profile)
+    context = playwright.chromium.launch_persistent_context(**persistent_context_options(user_data_dir))
+    if cookies_need_import(user_data_dir):
+        context.add_cookies(cookies)
+        mark_cookies_imported(user_data_dir)
+    return context
+
+
+def close_context(context) -> None:
+    """Close the context and the browser behind it.
+
+    A persistent context has no separate browser; for the browser server, closing only disconnects.
+    """
+    browser = context.browser
+    try:
+        context.close()
+    finally:
+        if browser is not None:
+            browser.close()
+
+
+def prepare_page(page):
+    # A persistent profile (the only context without a browser) is kept for its HTTP cache, which Playwright
+    # turns off while any route is active, so the optional header rewrite is skipped there.
+    if config.ENABLE_ASSET_ROUTING and page.context.browser is not None:
+
+        def asset_header_rewrite(route, request):
+            route.continue_(headers=asset_request_headers(request.headers))
+
+        page.route(config.ASSET_URL_PATTERN, asset_header_rewrite)
+
+    # Registered last so it runs first; requests it lets through fall back to the header rewrite above.
+    policy = configured_policy()
+    if policy is not None:
+        page.route("**/*", policy.handle)
+
+    page.add_init_script(config.INIT_SCRIPT)
+    return page
+
+
+def open_gallery(page) -> bool:
+    print(t("gallery_opening"))
+    response = page.goto(config.FAVORITES_URL, wait_until="domcontentloaded")
+
+    if response and response.status == 403:
+        print_error(t("forbidden_error"))
+        print(t("forbidden_help"))
+        return False
+
+    # A warm profile often renders the gallery from cache before goto returns.
+    if page.query_selector(config.GALLERY_LISTITEM_SELECTOR) is None:
+        wait_until(page, config.INITIAL_PAGE_WAIT_MS, selector_ready(config.GALLERY_LISTITEM_SELECTOR))
+    try:
+        page.wait_for_selector(config.GALLERY_LISTITEM_SELECTOR, timeout=config.GALLERY_LOAD_TIMEOUT_MS)
+    except PWTimeout:
+        print_error(t("gallery_load_failed"))
+        return False
+    return True
+
+
+__all__ = ["launch_browser", "new_browser_context", "launch_context", "close_context", "prepare_page", "open_gallery"]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import signal
+import time
+import urllib.request
+from typing import Optional
+
+from playwright.sync_api import sync_playwright
+
+from . import config
+from .browser import launch_options
+from .localization import print_error, t
+
+
+def endpoint_url(port: int) -> str:
+    return f"http://127.0.0.1:{port}"
+
+
+def browser_version(url: str, timeout: float = 5.0) -> Optional[str]:
+    """The browser's ``/json/version`` answer on the DevTools endpoint, or None if it does not respond."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/json/version", timeout=timeout) as response:
+            return json.load(response).get("Browser") or "unknown"
+    except (OSError, ValueError):
+        return None
+
+
+def open_page_count(url: str, timeout: float = 5.0) -> Optional[int]:
+    """Pages open in the browser according to ``/json/list`` (clients' tabs), or None if it does not respond."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/json/list", timeout=timeout) as response:
+            targets = json.load(response)
+    except (OSError, ValueError):
+        return None
+    return sum(1 for target in targets if isinstance(target, dict) and target.get("type") == "page")
+
+
+def server_launch_options(port: int) -> dict:
+    options = launch_options()
+    # Bound to loopback only: the DevTools endpoint gives full control over the browser.
+    options["args"] = list(options["args"]) + [f"--remote-debugging-port={port}", "--remote-debugging-address=127.0.0.1"]
+    return options
+
+
+class BrowserSupervisor:
+    """Keeps one browser with a DevTools endpoint running for ``BROWSER_SERVER_URL`` clients.
+
+    The browser is relaunched when the endpoint misses ``failure_threshold`` checks in a row, and once it is
+    older than ``max_age_hours`` and no run has a page open in it. Runs only create and close their own contexts in it.
+    """
+
+    def __init__(self, port: int, check_interval: float = 30.0, max_age_hours: float = 24.0, failure_threshold: int = 3):
+        self.port = port
+        self.url = endpoint_url(port)
+        self.check_interval = max(1.0, check_interval)
+        self.max_age = max_age_hours * 3600 if max_age_hours > 0 else 0
+        self.failure_threshold = max(1, failure_threshold)
+        self._browser = None
+        self._started = 0.0
+        self._stopping = False
+        self._failures = 0
+
+    def _launch(self, playwright) -> None:
+        self._browser = playwright.chromium.launch(**server_launch_options(self.port))
+        self._started = time.monotonic()
+        version = None
+        deadline = time.monotonic() + 15
+        while version is None and time.monotonic() < deadline:
+            version = browser_version(self.url, timeout=2)
+            if version is None:
+                time.sleep(0.5)
+        if version is None:
+            raise RuntimeError(t("browser_server_no_endpoint", url=self.url))
+        print(t("browser_server_ready", url=self.url, version=version))
+
+    def _close(self) -> None:
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            try:
+                browser.close()
+            except Exception:
+                pass
+
+    def _restart_reason(self) -> Optional[str]:
+        if browser_version(self.url) is None:
+            self._failures += 1
+            return t("browser_server_unhealthy") if self._failures >= self.failure_threshold else None
+        self._failures = 0
+        if self.max_age and time.monotonic() - self._started >= self.max_age and open_page_count(self.url) == 0:
+            return t("browser_server_max_age")
+        return None
+
+    def _launch_until_ready(self, playwright) -> None:
+        delay = self.check_interval
+        while not self._stopping:
+            try:
+                self._launch(playwright)
+                self._failures = 0
+                return
+            except Exception as error:
+                self._close()
+                print_error(t("browser_server_launch_failed", seconds=int(delay), error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+                self._sleep(delay)
+                delay = min(delay * 2, 600)
+
+    def _sleep(self, seconds: float) -> None:
+        slept = 0.0
+        while slept < seconds and not self._stopping:
+            time.sleep(0.5)
+            slept += 0.5
+
+    def stop(self, *_args) -> None:
+        self._stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        with sync_playwright() as playwright:
+            try:
+                self._launch_until_ready(playwright)
+                while not self._stopping:
+                    self._sleep(self.check_interval)
+                    if self._stopping:
+                        break
+                    reason = self._restart_reason()
+                    if reason is not None:
+                        print(t("browser_server_restarting", reason=reason))
+                        self._close()
+                        self._launch_until_ready(playwright)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self._close()
+                print(t("browser_server_stopped"))
+
+
+def main() -> None:
+    if config.BROWSER_SERVER_PORT <= 0:
+        print_error(t("browser_server_no_port"))
+        return
+    if browser_version(endpoint_url(config.BROWSER_SERVER_PORT), timeout=2) is not None:
+        print_error(t("browser_server_port_in_use", url=endpoint_url(config.BROWSER_SERVER_PORT)))
+        return
+    BrowserSupervisor(config.BROWSER_SERVER_PORT, config.BROWSER_SERVER_CHECK_SEC, config.BROWSER_SERVER_RESTART_HOURS).run()
+
+
+__all__ = ["BrowserSupervisor", "browser_version", "endpoint_url", "open_page_count", "main"]
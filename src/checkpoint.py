@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import config
+from .localization import print_error, t
+
+
+class RunCheckpoint:
+    """Settled, pending and failed cards of a run; offsets are kept only for cards that are not settled."""
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.settled: Set[str] = set()
+        self.pending: Set[str] = set()
+        self.failed: Dict[str, str] = {}
+        self.offsets: Dict[str, float] = {}
+        self.scan_offset = 0.0
+        self.complete = False
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+
+    def load(self) -> "RunCheckpoint":
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as error:
+            print_error(t("checkpoint_read_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            return self
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return self
+        try:
+            settled = {str(identifier) for identifier in data.get("settled", [])}
+            pending = {str(identifier): offset for identifier, offset in data.get("pending", [])}
+            failed = {str(identifier): (str(reason), offset) for identifier, reason, offset in data.get("failed", [])}
+            offsets = {identifier: float(offset) for identifier, offset in pending.items() if offset is not None}
+            offsets.update((identifier, float(offset)) for identifier, (_, offset) in failed.items() if offset is not None)
+            scan_offset = float(data.get("scan_offset") or 0)
+        except (TypeError, ValueError) as error:
+            print_error(t("checkpoint_read_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            return self
+        self.settled = settled
+        self.pending = set(pending)
+        self.failed = {identifier: reason for identifier, (reason, _) in failed.items()}
+        self.offsets = offsets
+        self.scan_offset = scan_offset
+        self.complete = bool(data.get("complete"))
+        return self
+
+    @property
+    def empty(self) -> bool:
+        return not (self.settled or self.pending or self.failed)
+
+    def seen_at(self, offset: Optional[float]) -> None:
+        if offset is not None:
+            with self._lock:
+                self.scan_offset = max(self.scan_offset, offset)
+
+    def queue(self, identifier: str, offset: Optional[float] = None) -> None:
+        with self._lock:
+            self.failed.pop(identifier, None)
+            self.settled.discard(identifier)
+            self.pending.add(identifier)
+            if offset is not None:
+                self.offsets[identifier] = offset
+
+    def finish(self, identifier: str) -> None:
+        with self._lock:
+            self.pending.discard(identifier)
+            if identifier not in self.failed:
+                self.settled.add(identifier)
+
+    def record_failures(self, upscale_failures: Iterable[str], download_failures: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            for identifier in upscale_failures:
+                self._fail(identifier, t("checkpoint_upscale_reason"))
+            for identifier, reason in download_failures:
+                self._fail(identifier, reason)
+
+    def _fail(self, identifier: str, reason: str) -> None:
+        self.pending.discard(identifier)
+        self.settled.discard(identifier)
+        self.failed.setdefault(identifier, reason)
+
+    def retry_items(self) -> List[Tuple[str, Optional[float]]]:
+        with self._lock:
+            identifiers = list(self.pending) + [identifier for identifier in self.failed if identifier not in self.pending]
+            return [(identifier, self.offsets.get(identifier)) for identifier in identifiers]
+
+    def save(self, in_flight: Iterable[str] = ()) -> None:
+        # Unfinished background transfers are saved as pending.
+        with self._lock:
+            pending = (self.pending | set(in_flight)) - self.failed.keys()
+            data = {
+                "version": self.VERSION,
+                "saved_at": time.time(),
+                "complete": self.complete,
+                "scan_offset": self.scan_offset,
+                "settled": sorted(self.settled - pending),
+                "pending": [[identifier, self.offsets.get(identifier)] for identifier in sorted(pending)],
+                "failed": [[identifier, reason, self.offsets.get(identifier)] for identifier, reason in sorted(self.failed.items())],
+            }
+            self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as error:
+            print_error(t("checkpoint_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+    def save_if_due(self, in_flight: Iterable[str] = ()) -> None:
+        if config.CHECKPOINT_INTERVAL_SEC > 0 and time.monotonic() - self._last_save >= config.CHECKPOINT_INTERVAL_SEC:
+            self.save(in_flight)
+
+    def close(self, completed: bool, in_flight: Iterable[str] = ()) -> None:
+        self.complete = completed
+        if completed and not self.pending and not self.failed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            return
+        self.save(in_flight)
+        print(t("checkpoint_saved", path=self.path))
+
+
+def resume_checkpoint() -> Optional[RunCheckpoint]:
+    if not config.RESUME:
+        return None
+    checkpoint = RunCheckpoint(config.CHECKPOINT_FILE).load()
+    if checkpoint.empty:
+        print(t("checkpoint_none"))
+        return None
+    print(t("checkpoint_resuming", settled=len(checkpoint.settled), retry=len(checkpoint.pending) + len(checkpoint.failed)))
+    return checkpoint
+
+
+__all__ = ["RunCheckpoint", "resume_checkpoint"]
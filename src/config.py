@@ -40,6 +40,10 @@ def env_int(key: str, default: int) -> int:
         return default
 
 
+def env_list(key: str, default: str) -> list:
+    return [item.strip() for item in os.getenv(key, default).split(",") if item.strip()]
+
+
 FAVORITES_URL = os.getenv("FAVORITES_URL", "https://grok.com/imagine/favorites")
 USER_AGENT = os.getenv("USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36")
 COOKIE_FILE = os.getenv("COOKIE_FILE", "cookies.txt")
@@ -54,6 +58,8 @@ WAIT_AFTER_MENU_INTERACTION_MS = env_int("WAIT_AFTER_MENU_INTERACTION_MS", 400)
 WAIT_AFTER_BACK_BUTTON_MS = env_int("WAIT_AFTER_BACK_BUTTON_MS", 400)
 WAIT_IDLE_LOOP_MS = env_int("WAIT_IDLE_LOOP_MS", 300)
 INITIAL_PAGE_WAIT_MS = env_int("INITIAL_PAGE_WAIT_MS", 5000)
+ADAPTIVE_WAITS = env_bool("ADAPTIVE_WAITS", True)  # the waits above become upper bounds that end on readiness signals
+ADAPTIVE_WAIT_FLOOR_MS = env_int("ADAPTIVE_WAIT_FLOOR_MS", 150)
 
 # Scroll and interaction settings
 MOUSE_SCROLL = env_int("MOUSE_SCROLL", 400)
@@ -62,6 +68,19 @@ SCROLL_PAUSE_MS = env_int("SCROLL_PAUSE_MS", 800)
 MAX_SCROLLS_WITHOUT_NEW_CARDS = env_int("MAX_SCROLLS_WITHOUT_NEW_CARDS", 3)
 SEARCH_SCROLL_UP_ATTEMPTS = env_int("SEARCH_SCROLL_UP_ATTEMPTS", 2)
 SEARCH_SCROLL_DOWN_ATTEMPTS = env_int("SEARCH_SCROLL_DOWN_ATTEMPTS", 5)
+ENABLE_INCREMENTAL_SCAN = env_bool("ENABLE_INCREMENTAL_SCAN", True)
+
+# Card discovery (dom scrolls the gallery; network reads the favorites listing API and keeps scrolling as a fallback)
+DISCOVERY_MODE = os.getenv("DISCOVERY_MODE", "dom").strip().lower()  # dom | network
+LISTING_URL_PATTERN = os.getenv("LISTING_URL_PATTERN", "**/rest/media/post/list*")
+LISTING_RECORD_DIR = os.getenv("LISTING_RECORD_DIR", "")
+LISTING_REPLAY_DIR = os.getenv("LISTING_REPLAY_DIR", "")
+
+# Concurrency (number of workers processing cards while the main page keeps scanning)
+WORKERS = env_int("WORKERS", 1)
+ENGINE = os.getenv("ENGINE", "sync").strip().lower()  # sync | async
+BACKGROUND_TRANSFERS = env_bool("BACKGROUND_TRANSFERS", False)
+TRANSFER_WORKERS = env_int("TRANSFER_WORKERS", 4)
 
 # Playwright settings
 BROWSER_CHANNEL = os.getenv("BROWSER_CHANNEL", "chrome")
@@ -70,6 +89,14 @@ VIEWPORT_HEIGHT = env_int("VIEWPORT_HEIGHT", 800)
 BROWSER_LOCALE = os.getenv("BROWSER_LOCALE", "en-US")
 BROWSER_TIMEZONE = os.getenv("BROWSER_TIMEZONE", "Europe/Paris")
 BROWSER_COLOR_SCHEME = os.getenv("BROWSER_COLOR_SCHEME", "dark")
+# Persistent profile (HTTP cache, service worker and session kept between runs; one subfolder per browser)
+PERSISTENT_PROFILE = env_bool("PERSISTENT_PROFILE", False)
+BROWSER_PROFILE_DIR = os.getenv("BROWSER_PROFILE_DIR", "browser-profile")
+# Browser server (runs attach to a browser kept alive by browser_server.py instead of launching one)
+BROWSER_SERVER_URL = os.getenv("BROWSER_SERVER_URL", "").strip()  # e.g. http://127.0.0.1:9222; empty launches a browser per run
+BROWSER_SERVER_PORT = env_int("BROWSER_SERVER_PORT", 9222)
+BROWSER_SERVER_CHECK_SEC = env_int("BROWSER_SERVER_CHECK_SEC", 30)
+BROWSER_SERVER_RESTART_HOURS = env_int("BROWSER_SERVER_RESTART_HOURS", 24)
 
 BROWSER_LAUNCH_ARGS = [
     "--disable-blink-features=AutomationControlled",
@@ -105,11 +132,43 @@ Object.defineProperty(navigator, 'maxTouchPoints', {get: () => 0});
 DOWNLOAD_VIDEOS = env_bool("DOWNLOAD_VIDEOS", True)
 DOWNLOAD_IMAGES = env_bool("DOWNLOAD_IMAGES", False)
 UPSCALE_VIDEO_WIDTH = env_int("UPSCALE_VIDEO_WIDTH", 928)
+FFPROBE_CROSS_CHECK = env_bool("FFPROBE_CROSS_CHECK", False)
 UPSCALE_VIDEOS = env_bool("UPSCALE_VIDEOS", True)
 UPSCALE_TIMEOUT_MS = env_int("UPSCALE_TIMEOUT_MS", 20 * 1000)
+UPSCALE_MODE = os.getenv("UPSCALE_MODE", "inline").strip().lower()  # inline | pipelined
+PIPELINE_HD_CHECK_TIMEOUT_MS = env_int("PIPELINE_HD_CHECK_TIMEOUT_MS", 3000)
+DEFERRED_UPSCALES_FILE = os.getenv("DEFERRED_UPSCALES_FILE", os.path.join(DOWNLOAD_DIR, "deferred_upscales.json"))
+
+# Card navigation: "click" opens cards from the gallery and clicks Back; "tab" opens each card's detail
+# route (CARD_DETAIL_PATH, {id} is the post id) in a separate tab so the gallery tab is never disturbed
+CARD_NAVIGATION = os.getenv("CARD_NAVIGATION", "click").strip().lower()
+CARD_DETAIL_PATH = os.getenv("CARD_DETAIL_PATH", "/imagine/post/{id}")
+
+# Checkpoint (run progress saved every CHECKPOINT_INTERVAL_SEC and on exit; RESUME=true continues from it)
+CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", os.path.join(DOWNLOAD_DIR, "run_checkpoint.json"))
+CHECKPOINT_INTERVAL_SEC = env_int("CHECKPOINT_INTERVAL_SEC", 30)
+RESUME = env_bool("RESUME", False)
+
+# Media manifest (SQLite record of downloaded files, avoids re-probing unchanged videos)
+ENABLE_MEDIA_MANIFEST = env_bool("ENABLE_MEDIA_MANIFEST", True)
+MEDIA_MANIFEST_FILE = os.getenv("MEDIA_MANIFEST_FILE", os.path.join(DOWNLOAD_DIR, "manifest.sqlite3"))
+
+# Integrity check (verify.py writes corrupt files here; the next run sets them aside and downloads them again)
+VERIFY_REPORT_FILE = os.getenv("VERIFY_REPORT_FILE", os.path.join(DOWNLOAD_DIR, "corrupt_media.json"))
+VERIFY_WORKERS = env_int("VERIFY_WORKERS", 16)
+
+# Tracing (per-card phase timings written as JSONL and a Chrome trace; empty disables tracing)
+TRACE_DIR = os.getenv("TRACE_DIR", "").strip()
+
+# Metrics (Prometheus textfile rewritten every METRICS_INTERVAL_SEC and/or a local /metrics endpoint; both off by default)
+METRICS_FILE = os.getenv("METRICS_FILE", "").strip()
+METRICS_PORT = env_int("METRICS_PORT", 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+METRICS_INTERVAL_SEC = env_int("METRICS_INTERVAL_SEC", 15)
 
 # Selectors
 CARDS_XPATH = "//div[contains(@class,'group/media-post-masonry-card')]"
+CARDS_CSS_SELECTOR = "div[class*='group/media-post-masonry-card']"
 GALLERY_LISTITEM_SELECTOR = "div[role='listitem']"
 HD_BUTTON_SELECTOR = "button:has(div:text('HD'))"
 IMAGE_FALLBACK_SELECTOR = "img.object-cover[src], img[src*='imagine-public'][src], img[src*='imagine'][src]"
@@ -124,6 +183,13 @@ VIDEO_IMAGE_TOGGLE_TIMEOUT_MS = env_int("VIDEO_IMAGE_TOGGLE_TIMEOUT_MS", 2000)
 
 # HTTP timeouts (in seconds)
 HTTP_REQUEST_TIMEOUT_SEC = env_int("HTTP_REQUEST_TIMEOUT_SEC", 60)
+DOWNLOAD_CHUNK_SIZE_KB = env_int("DOWNLOAD_CHUNK_SIZE_KB", 1024)
+DOWNLOAD_RETRIES = env_int("DOWNLOAD_RETRIES", 2)
+
+# Shared HTTP connection pool for downloads outside the browser
+HTTP_MAX_CONNECTIONS_PER_HOST = env_int("HTTP_MAX_CONNECTIONS_PER_HOST", 0)  # 0 = size to WORKERS / TRANSFER_WORKERS
+HTTP_POOL_HOSTS = env_int("HTTP_POOL_HOSTS", 4)
+HTTP2 = env_bool("HTTP2", False)
 
 # Filename patterns
 DEFAULT_FILENAME_PATTERN = "video_{index}.mp4"
@@ -132,6 +198,16 @@ DEFAULT_FILENAME_PATTERN = "video_{index}.mp4"
 ENABLE_ASSET_ROUTING = env_bool("ENABLE_ASSET_ROUTING", True)
 ASSET_URL_PATTERN = os.getenv("ASSET_URL_PATTERN", "https://assets.grok.com/*")
 
+# Request blocking (non-essential page requests are aborted; blocked images get a 1x1 placeholder so img src stays intact)
+BLOCK_RESOURCES = env_bool("BLOCK_RESOURCES", False)
+BLOCK_RESOURCE_TYPES = [kind.lower() for kind in env_list("BLOCK_RESOURCE_TYPES", "media,font")]
+BLOCK_URL_PATTERNS = env_list(
+    "BLOCK_URL_PATTERNS",
+    "*google-analytics.com/*,*googletagmanager.com/*,*doubleclick.net/*,*sentry.io/*,*/cdn-cgi/rum*,*segment.io/*,*mixpanel.com/*,*statsig*",
+)
+BLOCK_ALLOW_PATTERNS = env_list("BLOCK_ALLOW_PATTERNS", "")
+BLOCK_MEASURE_SAVINGS = env_bool("BLOCK_MEASURE_SAVINGS", False)  # size each blocked media/image/font URL once for the summary
+
 ASSET_BASE_HEADERS = {
     "accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
     "accept-language": "hu-HU,hu;q=0.9,en-US;q=0.8,en;q=0.7",
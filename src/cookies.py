@@ -33,3 +33,7 @@ def cookie_header_to_list(header: str, domain: str):
             }
         )
     return cookies
+
+
+def cookies_to_header(cookies) -> str:
+    return "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies if cookie.get("name"))
@@ -2,22 +2,32 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Container, Iterable, List, Optional, Tuple
 
 from playwright.sync_api import TimeoutError as PWTimeout, sync_playwright
 
-from . import config
+from . import config, metrics
+from .adaptive_wait import animations_done, scroll_settled, wait_until
+from .browser import close_context, launch_context, open_gallery, prepare_page
+from .checkpoint import RunCheckpoint
 from .cookies import cookie_header_to_list, load_cookie_header
-from .image_downloader import download_image_for_card
+from .gallery_scanner import CardOffsetIndex, GalleryScanner
+from .image_downloader import _download_image_from_url, download_image_for_card
+from .listing_discovery import ListingDiscovery
 from .localization import print_error, t
+from .manifest import MediaManifest
+from .metrics import start_metrics, stop_metrics
 from .playwright_utils import (
     BACK_BUTTON_SELECTOR,
+    card_detail_url,
     find_card_by_identifier,
-    get_card_identifier,
-    scroll_to_load_more,
-    wait_with_jitter,
+    is_browser_closed_error,
+    locate_card,
 )
-from .video_downloader import card_has_video_toggle, download_video_for_card, probe_video_width
+from .tracing import finish_tracing, span, start_tracing, traced
+from .transfer_pool import TransferPool
+from .upscale_pipeline import DeferredUpscales
+from .video_downloader import card_has_video_toggle, download_video_for_card, hd_version_ready, probe_video_width, request_upscale
 
 
 @dataclass
@@ -29,14 +39,19 @@ class MediaCheckResult:
     video_width: Optional[int]
 
 
-def decide_media_action(image_filename: str) -> tuple[str, MediaCheckResult]:
+def decide_media_action(image_filename: str, manifest: Optional[MediaManifest] = None) -> tuple[str, MediaCheckResult]:
     name_without_ext, _ = os.path.splitext(image_filename)
     image_path = os.path.join(config.DOWNLOAD_DIR, f"grok-image-{name_without_ext}.png")
     video_path = os.path.join(config.DOWNLOAD_DIR, f"grok-video-{name_without_ext}.mp4")
 
-    image_exists = os.path.exists(image_path)
-    video_exists = os.path.exists(video_path)
-    video_width = probe_video_width(video_path) if video_exists else None
+    if manifest is not None:
+        image_exists = manifest.file_exists(image_path)
+        video_exists = manifest.file_exists(video_path)
+        video_width = manifest.video_width(image_filename, video_path) if video_exists else None
+    else:
+        image_exists = os.path.exists(image_path)
+        video_exists = os.path.exists(video_path)
+        video_width = probe_video_width(video_path) if video_exists else None
 
     info = MediaCheckResult(
         image_path=image_path,
@@ -79,258 +94,384 @@ def media_requirements(media_info: MediaCheckResult) -> Tuple[bool, bool]:
     return need_video, need_image
 
 
-def process_one_card(
-    page,
-    card,
-    index: int,
-    identifier: str,
-    upscale_failures: List[str],
-    download_failures: List[tuple],
-    media_info,
-):
-    need_video_download, need_image_download = media_requirements(media_info)
+def print_already_downloaded(identifier: str, media_info: MediaCheckResult) -> None:
+    details = []
+    if media_info.video_exists:
+        details.append(f"🎞️ {config.COLOR_ACCENT}{media_info.video_path}{config.COLOR_RESET}")
+    if media_info.image_exists:
+        details.append(f"🖼️ {config.COLOR_ACCENT}{media_info.image_path}{config.COLOR_RESET}")
+    if details:
+        joined = "\n   ".join(details)
+        print(t("all_media_downloaded_detailed", details=joined))
+    else:
+        print(t("all_media_downloaded", identifier=identifier))
 
-    if not need_video_download and not need_image_download:
-        details = []
-        if media_info.video_exists:
-            details.append(f"🎞️ {config.COLOR_ACCENT}{media_info.video_path}{config.COLOR_RESET}")
-        if media_info.image_exists:
-            details.append(f"🖼️ {config.COLOR_ACCENT}{media_info.image_path}{config.COLOR_RESET}")
-        if details:
-            joined = "\n   ".join(details)
-            print(t("all_media_downloaded_detailed", details=joined))
-        else:
-            print(t("all_media_downloaded", identifier=identifier))
-        return
 
-    print(f"\n{t('card_processing', index=index + 1, identifier=identifier)}")
+def print_run_summary(upscale_failures: List[str], download_failures: List[tuple]) -> None:
+    if upscale_failures:
+        print(f"\n{t('upscale_warnings')}")
+        for failed in upscale_failures:
+            print(f"   • {failed}")
+    else:
+        print(f"\n{t('no_upscale_warnings')}")
 
-    def record_failure(reason: str):
-        print_error(t("download_error", reason=reason))
-        download_failures.append((identifier, reason))
+    if download_failures:
+        print(f"\n{t('download_errors')}")
+        for ident, reason in download_failures:
+            print(f"   • {ident}: {reason}")
+    else:
+        print(f"\n{t('no_download_errors')}")
+
+
+def card_needs_work(identifier: str, media_info: MediaCheckResult) -> bool:
+    """False, after reporting the skip, when the card has nothing left to download."""
+    if any(media_requirements(media_info)):
+        return True
+    print_already_downloaded(identifier, media_info)
+    metrics.cards_skipped.inc(reason="already_downloaded")
+    return False
+
+
+def triage_card(identifier: str, manifest: Optional[MediaManifest], checkpoint: RunCheckpoint) -> Optional[MediaCheckResult]:
+    """What a discovered card still needs; None once a card with nothing left to download is settled in the checkpoint."""
+    with span("card.decide", identifier=identifier):
+        _, media_info = decide_media_action(identifier, manifest)
+    if card_needs_work(identifier, media_info):
+        return media_info
+    checkpoint.finish(identifier)
+    return None
+
+
+def record_card_not_found(identifier: str, download_failures: List[tuple]) -> None:
+    print_error(t("card_not_found_after_scroll", identifier=identifier))
+    download_failures.append((identifier, t("card_not_found_reason")))
+    metrics.download_failures.inc()
 
+
+def record_video_saved(identifier: str, media_info: MediaCheckResult, upscale_failures: List[str], manifest: Optional[MediaManifest]) -> None:
+    media_info.video_exists = True
+    if manifest is not None:
+        manifest.record_video(identifier, media_info.video_path, upscaled=identifier not in upscale_failures)
+
+
+def record_image_saved(identifier: str, media_info: MediaCheckResult, manifest: Optional[MediaManifest]) -> None:
+    media_info.image_exists = True
+    if manifest is not None:
+        manifest.record_image(identifier, media_info.image_path)
+
+
+@traced("card.open")
+def open_card(page, card, identifier: str, record_failure) -> bool:
     for attempt in range(2):
         try:
             card.scroll_into_view_if_needed()
             card.wait_for(state="visible", timeout=config.CARD_VISIBILITY_TIMEOUT_MS)
-            wait_with_jitter(page, config.WAIT_AFTER_CARD_SCROLL_MS)
+            wait_until(page, config.WAIT_AFTER_CARD_SCROLL_MS, scroll_settled())
             card.click()
             print(t("card_click"))
-            break
+            return True
         except PWTimeout:
             if attempt == 0:
                 print(t("card_disappeared_retry"))
                 refreshed = find_card_by_identifier(page, identifier)
                 if refreshed is None:
                     record_failure(t("card_not_found_for_clicking"))
-                    return
+                    return False
                 card = refreshed
                 continue
             record_failure(t("card_click_timeout"))
-            return
+    return False
+
 
+@traced("card.open")
+def open_card_detail(page, identifier: str, record_failure) -> bool:
+    """Open the card's detail route in ``page``, a tab of its own, instead of clicking it in the gallery."""
+    url = card_detail_url(identifier)
     try:
+        response = page.goto(url, wait_until="domcontentloaded")
+        if response is not None and response.status >= 400:
+            record_failure(t("card_detail_failed", status=response.status, url=url))
+            return False
+        page.locator(BACK_BUTTON_SELECTOR).first.wait_for(state="visible", timeout=config.BACK_BUTTON_TIMEOUT_MS)
+    except PWTimeout:
+        record_failure(t("card_detail_timeout", url=url))
+        return False
+    print(t("card_click"))
+    return True
+
+
+@traced("card.back")
+def return_to_gallery(page):
+    try:
+        back_button = page.locator(BACK_BUTTON_SELECTOR).first
+        back_button.wait_for(state="visible", timeout=config.BACK_BUTTON_TIMEOUT_MS)
+        wait_until(page, config.WAIT_AFTER_BACK_BUTTON_MS, animations_done())
+        back_button.click()
+        page.wait_for_selector(config.GALLERY_LISTITEM_SELECTOR, timeout=config.GALLERY_LOAD_TIMEOUT_MS)
+        print(t("back_to_gallery"))
+    except Exception:
+        print(t("back_failed_continue"))
+    wait_until(page, config.WAIT_AFTER_BACK_BUTTON_MS, animations_done())
+
+
+def download_card_media(
+    page,
+    index: int,
+    identifier: str,
+    upscale_failures: List[str],
+    record_failure,
+    media_info,
+    manifest: Optional[MediaManifest] = None,
+    transfer_pool: Optional[TransferPool] = None,
+    upscale: bool = True,
+    has_video_option: Optional[bool] = None,
+):
+    need_video_download, need_image_download = media_requirements(media_info)
+    if has_video_option is None:
         has_video_option = card_has_video_toggle(page)
 
-        if need_video_download:
-            if not has_video_option:
-                print(t("skipping_no_video_option", identifier=identifier))
-            else:
-                if download_video_for_card(page, identifier, media_info, index, upscale_failures, record_failure):
-                    media_info.video_exists = True
+    if need_video_download:
+        if not has_video_option:
+            print(t("skipping_no_video_option", identifier=identifier))
+        else:
 
-        if need_image_download:
-            if download_image_for_card(page, identifier, media_info, has_video_option, record_failure):
-                media_info.image_exists = True
+            # A queued video is still in flight; it counts as existing only once its transfer has saved it.
+            def on_video_saved():
+                record_video_saved(identifier, media_info, upscale_failures, manifest)
 
-    except Exception as error:
-        record_failure(t("video_processing_error", index=index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            download_video_for_card(page, identifier, media_info, index, upscale_failures, record_failure, transfer_pool, on_video_saved, upscale)
 
-    finally:
-        try:
-            back_button = page.locator(BACK_BUTTON_SELECTOR).first
-            back_button.wait_for(state="visible", timeout=config.BACK_BUTTON_TIMEOUT_MS)
-            wait_with_jitter(page, config.WAIT_AFTER_BACK_BUTTON_MS)
-            back_button.click()
-            page.wait_for_selector(config.GALLERY_LISTITEM_SELECTOR, timeout=config.GALLERY_LOAD_TIMEOUT_MS)
-            print(t("back_to_gallery"))
-        except Exception:
-            print(t("back_failed_continue"))
-        wait_with_jitter(page, config.WAIT_AFTER_BACK_BUTTON_MS)
+    if need_image_download:
+        if download_image_for_card(page, identifier, media_info, has_video_option, record_failure):
+            record_image_saved(identifier, media_info, manifest)
 
 
-def run():
-    if not config.DOWNLOAD_VIDEOS and not config.DOWNLOAD_IMAGES:
-        print_error(t("no_media_enabled"))
+def card_failure_recorder(identifier: str, download_failures: List[tuple]):
+    def record_failure(reason: str):
+        print_error(t("download_error", reason=reason))
+        download_failures.append((identifier, reason))
+        metrics.download_failures.inc()
+
+    return record_failure
+
+
+def process_one_card(
+    page,
+    card,
+    index: int,
+    identifier: str,
+    upscale_failures: List[str],
+    download_failures: List[tuple],
+    media_info,
+    manifest: Optional[MediaManifest] = None,
+    transfer_pool: Optional[TransferPool] = None,
+):
+    """Open the card, download what it still needs and go back; without a ``card`` it is opened by its detail route."""
+    if not card_needs_work(identifier, media_info):
         return
 
-    cookie_header = load_cookie_header(config.COOKIE_FILE)
-    cookies = cookie_header_to_list(cookie_header, ".grok.com")
+    print(f"\n{t('card_processing', index=index + 1, identifier=identifier)}")
+    record_failure = card_failure_recorder(identifier, download_failures)
 
-    with sync_playwright() as playwright:
-        launch_args = config.BROWSER_LAUNCH_ARGS
-        browser = playwright.chromium.launch(channel=config.BROWSER_CHANNEL, headless=config.HEADLESS, args=launch_args)
-        context = browser.new_context(accept_downloads=True, user_agent=config.USER_AGENT, viewport={"width": config.VIEWPORT_WIDTH, "height": config.VIEWPORT_HEIGHT}, locale=config.BROWSER_LOCALE, timezone_id=config.BROWSER_TIMEZONE, color_scheme=config.BROWSER_COLOR_SCHEME, extra_http_headers=config.CONTEXT_HEADERS)
-        context.add_cookies(cookies)
-        page = context.new_page()
+    with span("card", identifier=identifier, index=index):
+        opened = open_card(page, card, identifier, record_failure) if card is not None else open_card_detail(page, identifier, record_failure)
+        if not opened:
+            return
 
-        if config.ENABLE_ASSET_ROUTING:
+        try:
+            with span("card.media"):
+                download_card_media(page, index, identifier, upscale_failures, record_failure, media_info, manifest, transfer_pool)
+        except Exception as error:
+            record_failure(t("video_processing_error", index=index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        finally:
+            if card is not None:
+                return_to_gallery(page)
+            metrics.cards_processed.inc()
 
-            def asset_header_rewrite(route, request):
-                headers = dict(request.headers)
-                headers.update(config.ASSET_BASE_HEADERS)
-                headers.setdefault("user-agent", config.USER_AGENT)
-                route.continue_(headers=headers)
 
-            page.route(config.ASSET_URL_PATTERN, asset_header_rewrite)
+def process_listed_card(
+    context,
+    index: int,
+    identifier: str,
+    upscale_failures: List[str],
+    download_failures: List[tuple],
+    media_info,
+    manifest: Optional[MediaManifest] = None,
+    transfer_pool: Optional[TransferPool] = None,
+):
+    """Open a card the listing returned but the gallery has not rendered by its detail route, in a tab of its own."""
+    print(t("listing_card_by_route", identifier=identifier))
+    detail_page = prepare_page(context.new_page())
+    try:
+        process_one_card(detail_page, None, index, identifier, upscale_failures, download_failures, media_info, manifest, transfer_pool)
+    finally:
+        try:
+            detail_page.close()
+        except Exception:
+            pass
 
-        page.add_init_script(config.INIT_SCRIPT)
 
-        print(t("gallery_opening"))
-        response = page.goto(config.FAVORITES_URL, wait_until="domcontentloaded")
+def find_gallery_card(page, identifier: str, offset: Optional[float], listed: bool = False):
+    """The card's element in the gallery, or None.
+
+    A listed card the scanner has not seen has no offset to jump to; it only gets one look at the current DOM,
+    since opening its detail route is cheaper than probing the gallery scroll by scroll.
+    """
+    with span("card.locate", identifier=identifier):
+        if listed and offset is None:
+            return find_card_by_identifier(page, identifier)
+        return locate_card(page, identifier, offset)
 
-        if response and response.status == 403:
-            print_error(t("forbidden_error"))
-            print(t("forbidden_help"))
-            return
 
-        wait_with_jitter(page, config.INITIAL_PAGE_WAIT_MS)
+def download_listed_image(identifier: str, image_url: str, media_info: MediaCheckResult, manifest: Optional[MediaManifest] = None) -> bool:
+    print(t("listing_image_direct", identifier=identifier))
+    if not _download_image_from_url(image_url, media_info.image_path):
+        return False
+    record_image_saved(identifier, media_info, manifest)
+    metrics.cards_processed.inc()
+    return True
+
+
+@traced("card.upscale_request")
+def request_card_upscale(page, card, identifier: str, download_failures: List[tuple], without_video=None) -> str:
+    """Open the card and start its upscale; returns "requested", "no_video" or "failed".
+
+    A card without a video has nothing to wait for, so ``without_video(page, record_failure)`` downloads it while it is open.
+    """
+    print(f"\n{t('upscale_requesting', identifier=identifier)}")
+    record_failure = card_failure_recorder(identifier, download_failures)
+    opened = open_card(page, card, identifier, record_failure) if card is not None else open_card_detail(page, identifier, record_failure)
+    if not opened:
+        return "failed"
+    try:
         try:
-            page.wait_for_selector(config.GALLERY_LISTITEM_SELECTOR, timeout=config.GALLERY_LOAD_TIMEOUT_MS)
-        except PWTimeout:
-            print_error(t("gallery_load_failed"))
-            return
+            if card_has_video_toggle(page):
+                request_upscale(page)
+                return "requested"
+            print(t("no_video_option_skip_upscale"))
+        except Exception as error:
+            if is_browser_closed_error(error):
+                raise
+            record_failure(t("upscale_request_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            return "failed"
+        if without_video is not None:
+            without_video(page, record_failure)
+        return "no_video"
+    finally:
+        if card is not None:
+            return_to_gallery(page)
+
+
+def download_requested_upscales(
+    page,
+    requested: List[tuple],
+    first_index: int,
+    upscale_failures: List[str],
+    download_failures: List[tuple],
+    deferred: DeferredUpscales,
+    manifest: Optional[MediaManifest] = None,
+    transfer_pool: Optional[TransferPool] = None,
+    offsets: Optional[CardOffsetIndex] = None,
+    route_page=None,
+    routed: Iterable[str] = (),
+    listed: Container[str] = (),
+) -> int:
+    """Second pass of the pipelined mode: download cards whose HD version is ready, defer the rest.
+
+    Cards in ``routed`` were requested through their detail route in ``route_page`` and are opened there again,
+    as are ``listed`` cards the gallery no longer shows.
+    """
+    processed = 0
+    if requested:
+        print(f"\n{t('upscale_phase_two', count=len(requested))}")
+
+    gallery_page = page
+    for identifier, media_info in requested:
+        by_route = config.CARD_NAVIGATION == "tab" or identifier in routed
+        page = route_page if identifier in routed else gallery_page
+        card = None
+        if not by_route:
+            card = find_gallery_card(page, identifier, offsets.get(identifier) if offsets is not None else None, identifier in listed)
+            if card is None and identifier in listed and route_page is not None:
+                print(t("listing_card_by_route", identifier=identifier))
+                by_route = True
+                page = route_page
+            elif card is None:
+                record_card_not_found(identifier, download_failures)
+                continue
 
-        cards_locator = page.locator(config.CARDS_XPATH)
-        processed_ids = set()
-        pending_queue = []
-        pending_set = set()
-        processed_count = 0
-        no_new_card_scrolls = 0
-        upscale_failures: List[str] = []
-        download_failures: List[tuple] = []
+        index = first_index + processed
+        print(f"\n{t('card_processing', index=index + 1, identifier=identifier)}")
+        record_failure = card_failure_recorder(identifier, download_failures)
+        opened = open_card_detail(page, identifier, record_failure) if by_route else open_card(page, card, identifier, record_failure)
+        if not opened:
+            continue
+        processed += 1
 
         try:
-            while True:
-                card_count = cards_locator.count()
-                any_new_cards_found = False
-
-                for idx in range(card_count):
-                    card = cards_locator.nth(idx)
-                    identifier = get_card_identifier(card)
-                    if not identifier or identifier == "No ID":
-                        continue
-                    if identifier in processed_ids or identifier in pending_set:
-                        continue
-
-                    # Found any new card (whether we process it or skip it)
-                    any_new_cards_found = True
-
-                    _, media_info = decide_media_action(identifier)
-                    need_video_download, need_image_download = media_requirements(media_info)
-
-                    if not (need_video_download or need_image_download):
-                        details = []
-                        if media_info.video_exists:
-                            details.append(f"🎞️ {config.COLOR_ACCENT}{media_info.video_path}{config.COLOR_RESET}")
-                        if media_info.image_exists:
-                            details.append(f"🖼️ {config.COLOR_ACCENT}{media_info.image_path}{config.COLOR_RESET}")
-                        if details:
-                            joined = "\n   ".join(details)
-                            print(t("all_media_downloaded_detailed", details=joined))
-                        else:
-                            print(t("all_media_downloaded", identifier=identifier))
-                        processed_ids.add(identifier)
-                        continue
-
-                    pending_queue.append((identifier, media_info))
-                    pending_set.add(identifier)
-
-                if not pending_queue:
-                    no_new_card_scrolls = 0 if any_new_cards_found else no_new_card_scrolls + 1
-
-                    if no_new_card_scrolls >= config.MAX_SCROLLS_WITHOUT_NEW_CARDS:
-                        print(f"\n{t('processing_complete')}")
-                        break
-                    else:
-                        attempt_txt = f" ({no_new_card_scrolls + 1}/{config.MAX_SCROLLS_WITHOUT_NEW_CARDS})"
-                        print(f"{t('no_cards_scroll')}{attempt_txt}")
-
-                        wait_with_jitter(page, config.WAIT_IDLE_LOOP_MS)
-                        scroll_to_load_more(page, direction="down")
-                        wait_with_jitter(page, config.WAIT_IDLE_LOOP_MS)
-                        continue
-                else:
-                    no_new_card_scrolls = 0
-
-                queue_preview = [item[0] for item in pending_queue]
-                print(t("remaining_videos", count=len(pending_queue), queue=f"{config.COLOR_GRAY}{queue_preview}{config.COLOR_RESET}"))
-
-                identifier, media_info = pending_queue.pop(0)
-                pending_set.discard(identifier)
-
-                card = find_card_by_identifier(page, identifier)
-
-                if card is None:
-                    print(t("card_search_scroll", identifier=identifier))
-                    found_card = None
-
-                    for _ in range(config.SEARCH_SCROLL_UP_ATTEMPTS):
-                        scroll_to_load_more(page, direction="up")
-                        found_card = find_card_by_identifier(page, identifier)
-                        if found_card:
-                            break
-
-                    if found_card is None:
-                        for _ in range(config.SEARCH_SCROLL_DOWN_ATTEMPTS):
-                            scroll_to_load_more(page, direction="down")
-                            found_card = find_card_by_identifier(page, identifier)
-                            if found_card:
-                                break
-
-                    if found_card is None:
-                        reason = t("card_not_found_reason")
-                        print_error(t("card_not_found_after_scroll", identifier=identifier))
-                        download_failures.append((identifier, reason))
-                        processed_ids.add(identifier)
-                        continue
-
-                    card = found_card
-
-                process_one_card(page, card, processed_count, identifier, upscale_failures, download_failures, media_info)
-                processed_ids.add(identifier)
-                processed_count += 1
-                no_new_card_scrolls = 0
+            with span("card.hd_check", identifier=identifier):
+                hd_ready = not card_has_video_toggle(page) or hd_version_ready(page, config.PIPELINE_HD_CHECK_TIMEOUT_MS)
+            if not hd_ready:
+                print(t("upscale_deferred", identifier=identifier))
+                deferred.mark_requested(identifier)
+                metrics.cards_skipped.inc(reason="upscale_deferred")
+                continue
+            with span("card.media", identifier=identifier):
+                download_card_media(page, index, identifier, upscale_failures, record_failure, media_info, manifest, transfer_pool, upscale=False)
+            deferred.settle(identifier)
+            metrics.cards_processed.inc()
         except Exception as error:
-            combined = f"{t('process_interrupted')}\n\n{config.COLOR_GRAY}{error}{config.COLOR_RESET}"
-            print_error(combined)
-            err_text = str(error).lower()
-            transient_browser_errors = (
-                "target closed",
-                "page closed",
-                "browser has been closed",
-            )
-            if not any(token in err_text for token in transient_browser_errors):
+            if is_browser_closed_error(error):
                 raise
+            record_failure(t("video_processing_error", index=index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
         finally:
-            if upscale_failures:
-                print(f"\n{t('upscale_warnings')}")
-                for failed in upscale_failures:
-                    print(f"   • {failed}")
-            else:
-                print(f"\n{t('no_upscale_warnings')}")
-
-            if download_failures:
-                print(f"\n{t('download_errors')}")
-                for ident, reason in download_failures:
-                    print(f"   • {ident}: {reason}")
-            else:
-                print(f"\n{t('no_download_errors')}")
-            try:
-                browser.close()
-            except Exception:
-                pass
+            if not by_route:
+                return_to_gallery(page)
+
+    deferred.save()
+    return processed
+
+
+def run():
+    from .gallery_run import GalleryRun
+
+    if not config.DOWNLOAD_VIDEOS and not config.DOWNLOAD_IMAGES:
+        print_error(t("no_media_enabled"))
+        return
+
+    cookie_header = load_cookie_header(config.COOKIE_FILE)
+    cookies = cookie_header_to_list(cookie_header, ".grok.com")
+    start_tracing()
+    start_metrics()
+
+    with sync_playwright() as playwright:
+        context = launch_context(playwright, cookies)
+        page = prepare_page(context.new_page())
+        scanner = GalleryScanner(page)
+        if config.ENABLE_INCREMENTAL_SCAN:
+            scanner.install()
+        discovery: Optional[ListingDiscovery] = None
+        if config.DISCOVERY_MODE == "network":
+            discovery = ListingDiscovery(page, config.LISTING_URL_PATTERN)
+            discovery.attach()
+
+        with span("gallery.open"):
+            gallery_opened = open_gallery(page)
+        if not gallery_opened:
+            finish_tracing()
+            stop_metrics()
+            close_context(context)
+            return
+
+        GalleryRun(context, page, cookies, scanner, discovery).run()
 
 
 def main():
+    if config.ENGINE == "async":
+        import asyncio
+
+        from .async_engine import run_async
+
+        asyncio.run(run_async())
+        return
     run()
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import config, metrics
+from .adaptive_wait import cards_added, print_wait_savings, wait_until
+from .browser import close_context, prepare_page
+from .checkpoint import RunCheckpoint, resume_checkpoint
+from .downloader import (
+    MediaCheckResult,
+    decide_media_action,
+    download_card_media,
+    download_listed_image,
+    download_requested_upscales,
+    find_gallery_card,
+    media_requirements,
+    print_run_summary,
+    process_listed_card,
+    process_one_card,
+    record_card_not_found,
+    request_card_upscale,
+    triage_card,
+)
+from .gallery_scanner import GalleryScanner
+from .http_session import close_session
+from .listing_discovery import ListingDiscovery
+from .localization import print_error, t
+from .manifest import open_manifest
+from .metrics import stop_metrics
+from .playwright_utils import is_browser_closed_error, scroll_to_load_more, scroll_toward
+from .resource_policy import print_block_savings
+from .tracing import finish_tracing, span
+from .transfer_pool import TransferPool
+from .upscale_pipeline import DeferredUpscales
+from .verify import requeue_corrupt_media
+from .worker_pool import CardWorkerPool
+
+
+Candidate = Tuple[str, Optional[float]]
+
+
+class GalleryRun:
+    """One sync run over an opened gallery.
+
+    ``step`` is a single pass of the main loop; every mode keeps its part of it in a method of its own
+    (checkpoint resume, background transfer retries, discovery, the worker handler, the pipelined passes).
+    """
+
+    def __init__(self, context, page, cookies, scanner: GalleryScanner, discovery: Optional[ListingDiscovery] = None):
+        self.context = context
+        self.page = page
+        self.cookies = cookies
+        self.scanner = scanner
+        self.discovery = discovery
+        self.upscale_failures: List[str] = []
+        self.download_failures: List[tuple] = []
+        self.processed_ids: Set[str] = set()
+        self.pending_queue: List[Tuple[str, MediaCheckResult]] = []
+        self.pending_set: Set[str] = set()
+        self.queued_offsets: Dict[str, float] = {}
+        self.processed_count = 0
+        self.no_new_card_scrolls = 0
+        self.completed = False
+
+        requeue_corrupt_media()
+        self.manifest = open_manifest()
+        self.previous = resume_checkpoint()
+        self.checkpoint = self.previous if self.previous is not None else RunCheckpoint(config.CHECKPOINT_FILE)
+        self.resume_settled = set(self.previous.settled) if self.previous is not None else set()
+
+        self.pool: Optional[CardWorkerPool] = None
+        self.transfer_pool = TransferPool(config.TRANSFER_WORKERS) if config.BACKGROUND_TRANSFERS else None
+        pipelined = config.UPSCALE_MODE == "pipelined" and config.UPSCALE_VIDEOS
+        if pipelined and config.WORKERS > 1:
+            print_error(t("pipelined_needs_single_worker", workers=config.WORKERS))
+            pipelined = False
+        self.deferred = DeferredUpscales(config.DEFERRED_UPSCALES_FILE).load() if pipelined else None
+        self.upscale_requested: List[Tuple[str, MediaCheckResult]] = []
+
+        # CARD_NAVIGATION=tab: cards open by route in their own tab (the worker pages with WORKERS > 1).
+        self.by_route = config.CARD_NAVIGATION == "tab"
+        self.card_page = prepare_page(context.new_page()) if self.by_route and config.WORKERS <= 1 else page
+        # Listed cards the gallery has not rendered are opened by route, in their own tab unless cards already are.
+        if self.by_route or discovery is None or config.WORKERS > 1:
+            self.listing_page = self.card_page
+        else:
+            self.listing_page = prepare_page(context.new_page())
+        self.routed_ids: Set[str] = set()
+
+    @property
+    def queued(self) -> int:
+        return self.pool.queue_depth if self.pool is not None else len(self.pending_queue)
+
+    def in_flight(self) -> List[str]:
+        return self.transfer_pool.in_flight() if self.transfer_pool is not None else []
+
+    def _listed(self, identifier: str) -> bool:
+        return self.discovery is not None and identifier in self.discovery.items
+
+    def run(self) -> None:
+        if config.WORKERS > 1:
+            self.pool = CardWorkerPool(config.WORKERS, self.cookies, self.process_worker_card)
+            self.pool.start()
+        metrics.queue_depth.set_function(lambda: self.queued, queue="cards")
+        if self.transfer_pool is not None:
+            metrics.queue_depth.set_function(lambda: self.transfer_pool.pending, queue="transfers")
+
+        try:
+            if self.previous is not None:
+                self.resume(self.previous)
+            while not self.step():
+                pass
+        except Exception as error:
+            combined = f"{t('process_interrupted')}\n\n{config.COLOR_GRAY}{error}{config.COLOR_RESET}"
+            print_error(combined)
+            if not is_browser_closed_error(error):
+                raise
+        finally:
+            self.close()
+
+    def step(self) -> bool:
+        """One pass of the main loop; True once the gallery has been worked through."""
+        self.retry_failed_transfers()
+        self.checkpoint.record_failures(self.upscale_failures, self.download_failures)
+        self.checkpoint.save_if_due(self.in_flight())
+
+        found_new = self.admit(self.discover())
+        if self.pending_queue:
+            self.no_new_card_scrolls = 0
+            self.process_next()
+            return False
+
+        self.no_new_card_scrolls = 0 if found_new else self.no_new_card_scrolls + 1
+        if self.no_new_card_scrolls < config.MAX_SCROLLS_WITHOUT_NEW_CARDS:
+            self.scroll_for_more()
+            return False
+        return self.finish()
+
+    def enqueue(self, identifier: str, media_info: MediaCheckResult, offset: Optional[float] = None) -> None:
+        """Hand the card to the worker pool, or queue it for the main page."""
+        if self.pool is not None:
+            self.pool.submit(identifier, media_info, offset)
+            self.processed_ids.add(identifier)
+            return
+        if identifier in self.pending_set:
+            return
+        self.pending_queue.append((identifier, media_info))
+        self.pending_set.add(identifier)
+        if offset is not None:
+            self.queued_offsets[identifier] = offset
+
+    def resume(self, previous: RunCheckpoint) -> None:
+        """Queue what the interrupted run left pending or failed, then continue the scan where it stopped."""
+        for identifier, offset in previous.retry_items():
+            self.checkpoint.queue(identifier, offset)
+            media_info = triage_card(identifier, self.manifest, self.checkpoint)
+            if media_info is None:
+                self.processed_ids.add(identifier)
+            else:
+                self.enqueue(identifier, media_info, offset)
+        # After a completed run the gallery is scanned from the top again to pick up new cards.
+        if previous.scan_offset and not previous.complete:
+            with span("gallery.resume_scroll"):
+                scroll_toward(self.page, previous.scan_offset)
+
+    def retry_failed_transfers(self) -> None:
+        """Queue cards whose background transfer failed for another try in the browser, with its fallbacks."""
+        if self.transfer_pool is None:
+            return
+        for identifier in self.transfer_pool.take_failed():
+            print(t("transfer_retry_in_browser", identifier=identifier))
+            _, media_info = decide_media_action(identifier, self.manifest)
+            self.checkpoint.queue(identifier)
+            self.enqueue(identifier, media_info, self.scanner.offsets.get(identifier))
+
+    def discover(self) -> List[Candidate]:
+        """Cards the DOM scanner and, with DISCOVERY_MODE=network, the listing API turned up since the last pass."""
+        with span("gallery.drain"):
+            candidates = [(harvested.identifier, harvested.top) for harvested in self.scanner.drain()]
+            if self.discovery is None:
+                return candidates
+            listed = self.discovery.drain()
+            # Keep about a page of listed cards queued so the next page is ready before the queue runs dry.
+            if self.discovery.wants_next_page(self.queued + len(listed)):
+                with span("listing.fetch_page"):
+                    self.discovery.fetch_next_page()
+                listed += self.discovery.drain()
+            # Listing entries come first; the DOM scan only fills in what the listing missed.
+            return [(item.identifier, None) for item in listed] + candidates
+
+    def admit(self, candidates: List[Candidate]) -> bool:
+        """Queue the candidates that still need work; True when any of them was new."""
+        found_new = False
+        for identifier, offset in candidates:
+            if identifier in self.processed_ids or identifier in self.pending_set:
+                continue
+            found_new = True
+            metrics.cards_discovered.inc()
+            self.checkpoint.seen_at(offset)
+            self._admit(identifier, offset)
+        return found_new
+
+    def _admit(self, identifier: str, offset: Optional[float]) -> None:
+        if identifier in self.resume_settled:
+            metrics.cards_skipped.inc(reason="checkpoint")
+            self.processed_ids.add(identifier)
+            return
+
+        media_info = triage_card(identifier, self.manifest, self.checkpoint)
+        if media_info is None:
+            self.processed_ids.add(identifier)
+            if self.deferred is not None:
+                self.deferred.settle(identifier)
+            return
+
+        need_video_download, need_image_download = media_requirements(media_info)
+        listing_item = self.discovery.items.get(identifier) if self.discovery is not None else None
+        if listing_item is not None and listing_item.image_url and need_image_download and not need_video_download:
+            if download_listed_image(identifier, listing_item.image_url, media_info, self.manifest):
+                self.processed_ids.add(identifier)
+                self.checkpoint.finish(identifier)
+                return
+
+        self.checkpoint.queue(identifier, offset)
+        self.enqueue(identifier, media_info, offset)
+
+    def scroll_for_more(self) -> None:
+        attempt = self.no_new_card_scrolls + 1
+        print(f"{t('no_cards_scroll')} ({attempt}/{config.MAX_SCROLLS_WITHOUT_NEW_CARDS})")
+        with span("gallery.scroll", attempt=attempt):
+            card_count = self.page.locator(config.CARDS_CSS_SELECTOR).count()
+            wait_until(self.page, config.WAIT_IDLE_LOOP_MS, cards_added(card_count))
+            scroll_to_load_more(self.page, direction="down", ready=cards_added(card_count))
+            wait_until(self.page, config.WAIT_IDLE_LOOP_MS, cards_added(card_count))
+
+    def finish(self) -> bool:
+        """Wrap up once no new cards turn up; False while background transfers can still hand cards back."""
+        if self.transfer_pool is not None and self.transfer_pool.pending:
+            # Let the last transfers finish so failed ones still come back for a retry in the browser.
+            self.transfer_pool.wait()
+            return False
+        if self.deferred is not None:
+            self.download_upscaled()
+        print(f"\n{t('processing_complete')}")
+        self.completed = True
+        return True
+
+    def process_next(self) -> None:
+        """Work the next queued card on the main page (or its own tab)."""
+        queue_preview = [item[0] for item in self.pending_queue]
+        print(t("remaining_videos", count=len(self.pending_queue), queue=f"{config.COLOR_GRAY}{queue_preview}{config.COLOR_RESET}"))
+
+        identifier, media_info = self.pending_queue.pop(0)
+        self.pending_set.discard(identifier)
+        queued_offset = self.queued_offsets.pop(identifier, None)
+
+        card = None
+        target_page = self.card_page
+        if not self.by_route:
+            # Prefer where this run's harvester saw the card; a checkpoint offset is from the last run.
+            offset = self.scanner.offsets.get(identifier)
+            listed = self._listed(identifier)
+            card = find_gallery_card(self.page, identifier, offset if offset is not None else queued_offset, listed)
+            if card is None and listed:
+                print(t("listing_card_by_route", identifier=identifier))
+                target_page = self.listing_page
+                self.routed_ids.add(identifier)
+            elif card is None:
+                record_card_not_found(identifier, self.download_failures)
+                self.processed_ids.add(identifier)
+                return
+
+        if self.deferred is not None and media_requirements(media_info)[0]:
+            self.request_upscale(target_page, card, identifier, media_info)
+        else:
+            process_one_card(target_page, card, self.processed_count, identifier, self.upscale_failures, self.download_failures, media_info, self.manifest, self.transfer_pool)
+            self.checkpoint.finish(identifier)
+            self.processed_count += 1
+        self.processed_ids.add(identifier)
+
+    def process_worker_card(self, worker_page, identifier: str, media_info: MediaCheckResult, offset: Optional[float], index: int) -> None:
+        """``CardWorkerPool`` handler: runs in a worker thread on that worker's own page."""
+        card = None
+        if not self.by_route:
+            listed = self._listed(identifier)
+            card = find_gallery_card(worker_page, identifier, offset, listed)
+            if card is None and listed:
+                process_listed_card(worker_page.context, index, identifier, self.upscale_failures, self.download_failures, media_info, self.manifest, self.transfer_pool)
+                self.checkpoint.finish(identifier)
+                return
+            if card is None:
+                record_card_not_found(identifier, self.download_failures)
+                return
+        process_one_card(worker_page, card, index, identifier, self.upscale_failures, self.download_failures, media_info, self.manifest, self.transfer_pool)
+        self.checkpoint.finish(identifier)
+
+    def request_upscale(self, page, card, identifier: str, media_info: MediaCheckResult) -> None:
+        """First pass of the pipelined mode: start the upscale now and download the card in ``download_upscaled``."""
+        index = self.processed_count
+
+        def download_without_video(open_page, record_failure):
+            try:
+                download_card_media(open_page, index, identifier, self.upscale_failures, record_failure, media_info, self.manifest, self.transfer_pool, upscale=False, has_video_option=False)
+            except Exception as error:
+                if is_browser_closed_error(error):
+                    raise
+                record_failure(t("video_processing_error", index=index + 1, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+        status = "requested" if identifier in self.deferred else request_card_upscale(page, card, identifier, self.download_failures, download_without_video)
+        if status == "requested":
+            self.deferred.mark_requested(identifier)
+            self.upscale_requested.append((identifier, media_info))
+        elif status == "no_video":
+            # Nothing to upscale, so the card was handled inline instead of waiting for the second pass.
+            self.checkpoint.finish(identifier)
+            metrics.cards_processed.inc()
+            self.processed_count += 1
+
+    def download_upscaled(self) -> None:
+        """Second pass of the pipelined mode over the cards ``request_upscale`` started."""
+        self.processed_count += download_requested_upscales(
+            self.card_page,
+            self.upscale_requested,
+            self.processed_count,
+            self.upscale_failures,
+            self.download_failures,
+            self.deferred,
+            self.manifest,
+            self.transfer_pool,
+            self.scanner.offsets,
+            self.listing_page,
+            self.routed_ids,
+            self.discovery.items if self.discovery is not None else (),
+        )
+        for identifier, _ in self.upscale_requested:
+            if identifier not in self.deferred:
+                self.checkpoint.finish(identifier)
+        self.upscale_requested.clear()
+
+    def close(self) -> None:
+        """Wait for or give up the work still queued, save the checkpoint, report and release the browser."""
+        if self.pool is not None:
+            if self.completed:
+                print(t("workers_waiting", count=self.pool.queue_depth))
+            for leftover in self.pool.join(abandon=not self.completed):
+                self.download_failures.append((leftover, t("worker_unavailable_reason" if self.completed else "run_interrupted_reason")))
+                metrics.download_failures.inc()
+        if self.transfer_pool is not None:
+            self.download_failures.extend(self.transfer_pool.drain())
+        if self.deferred is not None:
+            self.deferred.save()
+            if self.deferred.requested:
+                print(f"\n{t('upscale_deferred_list')}")
+                for ident in self.deferred.identifiers():
+                    print(f"   • {ident}")
+        self.checkpoint.record_failures(self.upscale_failures, self.download_failures)
+        self.checkpoint.close(self.completed, self.in_flight())
+        print_run_summary(self.upscale_failures, self.download_failures)
+        print_wait_savings()
+        print_block_savings()
+        finish_tracing()
+        metrics.queue_depth.set_function(None, queue="cards")
+        metrics.queue_depth.set_function(None, queue="transfers")
+        stop_metrics()
+        if self.manifest is not None:
+            self.manifest.close()
+        close_session()
+        try:
+            close_context(self.context)
+        except Exception:
+            pass
+
+
+__all__ = ["GalleryRun"]
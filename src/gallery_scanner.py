@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+from typing import Dict, Iterable, List, Optional
+
+from . import config
+from .localization import t
+from .playwright_utils import HarvestedCard, harvest_cards, parse_harvested_cards
+
+
+SCANNER_SCRIPT_TEMPLATE = """
+(() => {
+    if (window.__grokCardScanner) {
+        return;
+    }
+    const cardSelector = %(selector)s;
+    const state = { seen: new Set(), queue: [], index: 0, observer: null };
+    window.__grokCardScanner = state;
+
+    const enqueue = (card) => {
+        if (!card || !card.isConnected) {
+            return;
+        }
+        const img = card.querySelector("img");
+        const src = img ? img.src : null;
+        if (!src || card.dataset.grokScanned === src) {
+            return;
+        }
+        card.dataset.grokScanned = src;
+        if (state.seen.has(src)) {
+            return;
+        }
+        state.seen.add(src);
+        const rect = card.getBoundingClientRect();
+        state.queue.push({
+            card: card,
+            src: src,
+            index: state.index++,
+            top: rect.top + window.scrollY,
+            left: rect.left + window.scrollX,
+        });
+    };
+
+    const collect = (node) => {
+        if (!node || node.nodeType !== Node.ELEMENT_NODE) {
+            return;
+        }
+        const owner = node.closest(cardSelector);
+        if (owner) {
+            enqueue(owner);
+            return;
+        }
+        node.querySelectorAll(cardSelector).forEach(enqueue);
+    };
+
+    const start = () => {
+        document.querySelectorAll(cardSelector).forEach(enqueue);
+        state.observer = new MutationObserver((records) => {
+            for (const record of records) {
+                if (record.type === "attributes") {
+                    collect(record.target);
+                    continue;
+                }
+                record.addedNodes.forEach(collect);
+            }
+        });
+        state.observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: ["src"],
+        });
+    };
+
+    // Offsets are measured again when draining: the masonry layout places a card only after it is
+    // added, so its rect at insertion time is not where it ends up. A card the virtualized list has
+    // already removed (or reused for another image) keeps its insertion-time offset.
+    const measure = (entry) => {
+        const img = entry.card.isConnected ? entry.card.querySelector("img") : null;
+        if (!img || img.src !== entry.src) {
+            return { src: entry.src, index: entry.index, top: entry.top, left: entry.left };
+        }
+        const rect = entry.card.getBoundingClientRect();
+        return {
+            src: entry.src,
+            index: entry.index,
+            top: rect.top + window.scrollY,
+            left: rect.left + window.scrollX,
+        };
+    };
+
+    state.drain = () => {
+        const drained = state.queue.map(measure);
+        state.queue = [];
+        return drained;
+    };
+
+    if (document.readyState === "loading") {
+        document.addEventListener("DOMContentLoaded", start, { once: true });
+    } else {
+        start();
+    }
+})();
+"""
+
+DRAIN_SCRIPT = "() => (window.__grokCardScanner && window.__grokCardScanner.drain) ? window.__grokCardScanner.drain() : null"
+
+
+def build_scanner_script(selector: str) -> str:
+    return SCANNER_SCRIPT_TEMPLATE % {"selector": json.dumps(selector)}
+
+
+class CardOffsetIndex:
+    def __init__(self):
+        self._offsets: Dict[str, float] = {}
+
+    def record(self, cards: Iterable[HarvestedCard]) -> None:
+        for card in cards:
+            self._offsets[card.identifier] = card.top
+
+    def get(self, identifier: str) -> Optional[float]:
+        return self._offsets.get(identifier)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+class GalleryScanner:
+    """Queues masonry cards in the page as they are added so each check only returns the delta."""
+
+    def __init__(self, page):
+        self.page = page
+        self.installed = False
+        self.offsets = CardOffsetIndex()
+
+    def install(self) -> None:
+        self.page.add_init_script(build_scanner_script(config.CARDS_CSS_SELECTOR))
+        self.installed = True
+
+    def drain(self) -> List[HarvestedCard]:
+        cards = self._harvest()
+        self.offsets.record(cards)
+        return cards
+
+    def _harvest(self) -> List[HarvestedCard]:
+        if not self.installed:
+            return harvest_cards(self.page)
+        try:
+            raw_cards = self.page.evaluate(DRAIN_SCRIPT)
+        except Exception:
+            print(t("card_identifier_error"))
+            return []
+        if raw_cards is None:
+            # The observer is missing (e.g. a document loaded before install); use a full harvest instead.
+            return harvest_cards(self.page)
+        return parse_harvested_cards(raw_cards)
+
+
+__all__ = ["CardOffsetIndex", "GalleryScanner", "build_scanner_script"]
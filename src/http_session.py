@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import config
+from .cookies import cookie_header_to_list, load_cookie_header
+from .localization import print_error, t
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    if config.HTTP_MAX_CONNECTIONS_PER_HOST > 0:
+        return config.HTTP_MAX_CONNECTIONS_PER_HOST
+    return max(1, config.WORKERS, config.TRANSFER_WORKERS if config.BACKGROUND_TRANSFERS else 1)
+
+
+def _cookies():
+    try:
+        header = load_cookie_header(config.COOKIE_FILE)
+    except (OSError, ValueError):
+        return []
+    return cookie_header_to_list(header, ".grok.com")
+
+
+def _base_headers() -> dict:
+    # Only what every transfer shares; image and video requests add their own accept/sec-fetch headers.
+    return {"user-agent": config.USER_AGENT}
+
+
+class _HttpxResponse:
+    """Gives an httpx streaming response the small part of the requests API the downloaders use."""
+
+    def __init__(self, response, httpx_module):
+        self._response = response
+        self._httpx = httpx_module
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.ok = response.status_code < 400
+
+    def iter_content(self, chunk_size: int):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except self._httpx.HTTPError as error:
+            raise requests.ConnectionError(str(error)) from error
+
+    def close(self) -> None:
+        self._response.close()
+
+
+class _HttpxSession:
+    def __init__(self, httpx_module, pool_size: int):
+        self._httpx = httpx_module
+        total = pool_size * max(1, config.HTTP_POOL_HOSTS)
+        limits = httpx_module.Limits(max_connections=total, max_keepalive_connections=total)
+        self._client = httpx_module.Client(http2=True, limits=limits, headers=_base_headers(), follow_redirects=True)
+        for cookie in _cookies():
+            self._client.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+
+    def get(self, url: str, headers: Optional[dict] = None, stream: bool = False, timeout: Optional[float] = None):
+        try:
+            request = self._client.build_request("GET", url, headers=headers, timeout=timeout)
+            response = self._client.send(request, stream=True)
+        except self._httpx.HTTPError as error:
+            raise requests.ConnectionError(str(error)) from error
+        wrapped = _HttpxResponse(response, self._httpx)
+        if not stream:
+            response.read()
+        return wrapped
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def _build_requests_session(pool_size: int):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_HOSTS, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(_base_headers())
+    for cookie in _cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+    return session
+
+
+def _build_session():
+    pool_size = _pool_size()
+    if config.HTTP2:
+        if importlib.util.find_spec("httpx") is not None and importlib.util.find_spec("h2") is not None:
+            return _HttpxSession(importlib.import_module("httpx"), pool_size)
+        print_error(t("http2_unavailable"))
+    return _build_requests_session(pool_size)
+
+
+def get_session():
+    """Shared keep-alive HTTP session for every transfer that does not go through the browser."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def close_session() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            try:
+                _session.close()
+            except Exception:
+                pass
+            _session = None
+
+
+__all__ = ["get_session", "close_session"]
@@ -9,8 +9,21 @@ import requests
 from playwright.sync_api import TimeoutError as PWTimeout
 
 from . import config
+from .adaptive_wait import animations_done, wait_until
+from .http_session import get_session
 from .localization import t, print_error
-from .playwright_utils import DOWNLOAD_BUTTON_SELECTOR, IMAGE_BUTTON_SELECTOR, wait_with_jitter
+from .metrics import record_fallback
+from .playwright_utils import DOWNLOAD_BUTTON_SELECTOR, IMAGE_BUTTON_SELECTOR
+from .tracing import span, traced
+from .transfers import (
+    IncompleteTransfer,
+    TransferError,
+    download_resumable,
+    finalize_part,
+    part_path,
+    read_part_head,
+    remove_quietly,
+)
 
 
 def _resolve_image_src(page, identifier: str) -> str | None:
@@ -35,13 +48,8 @@ def _resolve_image_src(page, identifier: str) -> str | None:
     return None
 
 
+@traced("http.image")
 def _download_image_from_url(image_src: str, target_path: str) -> bool:
-    if os.path.exists(target_path):
-        try:
-            os.remove(target_path)
-        except OSError:
-            pass
-
     if image_src.startswith("data:"):
         try:
             header, encoded = image_src.split(",", 1)
@@ -55,12 +63,17 @@ def _download_image_from_url(image_src: str, target_path: str) -> bool:
             print_error(t("image_download_error", error=f"{config.COLOR_GRAY}{decode_error}{config.COLOR_RESET}"))
             return False
 
+        part = part_path(target_path)
         try:
-            with open(target_path, "wb") as handle:
+            with open(part, "wb") as handle:
                 handle.write(data)
-            _log_image_success(target_path)
+            if finalize_part(part, target_path) == 0:
+                print_error(t("image_download_failed", status="empty"))
+                return False
+            _log_image_success(target_path, parse_image_resolution(data[:IMAGE_HEADER_SNIFF_LIMIT]) or (None, None))
             return True
         except OSError as os_error:
+            remove_quietly(part)
             print_error(t("image_write_failed", error=f"{config.COLOR_GRAY}{os_error}{config.COLOR_RESET}"))
             return False
 
@@ -69,28 +82,33 @@ def _download_image_from_url(image_src: str, target_path: str) -> bool:
         print_error(t("image_download_failed", status="invalid-url"))
         return False
 
-    headers = dict(config.ASSET_BASE_HEADERS)
-    headers["user-agent"] = config.USER_AGENT
+    def fetch(request_url: str, request_headers: dict):
+        return get_session().get(request_url, headers=request_headers, stream=True, timeout=config.HTTP_REQUEST_TIMEOUT_SEC)
 
-    try:
-        response = requests.get(image_src, headers=headers, timeout=config.HTTP_REQUEST_TIMEOUT_SEC)
-    except requests.RequestException as request_error:
-        print_error(t("image_download_error", error=f"{config.COLOR_GRAY}{request_error}{config.COLOR_RESET}"))
-        return False
+    sniffer = ImageResolutionSniffer()
 
-    if not response.ok:
-        print_error(t("image_download_failed", status=response.status_code))
-        return False
+    def on_resume(offset: int) -> None:
+        # The header is already in the .part file from the interrupted run; the stream continues past it.
+        sniffer.feed(read_part_head(target_path, min(offset, sniffer.limit)))
 
     try:
-        with open(target_path, "wb") as file_handle:
-            file_handle.write(response.content)
-        _log_image_success(target_path)
-        return True
+        size = download_resumable(fetch, image_src, target_path, dict(config.ASSET_BASE_HEADERS), on_resume=on_resume, on_chunk=sniffer.feed)
+    except TransferError as status_error:
+        print_error(t("image_download_failed", status=status_error.status))
+        return False
+    except (requests.RequestException, IncompleteTransfer) as request_error:
+        print_error(t("image_download_error", error=f"{config.COLOR_GRAY}{request_error}{config.COLOR_RESET}"))
+        return False
     except OSError as os_error:
         print_error(t("image_write_failed", error=f"{config.COLOR_GRAY}{os_error}{config.COLOR_RESET}"))
         return False
 
+    if size == 0:
+        print_error(t("image_download_failed", status="empty"))
+        return False
+    _log_image_success(target_path, sniffer.resolution or (None, None))
+    return True
+
 
 def _download_image_via_http(page, identifier: str, target_path: str) -> bool:
     image_src = _resolve_image_src(page, identifier)
@@ -123,12 +141,14 @@ def _download_image_from_popup(popup, target_path: str) -> bool:
     return _download_image_from_url(image_src, target_path)
 
 
+@traced("image.popup_fallback")
 def _handle_image_popup(page, identifier: str, target_path: str, before_pages: set) -> bool:
     new_pages = [p for p in page.context.pages if p not in before_pages]
 
     for popup in new_pages:
         try:
             if _download_image_from_popup(popup, target_path):
+                record_fallback("image_popup", True)
                 return True
         finally:
             try:
@@ -136,99 +156,184 @@ def _handle_image_popup(page, identifier: str, target_path: str, before_pages: s
             except Exception:
                 pass
 
-    return _download_image_via_http(page, identifier, target_path)
+    success = _download_image_via_http(page, identifier, target_path)
+    record_fallback("image_http", success)
+    return success
+
+
+IMAGE_HEADER_SNIFF_LIMIT = 512 * 1024
+IMAGE_HEADER_READ = 64
+_JPEG_SOF_MARKERS = b"\xc0\xc1\xc2\xc3\xc5\xc6\xc7\xc9\xca\xcb\xcd\xce\xcf"
+
+# The scanners return the resolution, or None and the header length needed to get further (None: never).
+_Scan = tuple[tuple[int, int] | None, int | None]
+
+
+def _webp_resolution(header: bytes) -> _Scan:
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_type = header[offset:offset + 4]
+        chunk_size = struct.unpack("<I", header[offset + 4:offset + 8])[0]
+        chunk_data = header[offset + 8:offset + 8 + chunk_size]
+        if chunk_type in (b"VP8X", b"VP8 ", b"VP8L"):
+            if len(chunk_data) < min(chunk_size, 10):
+                return None, offset + 8 + min(chunk_size, 10)
+            if chunk_type == b"VP8X" and len(chunk_data) >= 10:
+                width = 1 + ((chunk_data[4]) | (chunk_data[5] << 8) | (chunk_data[6] << 16))
+                height = 1 + ((chunk_data[7]) | (chunk_data[8] << 8) | (chunk_data[9] << 16))
+                return (int(width), int(height)), None
+            if chunk_type == b"VP8 " and len(chunk_data) >= 10:
+                width = (chunk_data[6] << 8) | chunk_data[7]
+                height = (chunk_data[8] << 8) | chunk_data[9]
+                return (int(width & 0x3FFF), int(height & 0x3FFF)), None
+            if chunk_type == b"VP8L" and len(chunk_data) >= 5:
+                bits = struct.unpack("<I", chunk_data[1:5])[0]
+                width = (bits & 0x3FFF) + 1
+                height = ((bits >> 14) & 0x3FFF) + 1
+                return (int(width), int(height)), None
+            return None, None
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None, offset + 8
+
+
+def _jpeg_resolution(header: bytes) -> _Scan:
+    offset = 2
+    while offset < len(header):
+        if header[offset] != 0xFF:
+            offset += 1
+            continue
+        while offset < len(header) and header[offset] == 0xFF:
+            offset += 1
+        if offset >= len(header):
+            return None, offset + 3
+        marker = header[offset]
+        offset += 1
+        if marker == 0xDA:
+            return None, None
+        if offset + 2 > len(header):
+            return None, offset + 2
+        length = struct.unpack(">H", header[offset:offset + 2])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            frame_data = header[offset + 3:offset + 7]
+            if len(frame_data) < 4:
+                return None, offset + 7
+            height, width = struct.unpack(">HH", frame_data)
+            return (int(width), int(height)), None
+        offset += length
+    return None, offset + 4
+
+
+def _scan_image_header(header: bytes) -> _Scan:
+    if len(header) < 10:
+        return None, 10
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        if len(header) < 24:
+            return None, 24
+        width, height = struct.unpack(">II", header[16:24])
+        return (int(width), int(height)), None
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        width, height = struct.unpack("<HH", header[6:10])
+        return (int(width), int(height)), None
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return _webp_resolution(header)
+    if header[:2] == b"\xff\xd8":
+        return _jpeg_resolution(header)
+    return None, None
 
 
-def _read_image_resolution(path: str) -> tuple[int | None, int | None]:
+def parse_image_resolution(header: bytes) -> tuple[int, int] | None:
+    """Width and height from the leading bytes of a PNG, GIF, WebP or JPEG file, or None if they are not in ``header`` yet."""
+    return _scan_image_header(header)[0]
+
+
+def _read_image_header(file_handle) -> bytes:
+    """The leading bytes of an image file, read in small steps until the dimensions are in them."""
+    header = file_handle.read(IMAGE_HEADER_READ)
+    while True:
+        resolution, needed = _scan_image_header(header)
+        if resolution is not None or needed is None or needed > IMAGE_HEADER_SNIFF_LIMIT:
+            return header
+        more = file_handle.read(max(needed - len(header), IMAGE_HEADER_READ))
+        if not more:
+            return header
+        header += more
+
+
+class ImageResolutionSniffer:
+    """Picks the image dimensions out of a download stream as the chunks go to disk.
+
+    The buffered header is only parsed again once it holds as many bytes as the last parse asked for.
+    """
+
+    def __init__(self, limit: int = IMAGE_HEADER_SNIFF_LIMIT):
+        self.limit = limit
+        self.resolution: tuple[int, int] | None = None
+        self._buffer = bytearray()
+        self._needed = 10
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        if self._done:
+            return
+        self._buffer.extend(chunk)
+        if len(self._buffer) < self._needed:
+            return
+        self.resolution, needed = _scan_image_header(bytes(self._buffer))
+        if self.resolution is not None or needed is None or needed > self.limit:
+            self._done = True
+            self._buffer = bytearray()
+        else:
+            self._needed = needed
+
+
+_PNG_TRAILER = b"IEND\xaeB`\x82"
+
+
+def image_structure_problem(path: str) -> str | None:
+    """Short reason code when a saved image is empty, unreadable or cut off, None when it looks intact."""
     try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return "empty"
         with open(path, "rb") as file_handle:
-            header = file_handle.read(32)
-
-            if len(header) < 10:
-                return None, None
-
-            if header.startswith(b"\x89PNG\r\n\x1a\n"):
-                width, height = struct.unpack(">II", header[16:24])
-                return int(width), int(height)
-
-            if header[:6] in (b"GIF87a", b"GIF89a"):
-                width, height = struct.unpack("<HH", header[6:10])
-                return int(width), int(height)
-
-            if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
-                file_handle.seek(12)
-                while True:
-                    chunk_header = file_handle.read(8)
-                    if len(chunk_header) < 8:
-                        break
-                    chunk_type = chunk_header[:4]
-                    chunk_size = struct.unpack("<I", chunk_header[4:])[0]
-                    chunk_data = file_handle.read(chunk_size + (chunk_size & 1))
-                    if len(chunk_data) < chunk_size:
-                        break
-                    if chunk_type == b"VP8X" and len(chunk_data) >= 10:
-                        width = 1 + ((chunk_data[4]) | (chunk_data[5] << 8) | (chunk_data[6] << 16))
-                        height = 1 + ((chunk_data[7]) | (chunk_data[8] << 8) | (chunk_data[9] << 16))
-                        return int(width), int(height)
-                    if chunk_type == b"VP8 " and len(chunk_data) >= 10:
-                        width = (chunk_data[6] << 8) | chunk_data[7]
-                        height = (chunk_data[8] << 8) | chunk_data[9]
-                        return int(width & 0x3FFF), int(height & 0x3FFF)
-                    if chunk_type == b"VP8L" and len(chunk_data) >= 5:
-                        bits = struct.unpack("<I", chunk_data[:4])[0]
-                        width = (bits & 0x3FFF) + 1
-                        height = ((bits >> 14) & 0x3FFF) + 1
-                        return int(width), int(height)
-
-            if header[:2] == b"\xff\xd8":
-                file_handle.seek(2)
-                while True:
-                    marker_prefix = file_handle.read(1)
-                    if not marker_prefix:
-                        break
-                    if marker_prefix != b"\xff":
-                        continue
-                    marker = file_handle.read(1)
-                    while marker == b"\xff":
-                        marker = file_handle.read(1)
-                    if not marker:
-                        break
-                    if marker in b"\xc0\xc1\xc2\xc3\xc5\xc6\xc7\xc9\xca\xcb\xcd\xce\xcf":
-                        length_bytes = file_handle.read(2)
-                        if len(length_bytes) != 2:
-                            break
-                        struct.unpack(">H", length_bytes)[0]
-                        precision_byte = file_handle.read(1)
-                        if len(precision_byte) != 1:
-                            break
-                        frame_data = file_handle.read(4)
-                        if len(frame_data) == 4:
-                            height, width = struct.unpack(">HH", frame_data)
-                            return int(width), int(height)
-                        break
-                    if marker == b"\xda":
-                        break
-                    length_bytes = file_handle.read(2)
-                    if len(length_bytes) != 2:
-                        break
-                    length = struct.unpack(">H", length_bytes)[0]
-                    file_handle.seek(length - 2, 1)
+            header = _read_image_header(file_handle)
+            file_handle.seek(max(0, size - 1024))
+            tail = file_handle.read()
+    except OSError:
+        return "unreadable"
+    if parse_image_resolution(header) is None:
+        return "image_header_invalid"
+    if header.startswith(b"\x89PNG"):
+        complete = tail.endswith(_PNG_TRAILER)
+    elif header[:3] == b"GIF":
+        complete = tail.endswith(b"\x3b")
+    elif header[:4] == b"RIFF":
+        complete = struct.unpack("<I", header[4:8])[0] + 8 <= size
+    else:
+        # JPEG: the end-of-image marker, allowing for padding some encoders add after it.
+        complete = b"\xff\xd9" in tail
+    return None if complete else "truncated"
 
+
+def _read_image_resolution(path: str) -> tuple[int | None, int | None]:
+    try:
+        with open(path, "rb") as file_handle:
+            header = _read_image_header(file_handle)
     except OSError:
         return None, None
-
-    return None, None
+    return parse_image_resolution(header) or (None, None)
 
 
-def _log_image_success(path: str) -> None:
-    width, height = _read_image_resolution(path)
+def _log_image_success(path: str, resolution: tuple[int, int] | None = None) -> None:
+    """Print the saved image; ``resolution`` comes from the download stream, otherwise the file header is read."""
+    width, height = resolution if resolution is not None else _read_image_resolution(path)
     if width is not None and height is not None:
-        resolution = f"({width}×{height})"
+        resolution_text = f"({width}×{height})"
     else:
-        resolution = f"({t('image_resolution_unknown')})"
+        resolution_text = f"({t('image_resolution_unknown')})"
     filename = os.path.basename(path)
     accent_name = f"{config.COLOR_ACCENT}{filename}{config.COLOR_RESET}"
-    print(t("image_download_success", name=accent_name, resolution=resolution))
+    print(t("image_download_success", name=accent_name, resolution=resolution_text))
 
 
 def _card_has_image_button(page) -> bool:
@@ -242,6 +347,7 @@ def _card_has_image_button(page) -> bool:
         return False
 
 
+@traced("image")
 def download_image_for_card(
     page,
     identifier: str,
@@ -250,15 +356,16 @@ def download_image_for_card(
     record_failure,
 ) -> bool:
     if has_video_option:
-        if not _card_has_image_button(page):
-            print(t("no_image_element"))
-        else:
-            img_button = page.locator(IMAGE_BUTTON_SELECTOR)
-            try:
-                img_button.first.click()
-                wait_with_jitter(page, config.WAIT_AFTER_MENU_INTERACTION_MS)
-            except Exception:
+        with span("image.toggle"):
+            if not _card_has_image_button(page):
                 print(t("no_image_element"))
+            else:
+                img_button = page.locator(IMAGE_BUTTON_SELECTOR)
+                try:
+                    img_button.first.click()
+                    wait_until(page, config.WAIT_AFTER_MENU_INTERACTION_MS, animations_done())
+                except Exception:
+                    print(t("no_image_element"))
 
     dl_button = page.locator(DOWNLOAD_BUTTON_SELECTOR)
     if dl_button.count() == 0:
@@ -272,28 +379,22 @@ def download_image_for_card(
     success = False
 
     try:
-        with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
-            button.click()
-        download = dl_info.value
+        with span("image.expect_download"):
+            with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
+                button.click()
+            download = dl_info.value
 
+        part = part_path(image_path)
         try:
-            download.save_as(image_path)
-            if os.path.getsize(image_path) == 0:
-                try:
-                    os.remove(image_path)
-                except OSError:
-                    pass
+            download.save_as(part)
+            if finalize_part(part, image_path) == 0:
                 success = _handle_image_popup(page, identifier, image_path, before_pages)
             else:
                 _log_image_success(image_path)
                 success = True
         except Exception as error:
             print_error(t("image_download_error", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-            except OSError:
-                pass
+            remove_quietly(part)
             success = _handle_image_popup(page, identifier, image_path, before_pages)
 
     except PWTimeout:
@@ -316,4 +417,4 @@ def download_image_for_card(
     return False
 
 
-__all__ = ["download_image_for_card"]
+__all__ = ["download_image_for_card", "image_structure_problem"]
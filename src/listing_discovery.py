@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import glob
+import json
+import os
+import threading
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from . import config
+from .localization import print_error, t
+from .playwright_utils import identifier_from_src
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".mov")
+CURSOR_KEYS = ("nextCursor", "next_cursor", "cursor", "nextPageToken", "next_page_token")
+
+
+@dataclass
+class ListingItem:
+    identifier: str
+    image_url: Optional[str]
+    video_url: Optional[str]
+
+
+def _url_path(value: str) -> str:
+    return urlparse(value).path.lower()
+
+
+def _media_urls(node: dict) -> tuple[Optional[str], Optional[str]]:
+    image_url = None
+    video_url = None
+    for value in node.values():
+        if not isinstance(value, str) or not value.startswith(("http://", "https://")):
+            continue
+        path = _url_path(value)
+        if image_url is None and path.endswith(IMAGE_EXTENSIONS):
+            image_url = value
+        elif video_url is None and path.endswith(VIDEO_EXTENSIONS):
+            video_url = value
+    return image_url, video_url
+
+
+def extract_listing_items(payload) -> List[ListingItem]:
+    """Walk a listing JSON payload and return one item per object that carries an image URL."""
+    items: List[ListingItem] = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        image_url, video_url = _media_urls(node)
+        identifier = identifier_from_src(image_url)
+        if identifier:
+            items.append(ListingItem(identifier=identifier, image_url=image_url, video_url=video_url))
+        stack.extend(reversed([value for value in node.values() if isinstance(value, (dict, list))]))
+    return items
+
+
+def extract_cursor(payload) -> Optional[str]:
+    if not isinstance(payload, dict):
+        return None
+    for key in CURSOR_KEYS:
+        value = payload.get(key)
+        if isinstance(value, (str, int)) and value != "":
+            return str(value)
+    return None
+
+
+class ListingDiscovery:
+    """Collects cards from the favorites listing API responses and pages through it directly."""
+
+    def __init__(self, page, url_pattern: str):
+        self.page = page
+        self.url_pattern = url_pattern
+        self.items: Dict[str, ListingItem] = {}
+        self.exhausted = False
+        self.page_size = 0
+        self._responses = []
+        self._new: List[ListingItem] = []
+        self._lock = threading.Lock()
+        self._template: Optional[dict] = None
+        self._cursor: Optional[str] = None
+        self._record_index = 0
+        self._replay_files: List[str] = []
+        self._replay_index = 0
+
+    def _matches(self, url: str) -> bool:
+        return fnmatch(url, self.url_pattern)
+
+    def attach(self) -> None:
+        if config.LISTING_REPLAY_DIR:
+            self._replay_files = sorted(glob.glob(os.path.join(config.LISTING_REPLAY_DIR, "*.json")))
+            self.page.route(self.url_pattern, self._replay_route)
+        self.page.on("response", self._on_response)
+
+    def _next_replay_body(self) -> str:
+        if self._replay_index >= len(self._replay_files):
+            return "{}"
+        path = self._replay_files[self._replay_index]
+        self._replay_index += 1
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.read()
+
+    def _replay_route(self, route, request):
+        route.fulfill(status=200, content_type="application/json", body=self._next_replay_body())
+
+    def _on_response(self, response) -> None:
+        # Only queue here; reading the body happens from the main flow in drain().
+        if self._matches(response.url):
+            with self._lock:
+                self._responses.append(response)
+
+    def _ingest(self, payload, request_info: Optional[dict]) -> int:
+        if config.LISTING_RECORD_DIR:
+            self._record(payload)
+        added = 0
+        items = extract_listing_items(payload)
+        self.page_size = max(self.page_size, len(items))
+        for item in items:
+            if item.identifier in self.items:
+                continue
+            self.items[item.identifier] = item
+            self._new.append(item)
+            added += 1
+        if request_info is not None:
+            if self._template is not None:
+                # Later pages requested by the page's own scrolling; direct paging already owns the cursor.
+                return added
+            self._template = request_info
+        self._cursor = extract_cursor(payload)
+        if self._cursor is None:
+            self.exhausted = True
+        return added
+
+    def _record(self, payload) -> None:
+        os.makedirs(config.LISTING_RECORD_DIR, exist_ok=True)
+        path = os.path.join(config.LISTING_RECORD_DIR, f"listing-{self._record_index:05d}.json")
+        self._record_index += 1
+        try:
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle)
+        except OSError as error:
+            print_error(t("listing_record_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+    def _process_responses(self) -> None:
+        with self._lock:
+            responses = self._responses
+            self._responses = []
+        for response in responses:
+            try:
+                payload = response.json()
+            except Exception:
+                continue
+            request = response.request
+            request_info = {
+                "url": request.url,
+                "method": request.method,
+                "post_data": request.post_data,
+                "headers": {key: value for key, value in request.headers.items() if not key.startswith(":")},
+            }
+            self._ingest(payload, request_info)
+
+    def drain(self) -> List[ListingItem]:
+        self._process_responses()
+        drained = self._new
+        self._new = []
+        return drained
+
+    def _next_request(self) -> Optional[dict]:
+        if self._template is None or self._cursor is None:
+            return None
+        request_info = dict(self._template)
+        post_data = request_info.get("post_data")
+        if post_data:
+            try:
+                body = json.loads(post_data)
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                cursor_key = next((key for key in body if "cursor" in key.lower()), "cursor")
+                body[cursor_key] = self._cursor
+                request_info["post_data"] = json.dumps(body)
+                return request_info
+        parsed = urlparse(request_info["url"])
+        query = dict(parse_qsl(parsed.query))
+        cursor_key = next((key for key in query if "cursor" in key.lower()), "cursor")
+        query[cursor_key] = self._cursor
+        request_info["url"] = urlunparse(parsed._replace(query=urlencode(query)))
+        return request_info
+
+    def wants_next_page(self, queued: int) -> bool:
+        """True when fewer than a page's worth of cards (at least one per worker) are still queued."""
+        return not self.exhausted and queued < max(1, config.WORKERS, self.page_size)
+
+    def fetch_next_page(self) -> int:
+        """Request the next listing page straight from the backend; returns how many new cards it had."""
+        request_info = self._next_request()
+        if request_info is None:
+            self.exhausted = True
+            return 0
+        if self._replay_files:
+            return self._ingest(json.loads(self._next_replay_body()), None)
+        try:
+            response = self.page.context.request.fetch(
+                request_info["url"],
+                method=request_info["method"],
+                headers=request_info["headers"],
+                data=request_info.get("post_data"),
+                timeout=config.HTTP_REQUEST_TIMEOUT_SEC * 1000,
+            )
+            if not response.ok:
+                print_error(t("listing_page_failed", status=response.status))
+                self.exhausted = True
+                return 0
+            payload = response.json()
+        except Exception as error:
+            print_error(t("listing_page_error", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            self.exhausted = True
+            return 0
+        return self._ingest(payload, None)
+
+
+__all__ = ["ListingDiscovery", "ListingItem", "extract_listing_items", "extract_cursor"]
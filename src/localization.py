@@ -18,7 +18,6 @@ MESSAGES = {
         "process_interrupted": "❌ Process interrupted:",
         "already_exists_overwrite": "🟡 Already exists ({filename}), overwriting.",
         "zero_byte_file_delete_retry": "⚠️  0-byte file — deleting and trying to download from opened card...",
-        "zero_byte_file_delete_failed": "Could not delete 0-byte file: {error}",
         "alternative_download": "🔁 Alternative download: {url}",
         "alternative_download_success": "📥 Downloaded from alternative source: {filename} ({size} bytes)",
         "download_success": "📥 Video downloaded: {filename}",
@@ -58,7 +57,6 @@ MESSAGES = {
         "alternative_download_failed": "Alternative download failed: HTTP {status}",
         "alternative_download_zero_byte": "Alternative download also remained 0-byte",
         "video_src_not_found": "Video URL not found in card DOM",
-        "delete_existing_failed": "Could not delete existing file: {error}",
         "card_identifier_error": "❌ Error extracting video identifier.",
         "no_cards_found": "❌ Failed to load gallery – check your cookie file.",
         "video_width_unknown": "unknown",
@@ -69,7 +67,6 @@ MESSAGES = {
         "empty_cookie_file": "❌ Cookie file problem.\n\nI tried to read cookies from {path} but the file is either empty or not in the expected name=value; format.\n\nFix it by:\n  • Opening the browser session that works with Grok.\n  • Exporting the cookies for grok.com (e.g. Chrome DevTools → Application → Cookies) or copying the cookie: request header from a working request.\n  • Pasting the raw header (for example name=value; name2=value2) into the file and saving it as plain UTF-8 text without quotes or extra blank lines.\n\nAfter updating the file, rerun the downloader.",
         "card_not_found_for_clicking": "Card not found for clicking",
         "card_click_timeout": "Card click timed out",
-        "delete_existing_failed": "Could not delete existing file: {error}",
         "video_processing_error": "Error at video {index}:\n{error}",
         "skipping_no_video_option": "⏭️  Skipping {identifier} card – no video option available",
         "no_image_element": "🔍 Image element not found in card",
@@ -84,6 +81,81 @@ MESSAGES = {
         "upscale_disabled": "⏭️  Upscale disabled by configuration – downloading original video",
         "videos_disabled": "⏭️  Video downloads disabled by configuration – skipping video",
         "no_media_enabled": "❌ DOWNLOAD_VIDEOS and DOWNLOAD_IMAGES are both disabled. Nothing to do.",
+        "manifest_open_failed": "⚠️  Could not open media manifest, checking files directly:\n{error}",
+        "manifest_write_failed": "⚠️  Could not update media manifest:\n{error}",
+        "workers_started": "👷 Started {count} workers.",
+        "async_option_unsupported": "❌ {option} is not supported with ENGINE=async. Turn it off or use ENGINE=sync.",
+        "workers_waiting": "⏳ Waiting for workers to finish ({count} cards queued)...",
+        "worker_card_error": "Worker {worker} failed on {identifier}:\n{error}",
+        "worker_crashed": "❌ Worker {worker} stopped:\n{error}",
+        "worker_unavailable_reason": "No worker was available to process the card",
+        "run_interrupted_reason": "Not processed, the run was interrupted",
+        "transfer_queued": "📤 Download handed off to background: {filename}",
+        "transfers_waiting": "⏳ Waiting for {count} background downloads to finish...",
+        "background_transfer_error": "Background download error:\n{error}",
+        "background_transfer_failed": "Background download failed",
+        "transfer_retry_in_browser": "↩️  Background download of {identifier} failed – retrying it in the browser...",
+        "upscale_requesting": "🕐 Requesting upscale for {identifier}...",
+        "upscale_request_failed": "Could not request upscale:\n{error}",
+        "pipelined_needs_single_worker": "⚠️  UPSCALE_MODE=pipelined only works with WORKERS=1 (now {workers}); upscales are waited for inline.",
+        "upscale_phase_two": "📥 Downloading {count} cards with requested upscales...",
+        "upscale_deferred": "⏳ Upscale of {identifier} is still running, deferring to the next run.",
+        "upscale_deferred_list": "⏳ Upscales still pending (will be retried on the next run):",
+        "deferred_upscales_read_failed": "⚠️  Could not read deferred upscale list:\n{error}",
+        "deferred_upscales_write_failed": "⚠️  Could not save deferred upscale list:\n{error}",
+        "listing_image_direct": "🖼️  Downloading image of {identifier} straight from the listing...",
+        "listing_card_by_route": "🔗 {identifier} is not in the gallery yet – opening it by its detail route...",
+        "listing_page_failed": "⚠️  Favorites listing request failed: HTTP {status} – falling back to scrolling.",
+        "listing_page_error": "⚠️  Favorites listing request error – falling back to scrolling:\n{error}",
+        "listing_record_failed": "⚠️  Could not record listing response:\n{error}",
+        "download_resumed": "⏯️  Resuming {filename} from {offset} bytes...",
+        "download_incomplete": "Download stopped at {received} of {expected} bytes (kept for resuming)",
+        "video_width_mismatch": "⚠️  {name}: MP4 header says {mp4_width}px wide, ffprobe says {ffprobe_width}px – using ffprobe.",
+        "adaptive_wait_summary": "⏱️  Adaptive waits saved {saved}s of the {budget}s fixed delays ({count} waits).",
+        "http2_unavailable": "⚠️  HTTP2 is enabled but httpx/h2 are not installed, using HTTP/1.1 keep-alive.",
+        "trace_written": "📈 Trace saved: {jsonl} (open {chrome} in chrome://tracing or Perfetto)",
+        "trace_write_failed": "⚠️  Could not write the trace file:\n{error}",
+        "metrics_serving": "📊 Metrics available at {url}",
+        "metrics_start_failed": "⚠️  Could not start the metrics exporter:\n{error}",
+        "metrics_write_failed": "⚠️  Could not write the metrics file:\n{error}",
+        "blocked_requests_summary": "🚫 Blocked {count} non-essential requests ({breakdown}), about {saved} MB not downloaded.",
+        "blocked_requests_unmeasured": "The size of {count} blocked requests could not be determined.",
+        "browser_server_connect_failed": "⚠️  Could not connect to the browser server at {url}, launching a browser for this run:\n{error}",
+        "browser_server_ready": "🧭 Browser server ready at {url} ({version})",
+        "browser_server_no_endpoint": "The browser did not open its DevTools endpoint at {url}",
+        "browser_server_unhealthy": "the DevTools endpoint stopped responding",
+        "browser_server_max_age": "BROWSER_SERVER_RESTART_HOURS reached",
+        "browser_server_restarting": "🔁 Restarting the browser server: {reason}",
+        "browser_server_launch_failed": "⚠️  Could not start the server browser, retrying in {seconds}s:\n{error}",
+        "browser_server_stopped": "🛑 Browser server stopped.",
+        "browser_server_no_port": "❌ Set BROWSER_SERVER_PORT to the port the browser server should listen on.",
+        "browser_server_port_in_use": "❌ A browser is already listening at {url}.",
+        "checkpoint_read_failed": "⚠️  Could not read the run checkpoint, starting from the top:\n{error}",
+        "checkpoint_write_failed": "⚠️  Could not save the run checkpoint:\n{error}",
+        "checkpoint_upscale_reason": "upscale did not finish",
+        "checkpoint_none": "ℹ️  No checkpoint to resume from, starting from the top.",
+        "checkpoint_resuming": "⏩ Resuming the previous run: {settled} finished cards are skipped, {retry} are queued again.",
+        "checkpoint_saved": "💾 Progress saved to {path}. Run with RESUME=true to retry the failed and unfinished cards.",
+        "card_detail_failed": "Card page {url} answered with HTTP {status}",
+        "card_detail_timeout": "Card page {url} did not load in time",
+        "verify_no_download_dir": "❌ Download folder {path} does not exist, nothing to verify.",
+        "verify_summary": "🔍 Checked {checked} files in {seconds}s, {corrupt} corrupt (they will be downloaded again on the next run).",
+        "verify_report_read_failed": "⚠️  Could not read the verification report: {error}",
+        "verify_report_write_failed": "⚠️  Could not save the verification report: {error}",
+        "verify_requeue_failed": "⚠️  Could not set aside corrupt file {name}: {error}",
+        "verify_requeued": "♻️  {count} corrupt file(s) from the last verification set aside (.corrupt) and queued for download again.",
+        "verify_reason_empty": "empty file",
+        "verify_reason_unreadable": "file cannot be read",
+        "verify_reason_truncated": "file is cut off",
+        "verify_reason_moov_missing": "MP4 moov box missing",
+        "verify_reason_mdat_missing": "MP4 mdat box missing",
+        "verify_reason_video_track_missing": "no video track",
+        "verify_reason_sample_table_missing": "sample tables missing",
+        "verify_reason_sample_table_truncated": "sample tables cut off",
+        "verify_reason_sample_count_mismatch": "sample tables disagree on the frame count",
+        "verify_reason_chunk_offset_out_of_range": "sample data points past the end of the file",
+        "verify_reason_image_header_invalid": "image header cannot be parsed",
+        "verify_reason_size_mismatch": "does not match the length the server announced at download time",
     },
     "hu": {
         # General messages
@@ -94,7 +166,6 @@ MESSAGES = {
         "process_interrupted": "❌ Folyamat megszakadt:",
         "already_exists_overwrite": "🟡 Már létezik ({filename}), felülírom.",
         "zero_byte_file_delete_retry": "⚠️  0 bájtos fájl — törlöm és megpróbálom a megnyitott kártyából letölteni...",
-        "zero_byte_file_delete_failed": "Nem tudtam törölni a 0 bájtos fájlt: {error}",
         "alternative_download": "🔁 Alternatív letöltés: {url}",
         "alternative_download_success": "📥 Letöltve alternatív forrásból: {filename} ({size} bájt)",
         "download_success": "📥 Videó letöltve: {filename}",
@@ -134,7 +205,6 @@ MESSAGES = {
         "alternative_download_failed": "Alternatív letöltés sikertelen: HTTP {status}",
         "alternative_download_zero_byte": "Alternatív letöltés is 0 bájtos maradt",
         "video_src_not_found": "Nem találtam videó URL-t a kártya DOM-jában",
-        "delete_existing_failed": "Nem tudtam törölni a régi fájlt: {error}",
         "card_identifier_error": "❌ Hiba a videó azonosító kinyerésekor.",
         "no_cards_found": "❌ Nem sikerült betölteni a galériát – ellenőrizd a cookie fájlt.",
         "video_width_unknown": "ismeretlen",
@@ -145,7 +215,6 @@ MESSAGES = {
         "empty_cookie_file": "❌ Hiba a cookie fájllal.\n\nA(z) {path} fájl üres vagy nem a várt name=value; formátumot tartalmazza.\n\nJavítsd így:\n  • Nyisd meg azt a böngésző munkamenetet, amivel a Grok működik.\n  • Exportáld a grok.com sütijeit (pl. Chrome DevTools → Application → Cookies), vagy másold ki egy működő kérés cookie: fejlécét.\n  • Illeszd be a nyers fejlécet (például name=value; name2=value2 formában) a fájlba, és mentsd el egyszerű UTF-8 szövegként idézőjelek és üres sorok nélkül.\n\nA fájl frissítése után futtasd újra a letöltőt.",
         "card_not_found_for_clicking": "A kártya nem található a kattintáshoz",
         "card_click_timeout": "A kártyára kattintás időtúllépett",
-        "delete_existing_failed": "Nem tudtam törölni a régi fájlt: {error}",
         "video_processing_error": "Hiba a(z) {index}. videónál:\n{error}",
         "skipping_no_video_option": "⏭️  {identifier} kártya kihagyása – nincs videó opció",
         "no_image_element": "🔍 Nem találtam kép elemet a kártyában",
@@ -160,6 +229,81 @@ MESSAGES = {
         "upscale_disabled": "⏭️  Beállítás miatt kihagyom az upscale lépést",
         "videos_disabled": "⏭️  Beállítás miatt kihagyom a videó letöltést",
         "no_media_enabled": "❌ A DOWNLOAD_VIDEOS és DOWNLOAD_IMAGES mindkettő ki van kapcsolva, nincs teendő.",
+        "manifest_open_failed": "⚠️  Nem sikerült megnyitni a média manifestet, közvetlenül ellenőrzöm a fájlokat:\n{error}",
+        "manifest_write_failed": "⚠️  Nem sikerült frissíteni a média manifestet:\n{error}",
+        "workers_started": "👷 {count} worker elindítva.",
+        "async_option_unsupported": "❌ A(z) {option} beállítás ENGINE=async mellett nem támogatott. Kapcsold ki, vagy használd az ENGINE=sync módot.",
+        "workers_waiting": "⏳ Várakozás a workerekre ({count} kártya a sorban)...",
+        "worker_card_error": "A(z) {worker}. worker hibázott ennél: {identifier}:\n{error}",
+        "worker_crashed": "❌ A(z) {worker}. worker leállt:\n{error}",
+        "worker_unavailable_reason": "Egy worker sem tudta feldolgozni a kártyát",
+        "run_interrupted_reason": "Nem került sorra, a futás megszakadt",
+        "transfer_queued": "📤 Letöltés átadva a háttérnek: {filename}",
+        "transfers_waiting": "⏳ Várakozás {count} háttérletöltés befejezésére...",
+        "background_transfer_error": "Háttérletöltési hiba:\n{error}",
+        "background_transfer_failed": "Sikertelen háttérletöltés",
+        "transfer_retry_in_browser": "↩️  {identifier} háttérletöltése nem sikerült – újrapróbálás a böngészőben...",
+        "upscale_requesting": "🕐 Upscale kérése: {identifier}...",
+        "upscale_request_failed": "Nem sikerült upscale-t kérni:\n{error}",
+        "pipelined_needs_single_worker": "⚠️  Az UPSCALE_MODE=pipelined csak WORKERS=1 mellett működik (most {workers}); az upscale-ekre helyben várok.",
+        "upscale_phase_two": "📥 {count} upscale-re küldött kártya letöltése...",
+        "upscale_deferred": "⏳ {identifier} upscale-je még fut, a következő futásra halasztom.",
+        "upscale_deferred_list": "⏳ Még folyamatban lévő upscale-ek (a következő futáskor újrapróbálom):",
+        "deferred_upscales_read_failed": "⚠️  Nem sikerült beolvasni a halasztott upscale listát:\n{error}",
+        "deferred_upscales_write_failed": "⚠️  Nem sikerült elmenteni a halasztott upscale listát:\n{error}",
+        "listing_image_direct": "🖼️  {identifier} képének letöltése közvetlenül a listából...",
+        "listing_card_by_route": "🔗 {identifier} még nincs a galériában – megnyitás a részletek útvonalán...",
+        "listing_page_failed": "⚠️  A kedvencek lista lekérése sikertelen: HTTP {status} – görgetésre váltok.",
+        "listing_page_error": "⚠️  Hiba a kedvencek lista lekérésekor – görgetésre váltok:\n{error}",
+        "listing_record_failed": "⚠️  Nem sikerült elmenteni a lista választ:\n{error}",
+        "download_resumed": "⏯️  {filename} folytatása {offset} bájttól...",
+        "download_incomplete": "A letöltés {received} / {expected} bájtnál megszakadt (folytatható)",
+        "video_width_mismatch": "⚠️  {name}: az MP4 fejléc szerint {mp4_width}px széles, az ffprobe szerint {ffprobe_width}px – az ffprobe értékét használom.",
+        "adaptive_wait_summary": "⏱️  Az adaptív várakozás {saved} mp-et spórolt a fix {budget} mp-es késleltetésekből ({count} várakozás).",
+        "http2_unavailable": "⚠️  A HTTP2 be van kapcsolva, de a httpx/h2 csomag nincs telepítve, HTTP/1.1 keep-alive-ot használok.",
+        "trace_written": "📈 Nyomkövetés mentve: {jsonl} (a {chrome} fájl megnyitható a chrome://tracing vagy a Perfetto felületén)",
+        "trace_write_failed": "⚠️  Nem sikerült a nyomkövetési fájl írása:\n{error}",
+        "metrics_serving": "📊 Metrikák elérhetők itt: {url}",
+        "metrics_start_failed": "⚠️  Nem sikerült elindítani a metrika exportálót:\n{error}",
+        "metrics_write_failed": "⚠️  Nem sikerült a metrika fájl írása:\n{error}",
+        "blocked_requests_summary": "🚫 {count} nem szükséges kérés letiltva ({breakdown}), kb. {saved} MB letöltése maradt el.",
+        "blocked_requests_unmeasured": "{count} letiltott kérés méretét nem sikerült megállapítani.",
+        "browser_server_connect_failed": "⚠️  Nem sikerült csatlakozni a böngésző szerverhez ({url}), ehhez a futáshoz új böngészőt indítok:\n{error}",
+        "browser_server_ready": "🧭 A böngésző szerver elérhető: {url} ({version})",
+        "browser_server_no_endpoint": "A böngésző nem nyitotta meg a DevTools végpontot: {url}",
+        "browser_server_unhealthy": "a DevTools végpont nem válaszol",
+        "browser_server_max_age": "elérte a BROWSER_SERVER_RESTART_HOURS értéket",
+        "browser_server_restarting": "🔁 A böngésző szerver újraindítása: {reason}",
+        "browser_server_launch_failed": "⚠️  Nem sikerült elindítani a szerver böngészőt, újrapróbálás {seconds} mp múlva:\n{error}",
+        "browser_server_stopped": "🛑 A böngésző szerver leállt.",
+        "browser_server_no_port": "❌ Állítsd be a BROWSER_SERVER_PORT értékét a böngésző szerver portjára.",
+        "browser_server_port_in_use": "❌ Már fut egy böngésző itt: {url}.",
+        "checkpoint_read_failed": "⚠️  Nem sikerült beolvasni a futás mentett állapotát, az elejéről kezdem:\n{error}",
+        "checkpoint_write_failed": "⚠️  Nem sikerült elmenteni a futás állapotát:\n{error}",
+        "checkpoint_upscale_reason": "az upscale nem fejeződött be",
+        "checkpoint_none": "ℹ️  Nincs folytatható mentett állapot, az elejéről kezdem.",
+        "checkpoint_resuming": "⏩ Az előző futás folytatása: {settled} kész kártyát kihagyok, {retry} újra sorba kerül.",
+        "checkpoint_saved": "💾 Az állapot mentve ide: {path}. RESUME=true beállítással a hibás és befejezetlen kártyák újrapróbálhatók.",
+        "card_detail_failed": "A kártya oldala ({url}) HTTP {status} választ adott",
+        "card_detail_timeout": "A kártya oldala ({url}) nem töltődött be időben",
+        "verify_no_download_dir": "❌ A(z) {path} letöltési mappa nem létezik, nincs mit ellenőrizni.",
+        "verify_summary": "🔍 {checked} fájl ellenőrizve {seconds} mp alatt, ebből {corrupt} sérült (a következő futás újra letölti őket).",
+        "verify_report_read_failed": "⚠️  Nem sikerült beolvasni az ellenőrzési jelentést: {error}",
+        "verify_report_write_failed": "⚠️  Nem sikerült elmenteni az ellenőrzési jelentést: {error}",
+        "verify_requeue_failed": "⚠️  Nem sikerült félretenni a sérült fájlt ({name}): {error}",
+        "verify_requeued": "♻️  {count} sérült fájl a legutóbbi ellenőrzésből félretéve (.corrupt), újra letöltöm őket.",
+        "verify_reason_empty": "üres fájl",
+        "verify_reason_unreadable": "a fájl nem olvasható",
+        "verify_reason_truncated": "a fájl csonka",
+        "verify_reason_moov_missing": "hiányzik az MP4 moov doboz",
+        "verify_reason_mdat_missing": "hiányzik az MP4 mdat doboz",
+        "verify_reason_video_track_missing": "nincs videósáv",
+        "verify_reason_sample_table_missing": "hiányoznak a mintatáblák",
+        "verify_reason_sample_table_truncated": "a mintatáblák csonkák",
+        "verify_reason_sample_count_mismatch": "a mintatáblák eltérő képkockaszámot adnak",
+        "verify_reason_chunk_offset_out_of_range": "a mintaadatok a fájl végén túlra mutatnak",
+        "verify_reason_image_header_invalid": "a kép fejléce nem értelmezhető",
+        "verify_reason_size_mismatch": "nem egyezik a szerver által a letöltéskor jelzett mérettel",
     },
 }
 
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from . import config
+from .localization import print_error, t
+from .transfers import pop_announced_length
+from .video_downloader import probe_video_width
+
+
+@dataclass
+class ManifestEntry:
+    identifier: str
+    kind: str
+    path: str
+    size: int
+    mtime_ns: int
+    width: Optional[int]
+    upscaled: bool
+    expected_size: Optional[int] = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    identifier TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    upscaled INTEGER NOT NULL DEFAULT 0,
+    expected_size INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (identifier, kind)
+)
+"""
+
+
+class MediaManifest:
+    """SQLite record of downloaded media so existing files are not re-probed on every run."""
+
+    def __init__(self, path: str, download_dir: str):
+        self.path = path
+        self.download_dir = download_dir
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(media)")}
+        if "expected_size" not in columns:
+            self._conn.execute("ALTER TABLE media ADD COLUMN expected_size INTEGER")
+        self._conn.commit()
+        self._entries: Dict[Tuple[str, str], ManifestEntry] = {}
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._load_entries()
+        self.refresh_directory()
+
+    def _load_entries(self) -> None:
+        rows = self._conn.execute("SELECT identifier, kind, path, size, mtime_ns, width, upscaled, expected_size FROM media").fetchall()
+        for identifier, kind, path, size, mtime_ns, width, upscaled, expected_size in rows:
+            self._entries[(identifier, kind)] = ManifestEntry(identifier, kind, path, size, mtime_ns, width, bool(upscaled), expected_size)
+
+    def refresh_directory(self) -> None:
+        """Snapshot size and mtime of every file in the download directory with a single scan."""
+        files: Dict[str, Tuple[int, int]] = {}
+        try:
+            with os.scandir(self.download_dir) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+        with self._lock:
+            self._files = files
+
+    def _stat(self, path: str) -> Optional[Tuple[int, int]]:
+        return self._files.get(os.path.basename(path))
+
+    def file_exists(self, path: str) -> bool:
+        return self._stat(path) is not None
+
+    def expected_sizes(self) -> Dict[str, int]:
+        """File name to the length the server announced when it was downloaded over HTTP."""
+        return {os.path.basename(entry.path): entry.expected_size for entry in self._entries.values() if entry.expected_size}
+
+    def entry(self, identifier: str, kind: str) -> Optional[ManifestEntry]:
+        return self._entries.get((identifier, kind))
+
+    def video_width(self, identifier: str, path: str) -> Optional[int]:
+        stat = self._stat(path)
+        if stat is None:
+            return None
+        size, mtime_ns = stat
+        cached = self._entries.get((identifier, "video"))
+        if cached and cached.size == size and cached.mtime_ns == mtime_ns and cached.width is not None:
+            return cached.width
+
+        width = probe_video_width(path)
+        upscaled = width is not None and width >= config.UPSCALE_VIDEO_WIDTH
+        expected_size = cached.expected_size if cached and cached.size == size else None
+        self._store(identifier, "video", path, size, mtime_ns, width, upscaled, expected_size)
+        return width
+
+    def _stat_from_disk(self, path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._files[os.path.basename(path)] = (stat.st_size, stat.st_mtime_ns)
+        return stat.st_size, stat.st_mtime_ns
+
+    def record_video(self, identifier: str, path: str, upscaled: bool) -> None:
+        stat = self._stat_from_disk(path)
+        if stat is None:
+            return
+        width = probe_video_width(path)
+        if width is not None:
+            upscaled = width >= config.UPSCALE_VIDEO_WIDTH
+        self._store(identifier, "video", path, stat[0], stat[1], width, upscaled, pop_announced_length(path))
+
+    def record_image(self, identifier: str, path: str) -> None:
+        stat = self._stat_from_disk(path)
+        if stat is None:
+            return
+        self._store(identifier, "image", path, stat[0], stat[1], None, False, pop_announced_length(path))
+
+    def _store(
+        self, identifier: str, kind: str, path: str, size: int, mtime_ns: int, width: Optional[int], upscaled: bool, expected_size: Optional[int] = None
+    ) -> None:
+        entry = ManifestEntry(identifier, kind, path, size, mtime_ns, width, upscaled, expected_size)
+        with self._lock:
+            self._entries[(identifier, kind)] = entry
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO media (identifier, kind, path, size, mtime_ns, width, upscaled, expected_size, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (identifier, kind, path, size, mtime_ns, width, int(upscaled), expected_size, time.time()),
+                )
+                self._conn.commit()
+            except sqlite3.Error as error:
+                print_error(t("manifest_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+def open_manifest() -> Optional[MediaManifest]:
+    if not config.ENABLE_MEDIA_MANIFEST:
+        return None
+    try:
+        return MediaManifest(config.MEDIA_MANIFEST_FILE, config.DOWNLOAD_DIR)
+    except sqlite3.Error as error:
+        print_error(t("manifest_open_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        return None
+
+
+__all__ = ["MediaManifest", "ManifestEntry", "open_manifest"]
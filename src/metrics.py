@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import config
+from .localization import print_error, t
+from .tracing import add_span_listener, remove_span_listener
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelled: bool = False):
+        super().__init__(name, help_text)
+        # Unlabelled counters start at 0 so they are exported before the first increment.
+        self._values: Dict[LabelKey, float] = {} if labelled else {(): 0}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Set directly or read from a callback at export time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_function(self, function: Optional[Callable[[], float]], **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            if function is None:
+                self._functions.pop(key, None)
+                self._values.pop(key, None)
+            else:
+                self._functions[key] = function
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = float(function())
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=PHASE_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (plus one for +Inf), sum and total count.
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0.0]))
+            counts[slot] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), list(totals)) for key, (counts, totals) in sorted(self._series.items())]
+        lines = []
+        for key, counts, (total_sum, total_count) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(total_count)}")
+        return lines
+
+
+cards_discovered = Counter("grok_cards_discovered_total", "Gallery cards seen for the first time in this run.")
+cards_processed = Counter("grok_cards_processed_total", "Cards whose media were downloaded (failures included, see grok_download_failures_total).")
+cards_skipped = Counter("grok_cards_skipped_total", "Cards left without a download, by reason.", labelled=True)
+download_failures = Counter("grok_download_failures_total", "Failures recorded for the end-of-run error list.")
+upscale_timeouts = Counter("grok_upscale_timeouts_total", "Upscales whose HD version did not appear within UPSCALE_TIMEOUT_MS.")
+fallback_attempts = Counter("grok_fallback_attempts_total", "Fallback download strategies tried, by strategy and result.", labelled=True)
+bytes_downloaded = Counter("grok_bytes_downloaded_total", "Bytes of finished media files, by media type.", labelled=True)
+blocked_requests = Counter("grok_blocked_requests_total", "Page requests aborted or replaced by the request blocking policy, by resource type.", labelled=True)
+blocked_bytes = Counter("grok_blocked_bytes_total", "Bytes the blocked media, image and font requests would have transferred.")
+phase_seconds = Histogram("grok_phase_duration_seconds", "Time spent in each traced phase of card processing.")
+queue_depth = Gauge("grok_queue_depth", "Work waiting in each queue.")
+last_update = Gauge("grok_metrics_updated_timestamp_seconds", "Unix time the metrics were last exported.")
+
+REGISTRY: List[_Metric] = [
+    cards_discovered,
+    cards_processed,
+    cards_skipped,
+    download_failures,
+    upscale_timeouts,
+    fallback_attempts,
+    bytes_downloaded,
+    blocked_requests,
+    blocked_bytes,
+    phase_seconds,
+    queue_depth,
+    last_update,
+]
+
+
+def record_file_saved(path: str, size: int) -> None:
+    if size > 0:
+        bytes_downloaded.inc(size, media="video" if path.endswith(".mp4") else "image")
+
+
+def record_fallback(strategy: str, succeeded: bool) -> None:
+    fallback_attempts.inc(strategy=strategy, result="ok" if succeeded else "failed")
+
+
+def render_metrics() -> str:
+    last_update.set(time.time())
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str) -> None:
+    # Replaced atomically so the node_exporter textfile collector never reads a half-written file.
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        handle.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+def _observe_phase(name: str, seconds: float) -> None:
+    phase_seconds.observe(seconds, phase=name)
+
+
+class MetricsExporter:
+    def __init__(self, textfile: str = "", port: int = 0, host: str = "127.0.0.1", interval: float = 15.0):
+        self.textfile = textfile
+        self.port = port
+        self.host = host
+        self.interval = max(1.0, interval)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        add_span_listener(_observe_phase)
+        if self.port:
+            self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            print(t("metrics_serving", url=f"http://{self.host}:{self._server.server_address[1]}/metrics"))
+        if self.textfile:
+            self._write()
+            self._writer = threading.Thread(target=self._write_periodically, name="metrics-textfile", daemon=True)
+            self._writer.start()
+
+    def _write(self) -> None:
+        try:
+            write_textfile(self.textfile)
+        except OSError as error:
+            print_error(t("metrics_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+    def _write_periodically(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._write()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        remove_span_listener(_observe_phase)
+
+
+_exporter: Optional[MetricsExporter] = None
+
+
+def start_metrics() -> Optional[MetricsExporter]:
+    global _exporter
+    if _exporter is not None or not (config.METRICS_FILE or config.METRICS_PORT):
+        return _exporter
+    exporter = MetricsExporter(config.METRICS_FILE, config.METRICS_PORT, config.METRICS_HOST, config.METRICS_INTERVAL_SEC)
+    try:
+        exporter.start()
+    except OSError as error:
+        print_error(t("metrics_start_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        exporter.stop()
+        return None
+    _exporter = exporter
+    return _exporter
+
+
+def stop_metrics() -> None:
+    global _exporter
+    exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.stop()
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsExporter",
+    "cards_discovered",
+    "cards_processed",
+    "cards_skipped",
+    "download_failures",
+    "upscale_timeouts",
+    "fallback_attempts",
+    "bytes_downloaded",
+    "blocked_requests",
+    "blocked_bytes",
+    "phase_seconds",
+    "queue_depth",
+    "record_file_saved",
+    "record_fallback",
+    "render_metrics",
+    "write_textfile",
+    "start_metrics",
+    "stop_metrics",
+]
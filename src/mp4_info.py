@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class Mp4Info:
+    width: Optional[int]
+    height: Optional[int]
+    duration: Optional[float]
+
+
+def _top_level_boxes(handle: BinaryIO, file_size: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield ``(type, payload_offset, payload_size)`` for each top-level box, seeking over the payloads."""
+    offset = 0
+    while offset + 8 <= file_size:
+        handle.seek(offset)
+        header = handle.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            large = handle.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack(">Q", large)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, size - header_size
+        offset += size
+
+
+def _child_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, bytes]]:
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header_size = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size or offset + size > end:
+            return
+        yield box_type, data[offset + header_size:offset + size]
+        offset += size
+
+
+def _find_child(data: bytes, box_type: bytes) -> Optional[bytes]:
+    for child_type, payload in _child_boxes(data):
+        if child_type == box_type:
+            return payload
+    return None
+
+
+def _movie_duration(moov: bytes) -> Optional[float]:
+    mvhd = _find_child(moov, b"mvhd")
+    if not mvhd:
+        return None
+    if mvhd[0] == 1 and len(mvhd) >= 32:
+        timescale, duration = struct.unpack(">IQ", mvhd[20:32])
+    elif len(mvhd) >= 20:
+        timescale, duration = struct.unpack(">II", mvhd[12:20])
+    else:
+        return None
+    return duration / timescale if timescale else None
+
+
+def _handler_type(mdia: bytes) -> Optional[bytes]:
+    hdlr = _find_child(mdia, b"hdlr")
+    return hdlr[8:12] if hdlr and len(hdlr) >= 12 else None
+
+
+def _sample_entry_size(stbl: bytes) -> Tuple[Optional[int], Optional[int]]:
+    stsd = _find_child(stbl, b"stsd")
+    # Full box header and entry count, then the first VisualSampleEntry with width/height at bytes 32..36.
+    if not stsd or len(stsd) < 8 + 36:
+        return None, None
+    width, height = struct.unpack(">HH", stsd[8 + 32:8 + 36])
+    return (width or None), (height or None)
+
+
+def _track_header_size(trak: bytes) -> Tuple[Optional[int], Optional[int]]:
+    tkhd = _find_child(trak, b"tkhd")
+    if not tkhd or len(tkhd) < 84:
+        return None, None
+    # Width and height are 16.16 fixed point values at the end of the box.
+    width, height = struct.unpack(">II", tkhd[-8:])
+    return (width >> 16 or None), (height >> 16 or None)
+
+
+def _video_track_size(moov: bytes) -> Tuple[Optional[int], Optional[int]]:
+    for box_type, trak in _child_boxes(moov):
+        if box_type != b"trak":
+            continue
+        mdia = _find_child(trak, b"mdia")
+        if mdia is None or _handler_type(mdia) != b"vide":
+            continue
+        minf = _find_child(mdia, b"minf")
+        stbl = _find_child(minf, b"stbl") if minf else None
+        width, height = _sample_entry_size(stbl) if stbl else (None, None)
+        if width is None or height is None:
+            width, height = _track_header_size(trak)
+        if width is not None and height is not None:
+            return width, height
+    return None, None
+
+
+def _read_moov(handle: BinaryIO, file_size: int) -> Optional[bytes]:
+    for box_type, payload_offset, payload_size in _top_level_boxes(handle, file_size):
+        if box_type != b"moov":
+            continue
+        if payload_size > MAX_MOOV_BYTES or payload_offset + payload_size > file_size:
+            return None
+        handle.seek(payload_offset)
+        return handle.read(payload_size)
+    return None
+
+
+def read_mp4_info(path: str) -> Optional[Mp4Info]:
+    """Video width, height and duration from the ``moov`` box of an MP4 file, or None if it has none.
+
+    Only box headers are read while walking the file, so the ``mdat`` payload is skipped whether
+    ``moov`` comes before or after it.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as handle:
+            moov = _read_moov(handle, file_size)
+    except (OSError, struct.error):
+        return None
+    if moov is None:
+        return None
+    try:
+        width, height = _video_track_size(moov)
+        return Mp4Info(width=width, height=height, duration=_movie_duration(moov))
+    except struct.error:
+        return None
+
+
+def _video_sample_table(moov: bytes) -> Optional[bytes]:
+    for box_type, trak in _child_boxes(moov):
+        if box_type != b"trak":
+            continue
+        mdia = _find_child(trak, b"mdia")
+        if mdia is None or _handler_type(mdia) != b"vide":
+            continue
+        minf = _find_child(mdia, b"minf")
+        return _find_child(minf, b"stbl") if minf else None
+    return None
+
+
+def _sample_table_problem(stbl: bytes, file_size: int) -> Optional[str]:
+    stsz = _find_child(stbl, b"stsz")
+    stts = _find_child(stbl, b"stts")
+    if stsz is None or stts is None or len(stsz) < 12 or len(stts) < 8:
+        return "sample_table_missing"
+    sample_count = struct.unpack(">I", stsz[8:12])[0]
+    entry_count = struct.unpack(">I", stts[4:8])[0]
+    if len(stts) < 8 + entry_count * 8:
+        return "sample_table_truncated"
+    timed_samples = sum(struct.unpack(">I", stts[8 + index * 8:12 + index * 8])[0] for index in range(entry_count))
+    if timed_samples != sample_count:
+        return "sample_count_mismatch"
+
+    stco = _find_child(stbl, b"stco")
+    co64 = _find_child(stbl, b"co64")
+    if stco is not None and len(stco) >= 8:
+        count = struct.unpack(">I", stco[4:8])[0]
+        offsets = stco[8:8 + count * 4]
+        if len(offsets) < count * 4:
+            return "sample_table_truncated"
+        last_offset = max(struct.unpack(f">{count}I", offsets), default=0)
+    elif co64 is not None and len(co64) >= 8:
+        count = struct.unpack(">I", co64[4:8])[0]
+        offsets = co64[8:8 + count * 8]
+        if len(offsets) < count * 8:
+            return "sample_table_truncated"
+        last_offset = max(struct.unpack(f">{count}Q", offsets), default=0)
+    else:
+        return "sample_table_missing"
+    if last_offset >= file_size:
+        return "chunk_offset_out_of_range"
+    return None
+
+
+def mp4_structure_problem(path: str) -> Optional[str]:
+    """Short reason code when an MP4 file is truncated or structurally broken, None when it looks intact.
+
+    Checks that every top-level box fits in the file, that ``moov`` and ``mdat`` exist, and that the
+    video track's sample tables agree with each other and point inside the file.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        if file_size == 0:
+            return "empty"
+        seen = set()
+        with open(path, "rb") as handle:
+            for box_type, payload_offset, payload_size in _top_level_boxes(handle, file_size):
+                if payload_offset + payload_size > file_size:
+                    return "truncated"
+                seen.add(box_type)
+            if b"moov" not in seen:
+                return "moov_missing"
+            if b"mdat" not in seen:
+                return "mdat_missing"
+            moov = _read_moov(handle, file_size)
+        if moov is None:
+            return "moov_missing"
+        stbl = _video_sample_table(moov)
+        if stbl is None:
+            return "video_track_missing"
+        return _sample_table_problem(stbl, file_size)
+    except OSError:
+        return "unreadable"
+    except struct.error:
+        return "sample_table_truncated"
+
+
+__all__ = ["Mp4Info", "read_mp4_info", "mp4_structure_problem"]
@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import os
 import random
+from dataclasses import dataclass
+from typing import List, Optional
+from urllib.parse import urljoin
+
 from playwright.sync_api import TimeoutError as PWTimeout
 
 from . import config
+from .adaptive_wait import ReadySignal, cards_added, selector_ready, wait_until
 from .localization import t
 from src import localization
 
 
-def wait_with_jitter(page, base_ms: int):
-    page.wait_for_timeout(base_ms + random.randint(0, config.WAIT_JITTER_MS))
+TRANSIENT_BROWSER_ERRORS = (
+    "target closed",
+    "page closed",
+    "browser has been closed",
+)
+
+
+def is_browser_closed_error(error: Exception) -> bool:
+    err_text = str(error).lower()
+    return any(token in err_text for token in TRANSIENT_BROWSER_ERRORS)
 
 
 def make_aria_selector(tag: str, labels):
@@ -40,7 +54,7 @@ VIDEO_IMAGE_TOGGLE_SELECTOR = make_aria_selector("div", ["Text alignment"])
 IMAGE_BUTTON_SELECTOR = make_button_text_selector(localization.IMAGE_BUTTON_LABELS)
 
 
-def scroll_to_load_more(page, direction: str = "down"):
+def scroll_to_load_more(page, direction: str = "down", ready: Optional[ReadySignal] = None):
     direction = (direction or "down").lower()
     if direction not in {"down", "up"}:
         direction = "down"
@@ -55,23 +69,32 @@ def scroll_to_load_more(page, direction: str = "down"):
     page.mouse.move(int(viewport["width"] * 0.6), int(viewport["height"] * 0.5))
 
     page.mouse.wheel(0, delta_y)
-    wait_with_jitter(page, config.SCROLL_PAUSE_MS)
+    wait_until(page, config.SCROLL_PAUSE_MS, ready)
 
 
-def click_safe_area(page):
+def safe_area_point(page) -> tuple[int, int]:
     viewport = page.viewport_size or {"width": 1280, "height": 800}
     x = int(min(max(viewport["width"] * 0.6, 200), viewport["width"] - 80))
     y = int(min(max(viewport["height"] * 0.2, 120), viewport["height"] - 120))
+    return x, y
+
+
+def click_safe_area(page):
+    x, y = safe_area_point(page)
     page.mouse.click(x, y)
 
 
+VIDEO_SOURCE_SELECTORS = [
+    "video#hd-video[src]",
+    "video#sd-video[src]",
+    "video[src]",
+]
+
+ANCHOR_DOWNLOAD_SCRIPT = "(url) => { const a = document.createElement('a'); a.href = url; a.download = ''; document.body.appendChild(a); a.click(); a.remove(); }"
+
+
 def extract_video_source(page):
-    selectors = [
-        "video#hd-video[src]",
-        "video#sd-video[src]",
-        "video[src]",
-    ]
-    for selector in selectors:
+    for selector in VIDEO_SOURCE_SELECTORS:
         try:
             page.wait_for_selector(selector, timeout=3000)
         except PWTimeout:
@@ -106,28 +129,166 @@ def xpath_literal(value: str) -> str:
     return "concat(" + ", ".join(concat_segments) + ")"
 
 
+def identifier_from_src(src: Optional[str]) -> Optional[str]:
+    if not src:
+        return None
+    identifier = str(src)
+    slash_index = identifier.rfind("/")
+    if slash_index != -1 and slash_index + 1 < len(identifier):
+        name = identifier[slash_index + 1:]
+        question_index = name.find("?")
+        if question_index != -1:
+            name = name[:question_index]
+        if name:
+            return name
+    return identifier
+
+
+def card_detail_url(identifier: str) -> str:
+    """Detail route of a card; the identifier is its image file name, which carries the post id."""
+    post_id = os.path.splitext(identifier)[0]
+    return urljoin(config.FAVORITES_URL, config.CARD_DETAIL_PATH.format(id=post_id))
+
+
 def get_card_identifier(card):
     try:
-        identifier = card.evaluate('el => el.querySelector("img")?.src || null')
+        identifier = identifier_from_src(card.evaluate('el => el.querySelector("img")?.src || null'))
         if identifier:
-            identifier = str(identifier)
-            slash_index = identifier.rfind("/")
-            if slash_index != -1 and slash_index + 1 < len(identifier):
-                name = identifier[slash_index + 1:]
-                question_index = name.find("?")
-                if question_index != -1:
-                    name = name[:question_index]
-                if name:
-                    return name
             return identifier
     except Exception:
         print(t("card_identifier_error"))
     return "No ID"
 
 
-def find_card_by_identifier(page, target_identifier: str):
+@dataclass
+class HarvestedCard:
+    identifier: str
+    src: str
+    index: int
+    top: float
+    left: float
+
+
+HARVEST_CARDS_SCRIPT = """
+(xpath) => {
+    const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const cards = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        const el = snapshot.snapshotItem(i);
+        const img = el.querySelector("img");
+        const rect = el.getBoundingClientRect();
+        cards.push({
+            src: img ? img.src : null,
+            index: i,
+            top: rect.top + window.scrollY,
+            left: rect.left + window.scrollX,
+        });
+    }
+    return cards;
+}
+"""
+
+
+def parse_harvested_cards(raw_cards) -> List[HarvestedCard]:
+    cards: List[HarvestedCard] = []
+    for raw in raw_cards or []:
+        identifier = identifier_from_src(raw.get("src"))
+        if not identifier:
+            continue
+        cards.append(
+            HarvestedCard(
+                identifier=identifier,
+                src=raw["src"],
+                index=int(raw.get("index", len(cards))),
+                top=float(raw.get("top") or 0),
+                left=float(raw.get("left") or 0),
+            )
+        )
+    return cards
+
+
+def harvest_cards(page) -> List[HarvestedCard]:
+    try:
+        raw_cards = page.evaluate(HARVEST_CARDS_SCRIPT, config.CARDS_XPATH)
+    except Exception:
+        print(t("card_identifier_error"))
+        return []
+    return parse_harvested_cards(raw_cards)
+
+
+CARD_ANCESTOR_XPATH = "xpath=ancestor::div[contains(@class,'group/media-post-masonry-card')]"
+
+
+def card_image_xpath(target_identifier: str) -> str:
     literal = xpath_literal(target_identifier)
-    img_locator = page.locator(f"//div[contains(@class,'group/media-post-masonry-card')]//img[contains(@src, {literal})]")
+    return f"//div[contains(@class,'group/media-post-masonry-card')]//img[contains(@src, {literal})]"
+
+
+def find_card_by_identifier(page, target_identifier: str):
+    img_locator = page.locator(card_image_xpath(target_identifier))
     if img_locator.count() == 0:
         return None
-    return img_locator.first.locator("xpath=ancestor::div[contains(@class,'group/media-post-masonry-card')]").first
+    return img_locator.first.locator(CARD_ANCESTOR_XPATH).first
+
+
+SCROLL_TO_OFFSET_SCRIPT = """
+(offset) => {
+    window.scrollTo(0, Math.max(0, offset - window.innerHeight / 2));
+    return document.documentElement.scrollHeight;
+}
+"""
+
+
+def scroll_to_offset(page, offset: float, ready: Optional[ReadySignal] = None) -> int:
+    height = page.evaluate(SCROLL_TO_OFFSET_SCRIPT, offset)
+    wait_until(page, config.SCROLL_PAUSE_MS, ready)
+    return int(height or 0)
+
+
+def locate_card(page, identifier: str, offset: Optional[float] = None):
+    """Find a card that may have scrolled out of the DOM.
+
+    With a known ``offset`` this jumps there and checks, which normally finds the card in one step; the
+    up/down scroll search is only the fallback for cards without an offset or whose jump missed.
+    """
+    card = find_card_by_identifier(page, identifier)
+    if card is not None:
+        return card
+
+    card_rendered = selector_ready(card_image_xpath(identifier), state="attached")
+    if offset is not None:
+        # A page that has not scrolled this far yet grows with every jump, so keep jumping while it does;
+        # a fresh worker page may need many jumps to reach a deep card.
+        previous_height = -1
+        while True:
+            height = scroll_to_offset(page, offset, card_rendered)
+            card = find_card_by_identifier(page, identifier)
+            if card is not None:
+                return card
+            if height > offset or height <= previous_height:
+                break
+            previous_height = height
+
+    print(t("card_search_scroll", identifier=identifier))
+    for _ in range(config.SEARCH_SCROLL_UP_ATTEMPTS):
+        scroll_to_load_more(page, direction="up", ready=card_rendered)
+        card = find_card_by_identifier(page, identifier)
+        if card is not None:
+            return card
+
+    for _ in range(config.SEARCH_SCROLL_DOWN_ATTEMPTS):
+        scroll_to_load_more(page, direction="down", ready=card_rendered)
+        card = find_card_by_identifier(page, identifier)
+        if card is not None:
+            return card
+    return None
+
+
+def scroll_toward(page, offset: float) -> None:
+    """Jump to ``offset``, letting an infinite-scroll gallery load more cards on the way until it reaches that far."""
+    previous_height = -1
+    while True:
+        height = scroll_to_offset(page, offset, cards_added(page.locator(config.CARDS_CSS_SELECTOR).count()))
+        if height > offset or height <= previous_height:
+            return
+        previous_height = height
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import base64
+import fnmatch
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set
+
+from . import config, metrics
+from .http_session import get_session
+from .localization import t
+
+
+# Requests the downloader itself depends on: the app shell, its API calls and the layout.
+ESSENTIAL_RESOURCE_TYPES = frozenset({"document", "script", "stylesheet", "xhr", "fetch", "websocket", "eventsource", "manifest"})
+# Blocked requests of these types are sized afterwards with a one-byte range request.
+MEASURED_RESOURCE_TYPES = frozenset({"media", "image", "font"})
+
+# Blocked images are answered with a transparent 1x1 GIF instead of an error: the <img> keeps its src
+# (get_card_identifier reads it) and fires onload, so the app does not retry or show a broken card.
+PLACEHOLDER_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+ABORT = "abort"
+PLACEHOLDER = "placeholder"
+
+_CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)\s*$")
+
+
+class BlockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.bytes_saved = 0
+        self.unmeasured = 0
+        self._measured_urls: Set[str] = set()
+
+    def record(self, resource_type: str) -> None:
+        with self._lock:
+            self.requests[resource_type] = self.requests.get(resource_type, 0) + 1
+
+    def claim_url(self, url: str) -> bool:
+        with self._lock:
+            if url in self._measured_urls:
+                return False
+            self._measured_urls.add(url)
+            return True
+
+    def add_bytes(self, size: Optional[int]) -> None:
+        with self._lock:
+            if size is None:
+                self.unmeasured += 1
+            else:
+                self.bytes_saved += size
+
+    @property
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(self.requests.values())
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = {}
+            self.bytes_saved = 0
+            self.unmeasured = 0
+            self._measured_urls = set()
+
+
+block_stats = BlockStats()
+
+_measure_lock = threading.Lock()
+_measure_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _matches(url: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatchcase(url, pattern) for pattern in patterns)
+
+
+def _remote_size(url: str) -> Optional[int]:
+    try:
+        response = get_session().get(url, headers={"range": "bytes=0-0"}, stream=True, timeout=config.HTTP_REQUEST_TIMEOUT_SEC)
+    except Exception:
+        return None
+    try:
+        if response.status_code == 206:
+            match = _CONTENT_RANGE_TOTAL.search(response.headers.get("content-range", ""))
+            return int(match.group(1)) if match else None
+        if response.ok and response.headers.get("content-length", "").isdigit():
+            return int(response.headers["content-length"])
+        return None
+    finally:
+        response.close()
+
+
+def _measure(url: str) -> None:
+    size = _remote_size(url)
+    block_stats.add_bytes(size)
+    if size:
+        metrics.blocked_bytes.inc(size)
+
+
+def _schedule_measurement(url: str) -> None:
+    global _measure_executor
+    if not config.BLOCK_MEASURE_SAVINGS or not url.startswith(("http://", "https://")) or not block_stats.claim_url(url):
+        return
+    with _measure_lock:
+        if _measure_executor is None:
+            _measure_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="block-size")
+        _measure_executor.submit(_measure, url)
+
+
+class ResourcePolicy:
+    """Blocks by resource type or URL pattern; essential types only ever by an explicit URL pattern."""
+
+    def __init__(self, resource_types: Iterable[str], url_patterns: Iterable[str], allow_patterns: Iterable[str] = ()):
+        self.resource_types = frozenset(kind for kind in resource_types if kind not in ESSENTIAL_RESOURCE_TYPES)
+        self.url_patterns = tuple(url_patterns)
+        self.allow_patterns = tuple(allow_patterns)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.resource_types or self.url_patterns)
+
+    def decide(self, resource_type: str, url: str) -> Optional[str]:
+        if self.allow_patterns and _matches(url, self.allow_patterns):
+            return None
+        if resource_type not in self.resource_types and not _matches(url, self.url_patterns):
+            return None
+        return PLACEHOLDER if resource_type == "image" else ABORT
+
+    def _record(self, resource_type: str, url: str) -> None:
+        block_stats.record(resource_type)
+        metrics.blocked_requests.inc(resource_type=resource_type)
+        if resource_type in MEASURED_RESOURCE_TYPES:
+            _schedule_measurement(url)
+
+    def handle(self, route, request) -> None:
+        action = self.decide(request.resource_type, request.url)
+        if action is None:
+            route.fallback()
+            return
+        self._record(request.resource_type, request.url)
+        if action == PLACEHOLDER:
+            route.fulfill(status=200, content_type="image/gif", body=PLACEHOLDER_GIF)
+        else:
+            route.abort("blockedbyclient")
+
+    async def handle_async(self, route, request) -> None:
+        action = self.decide(request.resource_type, request.url)
+        if action is None:
+            await route.fallback()
+            return
+        self._record(request.resource_type, request.url)
+        if action == PLACEHOLDER:
+            await route.fulfill(status=200, content_type="image/gif", body=PLACEHOLDER_GIF)
+        else:
+            await route.abort("blockedbyclient")
+
+
+def configured_policy() -> Optional[ResourcePolicy]:
+    if not config.BLOCK_RESOURCES:
+        return None
+    policy = ResourcePolicy(config.BLOCK_RESOURCE_TYPES, config.BLOCK_URL_PATTERNS, config.BLOCK_ALLOW_PATTERNS)
+    return policy if policy.enabled else None
+
+
+def finish_measurements(timeout: float = 10.0) -> None:
+    global _measure_executor
+    with _measure_lock:
+        executor, _measure_executor = _measure_executor, None
+    if executor is None:
+        return
+    done = threading.Event()
+    threading.Thread(target=lambda: (executor.shutdown(wait=True), done.set()), daemon=True).start()
+    if not done.wait(timeout):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def print_block_savings() -> None:
+    if block_stats.total_requests == 0:
+        return
+    finish_measurements()
+    breakdown = ", ".join(f"{kind} {count}" for kind, count in sorted(block_stats.requests.items()))
+    print(t("blocked_requests_summary", count=block_stats.total_requests, breakdown=breakdown, saved=f"{block_stats.bytes_saved / 1024 / 1024:.1f}"))
+    if block_stats.unmeasured:
+        print(f"   {config.COLOR_GRAY}{t('blocked_requests_unmeasured', count=block_stats.unmeasured)}{config.COLOR_RESET}")
+
+
+__all__ = [
+    "ResourcePolicy",
+    "BlockStats",
+    "block_stats",
+    "configured_policy",
+    "finish_measurements",
+    "print_block_savings",
+]
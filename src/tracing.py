@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from . import config
+from .localization import print_error, t
+
+
+@dataclass
+class Span:
+    id: int
+    parent: Optional[int]
+    name: str
+    track: str
+    start_us: int
+    duration_us: int = 0
+    attrs: Dict[str, object] = field(default_factory=dict)
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("grok_trace_span", default=None)
+_current_track: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("grok_trace_track", default=None)
+
+# Called with ``(name, seconds)`` whenever a span ends, whether or not a trace file is being written.
+SpanListener = Callable[[str, float], None]
+_span_listeners: List[SpanListener] = []
+
+
+class _NoSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _SpanScope:
+    def __init__(self, tracer: Optional["Tracer"], name: str, attrs: dict):
+        self._tracer = tracer
+        self._name = name
+        self._attrs = attrs
+        self._span: Optional[Span] = None
+        self._token = None
+        self._started = 0
+
+    def __enter__(self) -> Optional[Span]:
+        self._started = time.perf_counter_ns()
+        if self._tracer is not None:
+            parent = _current_span.get()
+            self._span = self._tracer._open(self._name, parent, self._attrs)
+            self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, _traceback):
+        seconds = (time.perf_counter_ns() - self._started) / 1e9
+        if self._span is not None:
+            _current_span.reset(self._token)
+            if exc_type is not None:
+                self._span.attrs["error"] = exc_type.__name__
+            self._tracer._close(self._span)
+        for listener in list(_span_listeners):
+            listener(self._name, seconds)
+        return False
+
+
+class Tracer:
+    """Writes spans as JSONL while running and as a Chrome trace at the end."""
+
+    def __init__(self, directory: str):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.jsonl_path = os.path.join(directory, f"trace-{stamp}.jsonl")
+        self.chrome_path = os.path.join(directory, f"trace-{stamp}.trace.json")
+        self.spans: List[Span] = []
+        self._origin_ns = time.perf_counter_ns()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._jsonl = open(self.jsonl_path, "w", encoding="utf-8")
+
+    def _now_us(self) -> int:
+        return (time.perf_counter_ns() - self._origin_ns) // 1000
+
+    def _open(self, name: str, parent: Optional[Span], attrs: dict) -> Span:
+        track = _current_track.get() or threading.current_thread().name
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        return Span(id=span_id, parent=parent.id if parent else None, name=name, track=track, start_us=self._now_us(), attrs=dict(attrs))
+
+    def _close(self, span: Span) -> None:
+        span.duration_us = self._now_us() - span.start_us
+        line = json.dumps(asdict(span), default=str)
+        with self._lock:
+            self.spans.append(span)
+            if not self._jsonl.closed:
+                self._jsonl.write(line + "\n")
+                self._jsonl.flush()
+
+    def span(self, name: str, **attrs) -> _SpanScope:
+        return _SpanScope(self, name, attrs)
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        track_ids: Dict[str, int] = {}
+        events = []
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start_us)
+        for span in spans:
+            tid = track_ids.setdefault(span.track, len(track_ids) + 1)
+            events.append({"name": span.name, "ph": "X", "ts": span.start_us, "dur": span.duration_us, "pid": pid, "tid": tid, "args": span.attrs})
+        for track, tid in track_ids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": track}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def close(self) -> None:
+        with self._lock:
+            self._jsonl.close()
+        with open(self.chrome_path, "w", encoding="utf-8") as handle:
+            json.dump(self.chrome_trace(), handle, default=str)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Optional[Tracer]:
+    global _tracer
+    if not config.TRACE_DIR or _tracer is not None:
+        return _tracer
+    try:
+        _tracer = Tracer(config.TRACE_DIR)
+    except OSError as error:
+        print_error(t("trace_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        _tracer = None
+    return _tracer
+
+
+def finish_tracing() -> None:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return
+    try:
+        tracer.close()
+    except OSError as error:
+        print_error(t("trace_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        return
+    print(t("trace_written", jsonl=tracer.jsonl_path, chrome=tracer.chrome_path))
+
+
+def span(name: str, **attrs):
+    tracer = _tracer
+    if tracer is not None:
+        return tracer.span(name, **attrs)
+    if _span_listeners:
+        return _SpanScope(None, name, attrs)
+    return _NO_SPAN
+
+
+def add_span_listener(listener: SpanListener) -> None:
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: SpanListener) -> None:
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+def set_track(name: str) -> None:
+    _current_track.set(name)
+
+
+def traced(name: str):
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+__all__ = [
+    "Span",
+    "SpanListener",
+    "Tracer",
+    "start_tracing",
+    "finish_tracing",
+    "span",
+    "add_span_listener",
+    "remove_span_listener",
+    "set_track",
+    "traced",
+]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from . import config, metrics
+from .localization import print_error, t
+
+
+class TransferPool:
+    """Background threads that move media bytes to disk while the browser moves on to the next card.
+
+    A card whose transfer fails is given back through ``take_failed`` so it can be retried in the browser,
+    with its fallbacks; the pool does not accept it again. Failures nobody took back are returned by ``drain``.
+    """
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="transfer")
+        self._futures: Dict[Future, str] = {}
+        self._failed: Dict[str, List[str]] = {}
+        self._given_back: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def accepts(self, identifier: str) -> bool:
+        with self._lock:
+            return identifier not in self._given_back
+
+    def submit(self, identifier: str, transfer: Callable[[Callable[[str], None]], bool], on_success: Optional[Callable[[], None]] = None) -> Future:
+        """Queue ``transfer(record_failure)``; ``on_success`` runs in the transfer thread once it returns True."""
+        reasons: List[str] = []
+
+        def record_failure(reason: str):
+            print_error(t("download_error", reason=reason))
+            reasons.append(reason)
+
+        def job() -> bool:
+            try:
+                succeeded = transfer(record_failure)
+            except Exception as error:
+                record_failure(t("background_transfer_error", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+                succeeded = False
+            if not succeeded:
+                with self._lock:
+                    self._failed[identifier] = reasons or [t("background_transfer_failed")]
+                return False
+            if on_success is not None:
+                try:
+                    on_success()
+                except Exception as error:
+                    print_error(t("background_transfer_error", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            return True
+
+        future = self._executor.submit(job)
+        with self._lock:
+            self._futures[future] = identifier
+        return future
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for future in self._futures if not future.done())
+
+    def in_flight(self) -> List[str]:
+        """Identifiers whose transfer has not finished yet, or failed and still waits for a retry."""
+        with self._lock:
+            return [identifier for future, identifier in self._futures.items() if not future.done()] + list(self._failed)
+
+    def wait(self) -> None:
+        """Block until every transfer queued so far has finished."""
+        with self._lock:
+            futures = list(self._futures)
+        wait_futures(futures)
+
+    def take_failed(self) -> List[str]:
+        """Identifiers whose transfer failed since the last call; they are retried by the caller, not reported."""
+        with self._lock:
+            identifiers = list(self._failed)
+            self._failed.clear()
+            self._given_back.update(identifiers)
+        return identifiers
+
+    def drain(self) -> List[Tuple[str, str]]:
+        """Wait for every queued transfer and return the failures that were not taken back for a retry."""
+        pending = self.pending
+        if pending:
+            print(t("transfers_waiting", count=pending))
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            failures = [(identifier, reason) for identifier, reasons in self._failed.items() for reason in reasons]
+            self._failed.clear()
+            self._futures.clear()
+        for _ in failures:
+            metrics.download_failures.inc()
+        return failures
+
+
+__all__ = ["TransferPool"]
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from . import config
+from .localization import t
+from .metrics import record_file_saved
+
+
+PART_SUFFIX = ".part"
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
+
+_announced_lengths: Dict[str, int] = {}
+_announced_lock = threading.Lock()
+
+
+class TransferError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class IncompleteTransfer(Exception):
+    def __init__(self, received: int, expected: int):
+        super().__init__(t("download_incomplete", received=received, expected=expected))
+        self.received = received
+        self.expected = expected
+
+
+def part_path(path: str) -> str:
+    return f"{path}{PART_SUFFIX}"
+
+
+def part_meta_path(path: str) -> str:
+    return f"{part_path(path)}.json"
+
+
+def remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def load_part_meta(path: str) -> Optional[dict]:
+    try:
+        with open(part_meta_path(path), "r", encoding="utf-8") as handle:
+            meta = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) else None
+
+
+def save_part_meta(path: str, meta: dict) -> None:
+    with open(part_meta_path(path), "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+
+
+def discard_part(path: str) -> None:
+    remove_quietly(part_path(path))
+    remove_quietly(part_meta_path(path))
+
+
+def resumable_offset(path: str, url: Optional[str] = None) -> int:
+    """Bytes already on disk for ``path`` that a ranged request can continue from (0 when not resumable).
+
+    With ``url`` the ``.part`` file only counts when it was started from that same URL.
+    """
+    meta = load_part_meta(path)
+    if not meta or not meta.get("expected_length"):
+        return 0
+    if url is not None and meta.get("url") != url:
+        return 0
+    try:
+        size = os.path.getsize(part_path(path))
+    except OSError:
+        return 0
+    return size if size <= int(meta["expected_length"]) else 0
+
+
+def has_resumable_part(path: str) -> bool:
+    return resumable_offset(path) > 0
+
+
+def read_part_head(path: str, limit: int) -> bytes:
+    """First ``limit`` bytes already in the ``.part`` file of ``path`` (empty when there is none)."""
+    try:
+        with open(part_path(path), "rb") as handle:
+            return handle.read(limit)
+    except OSError:
+        return b""
+
+
+def finalize_part(part: str, target: str, expected_length: Optional[int] = None) -> int:
+    """Move a finished ``.part`` file over the target; returns the final size (0 means nothing was kept).
+
+    ``expected_length`` is the length the server announced; it is kept for ``pop_announced_length``.
+    """
+    size = os.path.getsize(part)
+    with _announced_lock:
+        _announced_lengths.pop(target, None)
+    if size == 0:
+        remove_quietly(part)
+        return 0
+    os.replace(part, target)
+    remove_quietly(part_meta_path(target))
+    if expected_length:
+        with _announced_lock:
+            _announced_lengths[target] = expected_length
+    record_file_saved(target, size)
+    return size
+
+
+def pop_announced_length(path: str) -> Optional[int]:
+    """Content-Length (or 206 total) of the HTTP transfer that last produced ``path``, None for browser downloads."""
+    with _announced_lock:
+        return _announced_lengths.pop(path, None)
+
+
+def _validator(headers) -> Optional[str]:
+    """The value for ``If-Range``: a strong ETag, otherwise Last-Modified."""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("last-modified") or None
+
+
+def parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    match = _CONTENT_RANGE_RE.match(value or "")
+    if not match:
+        return None, None
+    total = match.group(3)
+    return int(match.group(1)), (int(total) if total != "*" else None)
+
+
+def _write_chunks(response, handle, on_chunk: Optional[Callable[[bytes], None]] = None) -> None:
+    chunk_size = max(1, config.DOWNLOAD_CHUNK_SIZE_KB) * 1024
+    for chunk in response.iter_content(chunk_size):
+        if chunk:
+            handle.write(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+
+def stream_response_to_file(response, target: str, on_chunk: Optional[Callable[[bytes], None]] = None) -> int:
+    """Write an HTTP response body to ``target`` in bounded chunks through a ``.part`` file.
+
+    ``on_chunk`` sees every chunk right after it is written, so callers can inspect the body without reading the file back.
+    """
+    part = part_path(target)
+    try:
+        with open(part, "wb") as handle:
+            _write_chunks(response, handle, on_chunk)
+    except BaseException:
+        remove_quietly(part)
+        raise
+    finally:
+        response.close()
+    return finalize_part(part, target)
+
+
+def download_resumable(
+    fetch: Callable,
+    url: str,
+    target: str,
+    headers: dict,
+    on_resume: Optional[Callable[[int], None]] = None,
+    on_chunk: Optional[Callable[[bytes], None]] = None,
+) -> int:
+    """Download ``url`` into ``target`` through a ``.part`` file, continuing a previous partial transfer when possible.
+
+    ``fetch(url, headers)`` must return a streaming response. The URL, expected length and ETag/Last-Modified
+    are stored next to the ``.part`` file so an interrupted transfer of the same file can continue with
+    ``Range: bytes=N-`` and ``If-Range`` on retry or next run; anything else starts over.
+    ``on_resume(offset)`` runs before appending to an existing ``.part`` file and ``on_chunk`` sees each
+    chunk of the body as it is written. Raises ``TransferError`` for HTTP errors and ``IncompleteTransfer``
+    when the body ends early.
+    """
+    part = part_path(target)
+    meta = load_part_meta(target) or {}
+    offset = resumable_offset(target, url)
+    if offset == 0:
+        meta = {}
+    request_headers = dict(headers)
+    request_headers["range"] = f"bytes={offset}-"
+    if offset and meta.get("validator"):
+        # A changed file then comes back whole (200) instead of as a range of the new one.
+        request_headers["if-range"] = meta["validator"]
+
+    def start_over(stale):
+        # The bytes on disk belong to another version of the file: drop them and fetch it whole once.
+        stale.close()
+        discard_part(target)
+        request_headers.pop("if-range", None)
+        request_headers["range"] = "bytes=0-"
+        return fetch(url, request_headers)
+
+    response = fetch(url, request_headers)
+    try:
+        if response.status_code == 416 and offset > 0:
+            if int(meta.get("expected_length") or -1) == offset:
+                return finalize_part(part, target, offset)
+            response = start_over(response)
+            offset = 0
+        if not response.ok:
+            raise TransferError(response.status_code)
+
+        range_start, total = parse_content_range(response.headers.get("content-range"))
+        if offset and response.status_code == 206 and range_start == offset and total != int(meta["expected_length"]):
+            response = start_over(response)
+            offset = 0
+            if not response.ok:
+                raise TransferError(response.status_code)
+            range_start, total = parse_content_range(response.headers.get("content-range"))
+
+        if response.status_code == 206 and range_start == offset:
+            mode = "ab" if offset else "wb"
+            expected = total
+            if offset and on_resume is not None:
+                on_resume(offset)
+        else:
+            # The server ignored the range (or answered from another offset); start over.
+            mode = "wb"
+            offset = 0
+            expected = total if response.status_code == 206 and range_start == 0 else None
+            if expected is None:
+                length = response.headers.get("content-length")
+                expected = int(length) if length and length.isdigit() else None
+
+        if mode == "wb" or not meta.get("validator"):
+            meta = {"url": url, "expected_length": expected, "validator": _validator(response.headers)}
+        if expected:
+            save_part_meta(target, meta)
+        else:
+            remove_quietly(part_meta_path(target))
+
+        with open(part, mode) as handle:
+            _write_chunks(response, handle, on_chunk)
+    finally:
+        response.close()
+
+    received = os.path.getsize(part)
+    if expected and received < expected:
+        raise IncompleteTransfer(received, expected)
+    return finalize_part(part, target, expected)
+
+
+__all__ = [
+    "PART_SUFFIX",
+    "TransferError",
+    "IncompleteTransfer",
+    "part_path",
+    "part_meta_path",
+    "remove_quietly",
+    "discard_part",
+    "resumable_offset",
+    "has_resumable_part",
+    "read_part_head",
+    "finalize_part",
+    "pop_announced_length",
+    "parse_content_range",
+    "stream_response_to_file",
+    "download_resumable",
+]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Dict, List
+
+from . import config
+from .localization import print_error, t
+
+
+class DeferredUpscales:
+    """Cards whose upscale was requested but not finished yet, kept on disk between runs."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.requested: Dict[str, float] = {}
+
+    def load(self) -> "DeferredUpscales":
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as error:
+            print_error(t("deferred_upscales_read_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            return self
+        if isinstance(data, dict):
+            self.requested = {str(key): float(value) for key, value in data.items()}
+        return self
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(self.requested, handle, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as error:
+            print_error(t("deferred_upscales_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self.requested
+
+    def mark_requested(self, identifier: str) -> None:
+        self.requested.setdefault(identifier, time.time())
+
+    def settle(self, identifier: str) -> None:
+        self.requested.pop(identifier, None)
+
+    def identifiers(self) -> List[str]:
+        return sorted(self.requested, key=self.requested.get)
+
+
+__all__ = ["DeferredUpscales"]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from . import config
+from .image_downloader import image_structure_problem
+from .localization import print_error, t
+from .manifest import open_manifest
+from .mp4_info import mp4_structure_problem
+
+
+VIDEO_PREFIX = "grok-video-"
+IMAGE_PREFIX = "grok-image-"
+CORRUPT_SUFFIX = ".corrupt"
+
+
+@dataclass
+class CorruptMedia:
+    name: str
+    reason: str
+    size: int
+    mtime_ns: int
+
+
+def _media_files(download_dir: str) -> List[os.DirEntry]:
+    try:
+        with os.scandir(download_dir) as entries:
+            return [
+                entry
+                for entry in entries
+                if entry.name.startswith((VIDEO_PREFIX, IMAGE_PREFIX)) and entry.name.endswith((".mp4", ".png")) and entry.is_file()
+            ]
+    except OSError:
+        return []
+
+
+def _check_file(entry: os.DirEntry, expected_size: Optional[int]) -> Optional[CorruptMedia]:
+    try:
+        stat = entry.stat()
+    except OSError:
+        return None
+    if expected_size is not None and stat.st_size != expected_size:
+        reason = "size_mismatch"
+    elif entry.name.startswith(VIDEO_PREFIX):
+        reason = mp4_structure_problem(entry.path)
+    else:
+        reason = image_structure_problem(entry.path)
+    if reason is None:
+        return None
+    return CorruptMedia(name=entry.name, reason=reason, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+
+def verify_downloads(download_dir: str, expected_sizes: Optional[Dict[str, int]] = None, workers: int = 16) -> Tuple[int, List[CorruptMedia]]:
+    """Check every downloaded video and image in parallel; returns how many were checked and the broken ones.
+
+    Only headers, the ``moov`` box and the last kilobyte of each file are read, never the media payload.
+    """
+    expected_sizes = expected_sizes or {}
+    files = _media_files(download_dir)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="verify") as executor:
+        results = executor.map(lambda entry: _check_file(entry, expected_sizes.get(entry.name)), files)
+        corrupt = [result for result in results if result is not None]
+    return len(files), sorted(corrupt, key=lambda item: item.name)
+
+
+def save_report(path: str, corrupt: List[CorruptMedia]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump({"verified_at": time.time(), "corrupt": [asdict(item) for item in corrupt]}, handle, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_report(path: str) -> List[CorruptMedia]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as error:
+        print_error(t("verify_report_read_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+        return []
+    items = data.get("corrupt", []) if isinstance(data, dict) else []
+    corrupt = []
+    for item in items:
+        try:
+            corrupt.append(CorruptMedia(name=str(item["name"]), reason=str(item["reason"]), size=int(item["size"]), mtime_ns=int(item["mtime_ns"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return corrupt
+
+
+def requeue_corrupt_media() -> int:
+    """Set aside the files listed by the last verification so this run downloads them again.
+
+    Files are renamed with a ``.corrupt`` suffix rather than deleted, and only when they have not
+    changed since they were checked. Returns how many files were set aside.
+    """
+    corrupt = load_report(config.VERIFY_REPORT_FILE)
+    if not corrupt:
+        return 0
+    moved = 0
+    for item in corrupt:
+        path = os.path.join(config.DOWNLOAD_DIR, item.name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size != item.size or stat.st_mtime_ns != item.mtime_ns:
+            continue
+        try:
+            os.replace(path, f"{path}{CORRUPT_SUFFIX}")
+        except OSError as error:
+            print_error(t("verify_requeue_failed", name=item.name, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+            continue
+        moved += 1
+    try:
+        os.remove(config.VERIFY_REPORT_FILE)
+    except OSError:
+        pass
+    if moved:
+        print(t("verify_requeued", count=moved))
+    return moved
+
+
+def main() -> None:
+    if not os.path.isdir(config.DOWNLOAD_DIR):
+        print_error(t("verify_no_download_dir", path=config.DOWNLOAD_DIR))
+        return
+
+    started = time.perf_counter()
+    expected_sizes: Dict[str, int] = {}
+    if os.path.exists(config.MEDIA_MANIFEST_FILE):
+        manifest = open_manifest()
+        if manifest is not None:
+            expected_sizes = manifest.expected_sizes()
+            manifest.close()
+
+    checked, corrupt = verify_downloads(config.DOWNLOAD_DIR, expected_sizes, config.VERIFY_WORKERS)
+    for item in corrupt:
+        print(f"   • {config.COLOR_ACCENT}{item.name}{config.COLOR_RESET}: {t('verify_reason_' + item.reason)}")
+
+    try:
+        save_report(config.VERIFY_REPORT_FILE, corrupt)
+    except OSError as error:
+        print_error(t("verify_report_write_failed", error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+    elapsed = time.perf_counter() - started
+    print(t("verify_summary", checked=checked, corrupt=len(corrupt), seconds=f"{elapsed:.1f}"))
+
+
+__all__ = ["CorruptMedia", "verify_downloads", "load_report", "save_report", "requeue_corrupt_media", "main"]
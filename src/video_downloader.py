@@ -9,9 +9,16 @@ import requests
 from playwright.sync_api import TimeoutError as PWTimeout
 
 from . import config
-from .cookies import load_cookie_header
+from .adaptive_wait import animations_done, selector_ready, wait_until
+from .cookies import cookies_to_header, load_cookie_header
+from .http_session import get_session
 from .localization import print_error, t
+from .metrics import record_fallback, upscale_timeouts
+from .mp4_info import read_mp4_info
+from .tracing import span, traced
+from .transfers import IncompleteTransfer, TransferError, download_resumable, finalize_part, has_resumable_part, part_path, remove_quietly
 from .playwright_utils import (
+    ANCHOR_DOWNLOAD_SCRIPT,
     DOWNLOAD_BUTTON_SELECTOR,
     MORE_OPTIONS_BUTTON_SELECTOR,
     UPSCALE_MENU_ACTIVE_XPATH,
@@ -19,7 +26,6 @@ from .playwright_utils import (
     VIDEO_IMAGE_TOGGLE_SELECTOR,
     click_safe_area,
     extract_video_source,
-    wait_with_jitter,
 )
 
 
@@ -52,7 +58,7 @@ def _run_ffprobe(path: str) -> Optional[str]:
     return result.stdout
 
 
-def probe_video_width(path: str) -> Optional[int]:
+def _ffprobe_video_width(path: str) -> Optional[int]:
     global _FFPROBE_AVAILABLE
 
     if _FFPROBE_AVAILABLE is False:
@@ -81,6 +87,75 @@ def probe_video_width(path: str) -> Optional[int]:
     return None
 
 
+def probe_video_width(path: str) -> Optional[int]:
+    """Video width read from the MP4 headers in-process; ffprobe is used for other containers or as a cross-check."""
+    info = read_mp4_info(path)
+    width = info.width if info is not None else None
+    if width is None:
+        return _ffprobe_video_width(path)
+    if config.FFPROBE_CROSS_CHECK:
+        ffprobe_width = _ffprobe_video_width(path)
+        if ffprobe_width is not None and ffprobe_width != width:
+            print_error(t("video_width_mismatch", name=os.path.basename(path), mp4_width=width, ffprobe_width=ffprobe_width))
+            return ffprobe_width
+    return width
+
+
+VIDEO_REQUEST_HEADERS = {
+    "user-agent": config.USER_AGENT,
+    "accept": "video/mp4,video/*;q=0.9,*/*;q=0.8",
+    "referer": config.FAVORITES_URL,
+}
+
+
+@traced("http.video")
+def _download_video_via_http(url: str, filepath: str, filename: str, record_failure, cookie_header: Optional[str] = None) -> bool:
+    headers = dict(VIDEO_REQUEST_HEADERS)
+
+    if cookie_header is None:
+        try:
+            cookie_header = load_cookie_header(config.COOKIE_FILE)
+        except Exception:
+            cookie_header = None
+    if cookie_header:
+        headers["cookie"] = cookie_header
+
+    def fetch(request_url: str, request_headers: dict):
+        return get_session().get(request_url, stream=True, headers=request_headers, timeout=config.HTTP_REQUEST_TIMEOUT_SEC)
+
+    def announce_resume(offset: int):
+        print(t("download_resumed", filename=filename, offset=offset))
+
+    alt_size = 0
+    for attempt in range(max(1, config.DOWNLOAD_RETRIES + 1)):
+        try:
+            alt_size = download_resumable(fetch, url, filepath, headers, on_resume=announce_resume)
+            break
+        except TransferError as status_err:
+            record_failure(t("alternative_download_failed", status=status_err.status))
+            return False
+        except (requests.RequestException, IncompleteTransfer, OSError) as req_err:
+            if attempt < config.DOWNLOAD_RETRIES:
+                continue
+            record_failure(t("alternative_download_http_error", error=f"{config.COLOR_GRAY}{req_err}{config.COLOR_RESET}"))
+            return False
+
+    if alt_size == 0:
+        record_failure(t("alternative_download_zero_byte"))
+        return False
+
+    print(t("alternative_download_success", filename=filename, size=alt_size))
+    return True
+
+
+def _context_cookie_header(page, url: str) -> Optional[str]:
+    try:
+        return cookies_to_header(page.context.cookies(url)) or None
+    except Exception:
+        return None
+
+
+@traced("video.fallback")
 def _attempt_video_fallback(page, filepath: str, filename: str, record_failure) -> bool:
     fallback_url = extract_video_source(page)
     if not fallback_url:
@@ -89,86 +164,85 @@ def _attempt_video_fallback(page, filepath: str, filename: str, record_failure)
 
     print(t("alternative_download", url=fallback_url))
 
-    try:
-        api_resp = page.context.request.get(
-            fallback_url,
-            headers={
-                "user-agent": config.USER_AGENT,
-                "accept": "video/mp4,video/*;q=0.9,*/*;q=0.8",
-                "referer": config.FAVORITES_URL,
-                "range": "bytes=0-",
-            },
-        )
-        if api_resp.ok:
-            content = api_resp.body()
-            with open(filepath, "wb") as handle:
-                handle.write(content)
-
-            alt_size = os.path.getsize(filepath)
-            if alt_size == 0:
-                record_failure(t("alternative_download_zero_byte"))
-                return False
-            print(t("alternative_download_success", filename=filename, size=alt_size))
+    # First try with the live browser session cookies, streamed to disk instead of buffered by the API request context.
+    browser_cookie_header = _context_cookie_header(page, fallback_url)
+    if browser_cookie_header and fallback_url.startswith(("http://", "https://")):
+        with span("video.fallback.browser_cookies"):
+            success = _download_video_via_http(fallback_url, filepath, filename, lambda _reason: None, cookie_header=browser_cookie_header)
+        record_fallback("browser_cookies", success)
+        if success:
             return True
-    except Exception:
-        pass
 
     try:
-        with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
-            page.evaluate(
-                "(url) => { const a = document.createElement('a'); a.href = url; a.download = ''; document.body.appendChild(a); a.click(); a.remove(); }",
-                fallback_url,
-            )
-        download = dl_info.value
-        download.save_as(filepath)
-        if os.path.getsize(filepath) > 0:
-            print(t("alternative_download_success", filename=filename, size=os.path.getsize(filepath)))
+        with span("video.fallback.anchor"):
+            with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
+                page.evaluate(ANCHOR_DOWNLOAD_SCRIPT, fallback_url)
+            download = dl_info.value
+            part = part_path(filepath)
+            download.save_as(part)
+            size = finalize_part(part, filepath)
+        record_fallback("anchor", size > 0)
+        if size > 0:
+            print(t("alternative_download_success", filename=filename, size=size))
             return True
     except Exception:
-        pass
+        record_fallback("anchor", False)
+        remove_quietly(part_path(filepath))
 
-    headers = {
-        "user-agent": config.USER_AGENT,
-        "accept": "video/mp4,video/*;q=0.9,*/*;q=0.8",
-        "referer": config.FAVORITES_URL,
-        "range": "bytes=0-",
-    }
+    with span("video.fallback.cookie_file"):
+        success = _download_video_via_http(fallback_url, filepath, filename, record_failure)
+    record_fallback("cookie_file", success)
+    return success
 
-    try:
-        try:
-            cookie_header = load_cookie_header(config.COOKIE_FILE)
-        except Exception:
-            cookie_header = None
-        if cookie_header:
-            headers["cookie"] = cookie_header
-
-        response = requests.get(
-            fallback_url,
-            stream=True,
-            headers=headers,
-            timeout=config.HTTP_REQUEST_TIMEOUT_SEC,
-        )
-    except requests.RequestException as req_err:
-        record_failure(t("alternative_download_http_error", error=f"{config.COLOR_GRAY}{req_err}{config.COLOR_RESET}"))
-        return False
 
-    if not response.ok:
-        record_failure(t("alternative_download_failed", status=response.status_code))
+@traced("video.handoff")
+def _hand_off_video(page, identifier: str, video_path: str, transfer_pool, on_saved) -> bool:
+    media_url = extract_video_source(page)
+    if not media_url or not media_url.startswith(("http://", "https://")):
         return False
 
-    with open(filepath, "wb") as handle:
-        for chunk in response.iter_content(1024 * 1024):
-            handle.write(chunk)
+    cookie_header = _context_cookie_header(page, media_url)
+    video_filename = os.path.basename(video_path)
 
-    alt_size = os.path.getsize(filepath)
-    if alt_size == 0:
-        record_failure(t("alternative_download_zero_byte"))
-        return False
+    def transfer(record_failure) -> bool:
+        return _download_video_via_http(media_url, video_path, video_filename, record_failure, cookie_header=cookie_header)
 
-    print(t("alternative_download_success", filename=filename, size=alt_size))
+    transfer_pool.submit(identifier, transfer, on_success=on_saved)
+    print(t("transfer_queued", filename=f"{config.COLOR_ACCENT}{video_filename}{config.COLOR_RESET}"))
     return True
 
 
+@traced("video.upscale_request")
+def request_upscale(page) -> str:
+    """Open the card menu and start an upscale without waiting for it; returns "already" or "started"."""
+    page.wait_for_selector(MORE_OPTIONS_BUTTON_SELECTOR, timeout=config.MORE_OPTIONS_BUTTON_TIMEOUT_MS)
+    page.locator(MORE_OPTIONS_BUTTON_SELECTOR).first.click()
+    print(t("menu_opened"))
+
+    disabled = page.locator(UPSCALE_MENU_DISABLED_XPATH)
+    active = page.locator(UPSCALE_MENU_ACTIVE_XPATH)
+    wait_until(page, config.WAIT_AFTER_CARD_SCROLL_MS, selector_ready(f"{UPSCALE_MENU_DISABLED_XPATH} | {UPSCALE_MENU_ACTIVE_XPATH}"))
+
+    if disabled.count() > 0:
+        print(t("already_upscaled"))
+        click_safe_area(page)
+        return "already"
+
+    print(t("upscale_start"))
+    active.first.click()
+    wait_until(page, config.WAIT_AFTER_MENU_INTERACTION_MS, animations_done())
+    click_safe_area(page)
+    return "started"
+
+
+def hd_version_ready(page, timeout_ms: int) -> bool:
+    try:
+        page.wait_for_selector(config.HD_BUTTON_SELECTOR, timeout=timeout_ms)
+        return True
+    except PWTimeout:
+        return False
+
+
 def card_has_video_toggle(page) -> bool:
     try:
         page.wait_for_selector(VIDEO_IMAGE_TOGGLE_SELECTOR, timeout=config.VIDEO_IMAGE_TOGGLE_TIMEOUT_MS)
@@ -180,6 +254,7 @@ def card_has_video_toggle(page) -> bool:
         return False
 
 
+@traced("video")
 def download_video_for_card(
     page,
     identifier: str,
@@ -187,35 +262,33 @@ def download_video_for_card(
     item_index: int,
     upscale_failures: List[str],
     record_failure,
-) -> bool:
-    if config.UPSCALE_VIDEOS:
-        page.wait_for_selector(MORE_OPTIONS_BUTTON_SELECTOR, timeout=config.MORE_OPTIONS_BUTTON_TIMEOUT_MS)
-        page.locator(MORE_OPTIONS_BUTTON_SELECTOR).first.click()
-        print(t("menu_opened"))
-
-        disabled = page.locator(UPSCALE_MENU_DISABLED_XPATH)
-        active = page.locator(UPSCALE_MENU_ACTIVE_XPATH)
-        wait_with_jitter(page, config.WAIT_AFTER_CARD_SCROLL_MS)
-
-        if disabled.count() > 0:
-            print(t("already_upscaled"))
-            click_safe_area(page)
-        else:
-            print(t("upscale_start"))
-            active.first.click()
-            wait_with_jitter(page, config.WAIT_AFTER_MENU_INTERACTION_MS)
-            click_safe_area(page)
+    transfer_pool=None,
+    on_saved=None,
+    upscale: bool = True,
+) -> str:
+    """Upscale if asked and save the video; returns "saved", "queued" (handed to ``transfer_pool``) or "failed"."""
+    if upscale and config.UPSCALE_VIDEOS:
+        if request_upscale(page) == "started":
             try:
-                page.wait_for_selector(config.HD_BUTTON_SELECTOR, timeout=config.UPSCALE_TIMEOUT_MS)
+                with span("video.upscale_wait"):
+                    page.wait_for_selector(config.HD_BUTTON_SELECTOR, timeout=config.UPSCALE_TIMEOUT_MS)
                 print(t("upscale_success"))
             except PWTimeout:
                 print(t("upscale_timeout"))
                 upscale_failures.append(identifier)
+                upscale_timeouts.inc()
 
-        wait_with_jitter(page, config.WAIT_AFTER_MENU_INTERACTION_MS)
-    else:
+        wait_until(page, config.WAIT_AFTER_MENU_INTERACTION_MS, animations_done())
+    elif upscale:
         print(t("upscale_disabled"))
 
+    # A card whose background transfer already failed goes through the in-browser download and fallbacks.
+    if transfer_pool is not None and transfer_pool.accepts(identifier) and _hand_off_video(page, identifier, media_info.video_path, transfer_pool, on_saved):
+        return "queued"
+    return "saved" if _save_video_in_browser(page, media_info, item_index, record_failure, on_saved) else "failed"
+
+
+def _save_video_in_browser(page, media_info, item_index: int, record_failure, on_saved) -> bool:
     dl_button = page.locator(DOWNLOAD_BUTTON_SELECTOR)
     if dl_button.count() == 0:
         record_failure(t("no_download_button"))
@@ -228,20 +301,25 @@ def download_video_for_card(
     button.wait_for(state="visible", timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS)
 
     if os.path.exists(video_path):
+        # The existing file stays in place until the new download is complete and renamed over it.
         print(t("already_exists_overwrite", filename=video_filename))
-        try:
-            os.remove(video_path)
-        except OSError as remove_err:
-            record_failure(t("delete_existing_failed", error=remove_err))
-            return False
+
+    if has_resumable_part(video_path):
+        resume_url = extract_video_source(page)
+        if resume_url and resume_url.startswith(("http://", "https://")):
+            if _download_video_via_http(resume_url, video_path, video_filename, lambda _reason: None, cookie_header=_context_cookie_header(page, resume_url)):
+                if on_saved is not None:
+                    on_saved()
+                return True
 
     download_event = None
     fallback_needed = False
 
     try:
-        with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
-            button.click()
-        download_event = dl_info.value
+        with span("video.expect_download"):
+            with page.expect_download(timeout=config.DOWNLOAD_BUTTON_TIMEOUT_MS) as dl_info:
+                button.click()
+            download_event = dl_info.value
     except PWTimeout:
         fallback_needed = True
     except Exception as error:
@@ -256,17 +334,17 @@ def download_video_for_card(
 
     if download_event is not None:
         try:
-            download_event.save_as(video_path)
-            if os.path.getsize(video_path) == 0:
+            part = part_path(video_path)
+            with span("video.save"):
+                download_event.save_as(part)
+                size = finalize_part(part, video_path)
+            if size == 0:
                 print_error(t("zero_byte_file_delete_retry"))
-                try:
-                    os.remove(video_path)
-                except OSError as remove_err:
-                    record_failure(t("zero_byte_file_delete_failed", error=remove_err))
-                    return False
                 fallback_needed = True
             else:
                 print(t("download_success", filename=accent_video_filename))
+                if on_saved is not None:
+                    on_saved()
                 return True
         except Exception as error:
             record_failure(
@@ -282,9 +360,11 @@ def download_video_for_card(
         return False
 
     if _attempt_video_fallback(page, video_path, video_filename, record_failure):
+        if on_saved is not None:
+            on_saved()
         return True
 
     return False
 
 
-__all__ = ["download_video_for_card", "card_has_video_toggle", "probe_video_width"]
+__all__ = ["download_video_for_card", "card_has_video_toggle", "probe_video_width", "request_upscale", "hd_version_ready"]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from . import config
+from .browser import close_context, launch_context, open_gallery, prepare_page
+from .localization import print_error, t
+from .playwright_utils import is_browser_closed_error
+
+
+class CardWorkerPool:
+    """Worker threads that each drive their own page and process cards pulled from a shared queue.
+
+    Playwright's sync API is bound to the thread that started it, so every worker runs its own
+    Playwright instance and browser instead of sharing the coordinator's context.
+    """
+
+    def __init__(self, worker_count: int, cookies, handler: Callable):
+        self.worker_count = max(1, worker_count)
+        self.cookies = cookies
+        self.handler = handler
+        self._queue: queue.Queue = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._index = itertools.count()
+        self._index_lock = threading.Lock()
+
+    def start(self) -> None:
+        for worker_id in range(1, self.worker_count + 1):
+            thread = threading.Thread(target=self._run_worker, args=(worker_id,), name=f"card-worker-{worker_id}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(t("workers_started", count=self.worker_count))
+
+    def submit(self, identifier: str, media_info, offset: Optional[float] = None) -> None:
+        self._queue.put((identifier, media_info, offset))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def next_index(self) -> int:
+        with self._index_lock:
+            return next(self._index)
+
+    def _take_queued(self) -> List[str]:
+        identifiers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return identifiers
+            if item is not None:
+                identifiers.append(item[0])
+
+    def join(self, abandon: bool = False) -> List[str]:
+        """Wait for the workers and return identifiers no worker took.
+
+        Normally the queue is worked off first; with ``abandon`` (the run was interrupted) queued cards are
+        taken out right away and only the cards already in progress are finished.
+        """
+        leftovers = self._take_queued() if abandon else []
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        return leftovers + self._take_queued()
+
+    def _run_worker(self, worker_id: int) -> None:
+        try:
+            with sync_playwright() as playwright:
+                context = launch_context(playwright, self.cookies, profile=f"worker-{worker_id}")
+                try:
+                    page = prepare_page(context.new_page())
+                    # With CARD_NAVIGATION=tab the worker only opens detail routes and never needs the gallery.
+                    if config.CARD_NAVIGATION != "tab" and not open_gallery(page):
+                        return
+                    while True:
+                        item = self._queue.get()
+                        if item is None:
+                            break
+                        identifier, media_info, offset = item
+                        try:
+                            self.handler(page, identifier, media_info, offset, self.next_index())
+                        except Exception as error:
+                            if is_browser_closed_error(error):
+                                # Hand the card back so a healthy worker can pick it up.
+                                self._queue.put(item)
+                                raise
+                            print_error(t("worker_card_error", worker=worker_id, identifier=identifier, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+                finally:
+                    try:
+                        close_context(context)
+                    except Exception:
+                        pass
+        except Exception as error:
+            print_error(t("worker_crashed", worker=worker_id, error=f"{config.COLOR_GRAY}{error}{config.COLOR_RESET}"))
+
+
+__all__ = ["CardWorkerPool"]
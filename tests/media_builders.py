@@ -0,0 +1,91 @@
+"""Small, structurally valid media files for the parser tests, built in memory."""
+
+from __future__ import annotations
+
+import struct
+import zlib
+
+
+HD_SIZE = (928, 1376)
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type: bytes, payload: bytes, version: int = 0, flags: int = 0) -> bytes:
+    return _box(box_type, struct.pack(">I", (version << 24) | flags) + payload)
+
+
+def build_mp4(width: int, height: int, size: int, duration_s: int = 6) -> bytes:
+    """A structurally valid MP4 (ftyp, moov, mdat) of about ``size`` bytes with one video track of the given size."""
+    timescale = 1000
+    matrix = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+    mvhd = _full_box(b"mvhd", struct.pack(">IIII", 0, 0, timescale, duration_s * timescale) + struct.pack(">IH10x", 0x00010000, 0x0100) + matrix + bytes(24) + struct.pack(">I", 2))
+    tkhd = _full_box(
+        b"tkhd",
+        struct.pack(">III4xI8xHHH2x", 0, 0, 1, duration_s * timescale, 0, 0, 0) + matrix + struct.pack(">II", width << 16, height << 16),
+        flags=3,
+    )
+    mdhd = _full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, timescale, duration_s * timescale, 0x55C4, 0))
+    hdlr = _full_box(b"hdlr", struct.pack(">I4s12x", 0, b"vide") + b"VideoHandler\x00")
+    avc1 = _box(b"avc1", bytes(6) + struct.pack(">H", 1) + bytes(16) + struct.pack(">HHIIIH", width, height, 0x00480000, 0x00480000, 0, 1) + bytes(32) + struct.pack(">Hh", 0x18, -1))
+    stsd = _full_box(b"stsd", struct.pack(">I", 1) + avc1)
+    stts = _full_box(b"stts", struct.pack(">III", 1, 1, duration_s * timescale))
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+
+    def moov_with_offset(chunk_offset: int, sample_size: int) -> bytes:
+        stco = _full_box(b"stco", struct.pack(">II", 1, chunk_offset))
+        stsz = _full_box(b"stsz", struct.pack(">III", 0, 1, sample_size))
+        stbl = _box(b"stbl", stsd + stts + stsz + stco)
+        minf = _box(b"minf", _full_box(b"vmhd", bytes(8), flags=1) + stbl)
+        mdia = _box(b"mdia", mdhd + hdlr + minf)
+        return _box(b"moov", mvhd + _box(b"trak", tkhd + mdia))
+
+    header_size = len(ftyp) + len(moov_with_offset(0, 0)) + 8
+    mdat_payload = max(1, size - header_size)
+    moov = moov_with_offset(header_size, mdat_payload)
+    return ftyp + moov + _box(b"mdat", bytes(mdat_payload))
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+
+def build_png(width: int, height: int, size: int) -> bytes:
+    """A PNG with a real header and trailer, padded to about ``size`` bytes with a private ancillary chunk."""
+    head = b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    tail = _png_chunk(b"IEND", b"")
+    padding = max(0, size - len(head) - len(tail) - 12)
+    return head + _png_chunk(b"grOk", bytes(padding)) + tail
+
+
+
+def build_jpeg(width: int, height: int, exif_kb: int = 0, size: int = 0) -> bytes:
+    """A baseline JPEG header (optionally after a large APP1 segment) with padded scan data and an EOI marker."""
+    data = bytearray(b"\xff\xd8")
+    remaining = exif_kb * 1024
+    while remaining > 0:
+        # Several APP segments, as cameras write them, so the parser has to walk past each one.
+        payload = min(remaining, 65000)
+        data += b"\xff\xe1" + struct.pack(">H", payload + 2) + b"Exif\x00\x00" + bytes(payload - 6)
+        remaining -= payload
+    data += b"\xff\xdb" + struct.pack(">H", 67) + bytes(65)
+    data += b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + bytes(9)
+    data += b"\xff\xda" + struct.pack(">H", 12) + bytes(10)
+    data += bytes(max(0, size - len(data) - 2))
+    return bytes(data + b"\xff\xd9")
+
+
+def _riff(chunk_type: bytes, chunk: bytes, size: int) -> bytes:
+    body = b"WEBP" + chunk_type + struct.pack("<I", len(chunk)) + chunk
+    padding = max(0, size - len(body) - 8)
+    if padding:
+        padding = max(8, padding)
+        body += b"JUNK" + struct.pack("<I", padding - 8) + bytes(padding - 8)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def build_webp_vp8x(width: int, height: int, size: int) -> bytes:
+    chunk = bytes(4) + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    return _riff(b"VP8X", chunk, size)
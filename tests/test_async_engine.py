@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from playwright.async_api import TimeoutError as PWTimeout
+
+from src import async_engine, config
+
+
+class FakeCheckpoint:
+    def __init__(self):
+        self.finished = []
+
+    def finish(self, identifier: str) -> None:
+        self.finished.append(identifier)
+
+
+class FakePopup:
+    def __init__(self, image_src: str):
+        self.url = image_src
+        self.closed = False
+
+    async def wait_for_load_state(self, *_args, **_kwargs):
+        return None
+
+    def locator(self, _selector):
+        return FakeLocator(self.url)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeLocator:
+    def __init__(self, src=None, on_click=None):
+        self.src = src
+        self.on_click = on_click
+
+    @property
+    def first(self):
+        return self
+
+    async def count(self):
+        return 1
+
+    async def get_attribute(self, _name):
+        return self.src
+
+    async def wait_for(self, **_kwargs):
+        return None
+
+    async def click(self):
+        if self.on_click is not None:
+            self.on_click()
+
+
+class FakeDownloadInfo:
+    @property
+    def value(self):
+        async def timed_out():
+            raise PWTimeout("no download")
+
+        return timed_out()
+
+
+class FakeCardPage:
+    """A card page whose download button opens a popup instead of starting a download."""
+
+    def __init__(self, context, popup: FakePopup, concurrent: "FakeCardPage | None" = None):
+        self.context = context
+        self.popup = popup
+        self.concurrent = concurrent
+        self.listeners = []
+        context.pages.append(self)
+
+    def on(self, event, listener):
+        assert event == "popup"
+        self.listeners.append(listener)
+
+    def remove_listener(self, event, listener):
+        self.listeners.remove(listener)
+
+    def locator(self, _selector):
+        return FakeLocator(on_click=self._open_popup)
+
+    def _open_popup(self):
+        if self.concurrent is not None:
+            self.concurrent._open_popup()
+        self.context.pages.append(self.popup)
+        for listener in list(self.listeners):
+            listener(self.popup)
+
+    @asynccontextmanager
+    async def expect_download(self, **_kwargs):
+        yield FakeDownloadInfo()
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+
+class MediaInfo:
+    image_path = "unused.png"
+    image_exists = False
+
+
+def test_refuses_options_only_the_sync_runner_supports(monkeypatch, capsys):
+    monkeypatch.setattr(config, "DOWNLOAD_VIDEOS", True)
+    monkeypatch.setattr(config, "BACKGROUND_TRANSFERS", True)
+
+    def no_browser():
+        raise AssertionError("the browser must not start")
+
+    monkeypatch.setattr(async_engine, "async_playwright", no_browser)
+
+    asyncio.run(async_engine.run_async())
+
+    assert "BACKGROUND_TRANSFERS" in capsys.readouterr().out
+
+
+def test_workers_share_the_queue_and_report_missing_cards(monkeypatch):
+    monkeypatch.setattr(config, "CARD_NAVIGATION", "click")
+    monkeypatch.setattr(config, "ENABLE_ASSET_ROUTING", False)
+    monkeypatch.setattr(config, "BLOCK_RESOURCES", False)
+    processed = []
+
+    class WorkerPage:
+        async def add_init_script(self, _script):
+            return None
+
+        async def close(self):
+            return None
+
+    class WorkerContext:
+        async def new_page(self):
+            return WorkerPage()
+
+    async def open_gallery(_page):
+        return True
+
+    async def locate_card(_page, identifier, _offset):
+        return None if identifier == "gone" else f"card-{identifier}"
+
+    async def process_one_card(_page, card, index, identifier, *_args):
+        processed.append((identifier, card, index))
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(async_engine, "open_gallery", open_gallery)
+    monkeypatch.setattr(async_engine, "locate_card", locate_card)
+    monkeypatch.setattr(async_engine, "process_one_card", process_one_card)
+    state = {"upscale_failures": [], "download_failures": [], "processed_count": 0, "manifest": None, "checkpoint": FakeCheckpoint()}
+
+    async def run_workers():
+        card_queue = asyncio.Queue()
+        for identifier in ("a", "b", "gone", "c"):
+            card_queue.put_nowait((identifier, MediaInfo(), None))
+        for _ in range(2):
+            card_queue.put_nowait(None)
+        await asyncio.gather(*(async_engine._card_worker(worker_id, WorkerContext(), card_queue, state) for worker_id in (1, 2)))
+
+    asyncio.run(run_workers())
+
+    assert sorted(identifier for identifier, _, _ in processed) == ["a", "b", "c"]
+    assert sorted(index for _, _, index in processed) == [0, 1, 2]
+    assert sorted(state["checkpoint"].finished) == ["a", "b", "c"]
+    assert [identifier for identifier, _ in state["download_failures"]] == ["gone"]
+
+
+def test_image_popup_fallback_leaves_other_workers_pages_alone(monkeypatch):
+    saved = []
+    monkeypatch.setattr(async_engine, "_download_image_from_url", lambda src, path: saved.append(src) or True)
+    context = FakeContext()
+    other_popup = FakePopup("https://cdn.example/other.png")
+    other_page = FakeCardPage(context, other_popup)
+    own_popup = FakePopup("https://cdn.example/own.png")
+    # Another worker's popup opens in the same context while this worker's download is pending.
+    page = FakeCardPage(context, own_popup, concurrent=other_page)
+
+    assert asyncio.run(async_engine.download_image_for_card(page, "own", MediaInfo(), False, lambda _reason: None))
+
+    assert saved == ["https://cdn.example/own.png"]
+    assert own_popup.closed
+    assert not other_popup.closed
+    assert page.listeners == []
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+
+from src import config
+from src.checkpoint import RunCheckpoint, resume_checkpoint
+
+
+def _checkpoint(tmp_path) -> RunCheckpoint:
+    return RunCheckpoint(str(tmp_path / "run" / "checkpoint.json"))
+
+
+def test_round_trip_keeps_offsets_only_for_unsettled_cards(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.queue("done", 100)
+    checkpoint.queue("waiting", 200)
+    checkpoint.queue("broken", 300)
+    checkpoint.seen_at(300)
+    checkpoint.finish("done")
+    checkpoint.record_failures(["broken"], [])
+
+    checkpoint.save(in_flight=["transfer"])
+    loaded = _checkpoint(tmp_path).load()
+
+    assert loaded.settled == {"done"}
+    assert loaded.pending == {"waiting", "transfer"}
+    assert set(loaded.failed) == {"broken"}
+    assert loaded.offsets == {"waiting": 200, "broken": 300}
+    assert loaded.scan_offset == 300
+    assert sorted(loaded.retry_items(), key=str) == sorted([("waiting", 200), ("transfer", None), ("broken", 300)], key=str)
+
+
+def test_queueing_a_failed_card_again_clears_the_failure(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.record_failures([], [("a", "not found")])
+
+    checkpoint.queue("a")
+    checkpoint.finish("a")
+
+    assert checkpoint.settled == {"a"}
+    assert checkpoint.failed == {}
+
+
+def test_malformed_entries_leave_an_empty_checkpoint(tmp_path, capsys):
+    path = tmp_path / "checkpoint.json"
+    path.write_text(json.dumps({"version": RunCheckpoint.VERSION, "settled": ["a"], "pending": [["b", "far"]]}), encoding="utf-8")
+
+    checkpoint = RunCheckpoint(str(path)).load()
+
+    assert checkpoint.empty
+    assert checkpoint.offsets == {}
+    assert capsys.readouterr().out
+
+
+def test_unreadable_or_other_version_files_are_ignored(tmp_path):
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps({"version": RunCheckpoint.VERSION + 1, "settled": ["a"]}), encoding="utf-8")
+
+    assert RunCheckpoint(str(broken)).load().empty
+    assert RunCheckpoint(str(other)).load().empty
+    assert RunCheckpoint(str(tmp_path / "missing.json")).load().empty
+
+
+def test_clean_completion_removes_the_file(tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.queue("a")
+    checkpoint.save()
+    checkpoint.finish("a")
+
+    checkpoint.close(completed=True)
+
+    assert not (tmp_path / "run" / "checkpoint.json").exists()
+
+
+def test_failures_are_kept_for_the_next_run(monkeypatch, tmp_path):
+    checkpoint = _checkpoint(tmp_path)
+    checkpoint.queue("a", 50)
+    checkpoint.record_failures(["a"], [])
+    checkpoint.close(completed=True)
+    monkeypatch.setattr(config, "RESUME", True)
+    monkeypatch.setattr(config, "CHECKPOINT_FILE", checkpoint.path)
+
+    resumed = resume_checkpoint()
+
+    assert resumed.complete
+    assert resumed.retry_items() == [("a", 50)]
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src import config, gallery_run
+from src.gallery_run import GalleryRun
+from src.gallery_scanner import CardOffsetIndex
+from src.listing_discovery import ListingDiscovery
+from src.playwright_utils import HarvestedCard
+
+
+class FakeScanner:
+    def __init__(self, cards=()):
+        self.cards = list(cards)
+        self.offsets = CardOffsetIndex()
+
+    def drain(self):
+        cards, self.cards = self.cards, []
+        self.offsets.record(cards)
+        return cards
+
+
+class FakeContext:
+    def new_page(self):
+        return "listing tab"
+
+
+class FakeTransferPool:
+    def __init__(self, failed=(), pending=0):
+        self.failed = list(failed)
+        self.pending = pending
+        self.waited = False
+
+    def take_failed(self):
+        failed, self.failed = self.failed, []
+        return failed
+
+    def in_flight(self):
+        return []
+
+    def wait(self):
+        self.waited = True
+        self.pending = 0
+
+
+def _harvested(identifier: str, top: float) -> HarvestedCard:
+    return HarvestedCard(identifier=identifier, src=f"https://cdn.example/{identifier}", index=0, top=top, left=0)
+
+
+def _listing_page(identifiers, cursor=None) -> dict:
+    payload = {"posts": [{"imageUrl": f"https://cdn.example/{identifier}"} for identifier in identifiers]}
+    if cursor is not None:
+        payload["nextCursor"] = cursor
+    return payload
+
+
+@pytest.fixture(autouse=True)
+def run_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DOWNLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "CHECKPOINT_FILE", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(config, "DOWNLOAD_VIDEOS", True)
+    monkeypatch.setattr(config, "DOWNLOAD_IMAGES", False)
+    monkeypatch.setattr(config, "ENABLE_MEDIA_MANIFEST", False)
+    monkeypatch.setattr(config, "RESUME", False)
+    monkeypatch.setattr(config, "BACKGROUND_TRANSFERS", False)
+    monkeypatch.setattr(config, "UPSCALE_MODE", "inline")
+    monkeypatch.setattr(config, "CARD_NAVIGATION", "click")
+    monkeypatch.setattr(config, "WORKERS", 1)
+    monkeypatch.setattr(gallery_run, "requeue_corrupt_media", lambda: None)
+
+
+def test_admit_settles_downloaded_cards_and_queues_the_rest(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DOWNLOAD_VIDEOS", False)
+    monkeypatch.setattr(config, "DOWNLOAD_IMAGES", True)
+    (tmp_path / "grok-image-saved.png").write_bytes(b"png")
+    scanner = FakeScanner([_harvested("saved.png", 100), _harvested("new.png", 900)])
+    run = GalleryRun(None, None, [], scanner)
+
+    assert run.admit(run.discover())
+
+    assert [identifier for identifier, _ in run.pending_queue] == ["new.png"]
+    assert run.queued_offsets == {"new.png": 900}
+    assert run.checkpoint.settled == {"saved.png"}
+    assert run.checkpoint.pending == {"new.png"}
+    assert run.checkpoint.scan_offset == 900
+    assert not run.admit(run.discover())
+
+
+def test_listing_pages_are_fetched_before_the_queue_runs_dry(monkeypatch, tmp_path):
+    (tmp_path / "replay").mkdir()
+    (tmp_path / "replay" / "page-2.json").write_text(json.dumps(_listing_page(["d.png", "e.png", "f.png"])), encoding="utf-8")
+    monkeypatch.setattr(config, "LISTING_REPLAY_DIR", str(tmp_path / "replay"))
+    discovery = ListingDiscovery(None, "*")
+    discovery._replay_files = [str(tmp_path / "replay" / "page-2.json")]
+    discovery._ingest(_listing_page(["a.png", "b.png", "c.png"], cursor="2"), {"url": "https://api.example/list", "method": "GET", "post_data": None, "headers": {}})
+    processed = []
+    monkeypatch.setattr(gallery_run, "find_gallery_card", lambda page, identifier, offset, listed: f"card-{identifier}")
+    monkeypatch.setattr(gallery_run, "process_one_card", lambda page, card, index, identifier, *_args: processed.append(identifier))
+    monkeypatch.setattr(gallery_run, "prepare_page", lambda page: page)
+    run = GalleryRun(FakeContext(), "gallery", [], FakeScanner(), discovery)
+
+    run.step()
+
+    # The first page filled the queue to a page's worth, so nothing was fetched before the first card.
+    assert processed == ["a.png"]
+    assert [identifier for identifier, _ in run.pending_queue] == ["b.png", "c.png"]
+
+    run.step()
+
+    # Two cards left is less than a page: the next page is queued behind them.
+    assert processed == ["a.png", "b.png"]
+    assert [identifier for identifier, _ in run.pending_queue] == ["c.png", "d.png", "e.png", "f.png"]
+    assert discovery.exhausted
+
+
+def test_failed_background_transfers_are_queued_again(tmp_path):
+    scanner = FakeScanner()
+    scanner.offsets.record([_harvested("a.png", 400)])
+    run = GalleryRun(None, None, [], scanner)
+    run.transfer_pool = FakeTransferPool(failed=["a.png"])
+
+    run.retry_failed_transfers()
+
+    assert [identifier for identifier, _ in run.pending_queue] == ["a.png"]
+    assert run.queued_offsets == {"a.png": 400}
+    assert run.checkpoint.pending == {"a.png"}
+
+
+def test_finish_waits_for_transfers_that_can_still_fail():
+    run = GalleryRun(None, None, [], FakeScanner())
+    run.transfer_pool = FakeTransferPool(pending=1)
+
+    assert not run.finish()
+    assert run.transfer_pool.waited
+    assert run.finish()
+    assert run.completed
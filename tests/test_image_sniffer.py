@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from src.image_downloader import ImageResolutionSniffer, parse_image_resolution
+
+from .media_builders import build_jpeg, build_png, build_webp_vp8x
+
+
+def _sniff(data: bytes, chunk_size: int, limit: int = 512 * 1024):
+    sniffer = ImageResolutionSniffer(limit)
+    for start in range(0, len(data), chunk_size):
+        sniffer.feed(data[start:start + chunk_size])
+    return sniffer.resolution
+
+
+def test_sniffer_reads_png_fed_byte_by_byte():
+    assert _sniff(build_png(640, 480, 4096), chunk_size=1) == (640, 480)
+
+
+def test_sniffer_reads_jpeg_behind_a_large_app_segment():
+    data = build_jpeg(1024, 768, exif_kb=40, size=80 * 1024)
+
+    assert _sniff(data, chunk_size=1000) == (1024, 768)
+
+
+def test_sniffer_reads_webp_extended_header():
+    assert _sniff(build_webp_vp8x(2000, 3000, 8192), chunk_size=7) == (2000, 3000)
+
+
+def test_sniffer_gives_up_past_its_limit():
+    data = build_jpeg(1024, 768, exif_kb=40, size=80 * 1024)
+
+    assert _sniff(data, chunk_size=1000, limit=16 * 1024) is None
+
+
+def test_sniffer_ignores_unknown_data():
+    assert _sniff(bytes(4096), chunk_size=512) is None
+
+
+def test_header_too_short_for_the_dimensions_has_no_resolution():
+    data = build_jpeg(1024, 768, exif_kb=4)
+
+    assert parse_image_resolution(data[:1024]) is None
+    assert parse_image_resolution(data) == (1024, 768)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+
+from src import config
+from src.listing_discovery import ListingDiscovery, extract_cursor, extract_listing_items
+
+
+REQUEST = {"url": "https://api.example/list?limit=3", "method": "GET", "post_data": None, "headers": {}}
+
+
+def test_items_are_found_at_any_depth_in_document_order():
+    payload = {
+        "data": {
+            "posts": [
+                {"id": 1, "media": {"thumbnail": "https://cdn.example/a/one.png?w=200", "video": "https://cdn.example/a/one.mp4"}},
+                {"id": 2, "imageUrl": "https://cdn.example/b/two.jpg"},
+                {"id": 3, "title": "no media", "link": "https://example.com/post/3"},
+            ]
+        }
+    }
+
+    items = extract_listing_items(payload)
+
+    assert [(item.identifier, item.video_url) for item in items] == [("one.png", "https://cdn.example/a/one.mp4"), ("two.jpg", None)]
+    assert items[0].image_url == "https://cdn.example/a/one.png?w=200"
+
+
+def test_non_http_and_non_media_strings_are_not_items():
+    assert extract_listing_items({"preview": "data:image/png;base64,AAAA", "page": "https://example.com/favorites"}) == []
+    assert extract_listing_items(["https://cdn.example/a.png", None, 3]) == []
+
+
+def test_cursor_keys_in_order_of_preference():
+    assert extract_cursor({"cursor": "c", "nextCursor": "n"}) == "n"
+    assert extract_cursor({"next_page_token": 42}) == "42"
+    assert extract_cursor({"nextCursor": ""}) is None
+    assert extract_cursor({"nextCursor": None}) is None
+    assert extract_cursor([{"nextCursor": "n"}]) is None
+
+
+def test_next_page_request_carries_the_cursor():
+    discovery = ListingDiscovery(None, "*")
+
+    discovery._ingest({"posts": [{"imageUrl": "https://cdn.example/a.png"}], "nextCursor": "page 2"}, REQUEST)
+
+    assert discovery._next_request()["url"] == "https://api.example/list?limit=3&cursor=page+2"
+
+
+def test_cursor_goes_into_a_json_request_body():
+    discovery = ListingDiscovery(None, "*")
+    request = dict(REQUEST, method="POST", post_data=json.dumps({"limit": 3, "pageCursor": None}))
+
+    discovery._ingest({"items": [], "nextCursor": "abc"}, request)
+
+    assert json.loads(discovery._next_request()["post_data"]) == {"limit": 3, "pageCursor": "abc"}
+
+
+def test_duplicates_are_drained_once_and_the_last_page_exhausts_the_listing():
+    discovery = ListingDiscovery(None, "*")
+    first = {"posts": [{"imageUrl": "https://cdn.example/a.png"}, {"imageUrl": "https://cdn.example/b.png"}], "nextCursor": "2"}
+
+    assert discovery._ingest(first, REQUEST) == 2
+    assert discovery._ingest({"posts": [{"imageUrl": "https://cdn.example/b.png"}]}, None) == 0
+    assert [item.identifier for item in discovery.drain()] == ["a.png", "b.png"]
+    assert discovery.drain() == []
+    assert discovery.exhausted
+
+
+def test_next_page_is_wanted_below_a_page_or_one_card_per_worker(monkeypatch):
+    monkeypatch.setattr(config, "WORKERS", 4)
+    discovery = ListingDiscovery(None, "*")
+
+    assert discovery.wants_next_page(3)
+    assert not discovery.wants_next_page(4)
+
+    discovery._ingest({"posts": [{"imageUrl": f"https://cdn.example/{index}.png"} for index in range(10)], "nextCursor": "2"}, REQUEST)
+
+    assert discovery.wants_next_page(9)
+    assert not discovery.wants_next_page(10)
+    discovery.exhausted = True
+    assert not discovery.wants_next_page(0)
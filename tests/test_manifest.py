@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import pytest
+
+from src import config, manifest
+from src.manifest import MediaManifest, open_manifest
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    calls = []
+
+    def probe_video_width(path):
+        calls.append(os.path.basename(path))
+        return 1856
+
+    monkeypatch.setattr(manifest, "probe_video_width", probe_video_width)
+    monkeypatch.setattr(config, "UPSCALE_VIDEO_WIDTH", 1800)
+    return calls
+
+
+def _open(tmp_path) -> MediaManifest:
+    return MediaManifest(str(tmp_path / "manifest.sqlite"), str(tmp_path))
+
+
+def test_video_width_is_probed_once_while_the_file_is_unchanged(tmp_path, probes):
+    video = tmp_path / "grok-video-a.mp4"
+    video.write_bytes(b"x" * 100)
+    store = _open(tmp_path)
+
+    assert store.video_width("a", str(video)) == 1856
+    assert store.video_width("a", str(video)) == 1856
+    store.close()
+    reopened = _open(tmp_path)
+
+    assert reopened.video_width("a", str(video)) == 1856
+    assert reopened.entry("a", "video").upscaled
+    assert probes == ["grok-video-a.mp4"]
+    reopened.close()
+
+
+def test_changed_file_is_probed_again(tmp_path, probes):
+    video = tmp_path / "grok-video-a.mp4"
+    video.write_bytes(b"x" * 100)
+    store = _open(tmp_path)
+    store.video_width("a", str(video))
+    video.write_bytes(b"x" * 200)
+    store.refresh_directory()
+
+    store.video_width("a", str(video))
+
+    assert probes == ["grok-video-a.mp4", "grok-video-a.mp4"]
+    assert store.entry("a", "video").size == 200
+    store.close()
+
+
+def test_missing_file_has_no_width(tmp_path, probes):
+    store = _open(tmp_path)
+
+    assert store.video_width("a", str(tmp_path / "grok-video-a.mp4")) is None
+    assert not store.file_exists(str(tmp_path / "grok-video-a.mp4"))
+    assert probes == []
+    store.close()
+
+
+def test_table_from_before_expected_sizes_is_migrated(tmp_path, probes):
+    path = tmp_path / "manifest.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE media (identifier TEXT NOT NULL, kind TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+        "width INTEGER, upscaled INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, PRIMARY KEY (identifier, kind))"
+    )
+    conn.execute("INSERT INTO media VALUES ('a', 'image', 'grok-image-a.png', 10, 1, NULL, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    store = _open(tmp_path)
+
+    assert store.entry("a", "image").expected_size is None
+    assert store.expected_sizes() == {}
+    image = tmp_path / "grok-image-b.png"
+    image.write_bytes(b"png")
+    store.record_image("b", str(image))
+    store.close()
+    reopened = _open(tmp_path)
+    assert reopened.entry("b", "image").size == 3
+    reopened.close()
+
+
+def test_disabled_manifest_is_not_opened(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "ENABLE_MEDIA_MANIFEST", False)
+    monkeypatch.setattr(config, "MEDIA_MANIFEST_FILE", str(tmp_path / "manifest.sqlite"))
+
+    assert open_manifest() is None
+    assert not (tmp_path / "manifest.sqlite").exists()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import struct
+
+from src.mp4_info import mp4_structure_problem, read_mp4_info
+
+from .media_builders import HD_SIZE, build_mp4
+
+
+def _boxes(data: bytes) -> list:
+    boxes = []
+    offset = 0
+    while offset < len(data):
+        size = struct.unpack(">I", data[offset:offset + 4])[0]
+        boxes.append(data[offset:offset + size])
+        offset += size
+    return boxes
+
+
+def _write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _patch_u32(data: bytes, marker: bytes, field_offset: int, value: int) -> bytes:
+    """Overwrite a 32-bit field ``field_offset`` bytes after the type of the first ``marker`` box."""
+    position = data.index(marker) + 4 + field_offset
+    return data[:position] + struct.pack(">I", value) + data[position + 4:]
+
+
+def test_reads_size_and_duration_with_moov_first(tmp_path):
+    path = _write(tmp_path, "video.mp4", build_mp4(*HD_SIZE, size=64 * 1024, duration_s=6))
+
+    info = read_mp4_info(path)
+
+    assert (info.width, info.height) == HD_SIZE
+    assert info.duration == 6
+    assert mp4_structure_problem(path) is None
+
+
+def test_reads_size_with_moov_at_end(tmp_path):
+    ftyp, moov, mdat = _boxes(build_mp4(*HD_SIZE, size=64 * 1024))
+    path = _write(tmp_path, "video.mp4", ftyp + mdat + moov)
+
+    info = read_mp4_info(path)
+
+    assert (info.width, info.height) == HD_SIZE
+    assert mp4_structure_problem(path) is None
+
+
+def test_cut_off_file_is_truncated(tmp_path):
+    data = build_mp4(*HD_SIZE, size=64 * 1024)
+    path = _write(tmp_path, "video.mp4", data[:-1000])
+
+    assert mp4_structure_problem(path) == "truncated"
+
+
+def test_moov_cut_off_at_end_is_reported(tmp_path):
+    ftyp, moov, mdat = _boxes(build_mp4(*HD_SIZE, size=64 * 1024))
+    path = _write(tmp_path, "video.mp4", ftyp + mdat + moov[:len(moov) // 2])
+
+    assert read_mp4_info(path) is None
+    assert mp4_structure_problem(path) == "truncated"
+
+
+def test_stsz_sample_count_disagreeing_with_stts(tmp_path):
+    # stsz payload: version/flags, sample_size, sample_count.
+    data = _patch_u32(build_mp4(*HD_SIZE, size=64 * 1024), b"stsz", 8, 2)
+    path = _write(tmp_path, "video.mp4", data)
+
+    assert mp4_structure_problem(path) == "sample_count_mismatch"
+
+
+def test_stts_entries_past_the_box_are_truncated(tmp_path):
+    # stts payload: version/flags, entry_count, entries.
+    data = _patch_u32(build_mp4(*HD_SIZE, size=64 * 1024), b"stts", 4, 50)
+    path = _write(tmp_path, "video.mp4", data)
+
+    assert mp4_structure_problem(path) == "sample_table_truncated"
+
+
+def test_chunk_offset_past_the_end(tmp_path):
+    data = build_mp4(*HD_SIZE, size=64 * 1024)
+    data = _patch_u32(data, b"stco", 8, len(data) + 10)
+    path = _write(tmp_path, "video.mp4", data)
+
+    assert mp4_structure_problem(path) == "chunk_offset_out_of_range"
+
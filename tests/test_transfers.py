@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.transfers import (
+    IncompleteTransfer,
+    TransferError,
+    download_resumable,
+    part_meta_path,
+    part_path,
+    pop_announced_length,
+)
+
+
+URL = "https://cdn.example/video.mp4"
+BODY = bytes(range(256)) * 40
+ETAG = '"v1"'
+
+
+class StubResponse:
+    def __init__(self, status_code: int, body: bytes = b"", headers: dict | None = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size: int):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class StubServer:
+    """Answers ranged requests for ``body`` the way a CDN does, recording every request's headers."""
+
+    def __init__(self, body: bytes = BODY, etag: str = ETAG, honour_range: bool = True, cut_at: int | None = None):
+        self.body = body
+        self.etag = etag
+        self.honour_range = honour_range
+        self.cut_at = cut_at
+        self.requests = []
+
+    def __call__(self, url: str, headers: dict) -> StubResponse:
+        self.requests.append(dict(headers))
+        start = int(headers.get("range", "bytes=0-")[6:-1])
+        if headers.get("if-range") not in (None, self.etag) or not self.honour_range:
+            start = -1
+        if start >= len(self.body):
+            return StubResponse(416, headers={"content-range": f"bytes */{len(self.body)}"})
+        if start < 0:
+            return StubResponse(200, self._cut(self.body), {"content-length": str(len(self.body)), "etag": self.etag})
+        return StubResponse(
+            206,
+            self._cut(self.body[start:]),
+            {"content-range": f"bytes {start}-{len(self.body) - 1}/{len(self.body)}", "content-length": str(len(self.body) - start), "etag": self.etag},
+        )
+
+    def _cut(self, data: bytes) -> bytes:
+        return data if self.cut_at is None else data[:self.cut_at]
+
+
+def _leave_part(target: str, data: bytes, url: str = URL, expected_length: int = len(BODY), validator: str = ETAG) -> None:
+    with open(part_path(target), "wb") as handle:
+        handle.write(data)
+    with open(part_meta_path(target), "w", encoding="utf-8") as handle:
+        json.dump({"url": url, "expected_length": expected_length, "validator": validator}, handle)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+@pytest.fixture
+def target(tmp_path) -> str:
+    path = str(tmp_path / "video.mp4")
+    yield path
+    pop_announced_length(path)
+
+
+def test_fresh_download(target):
+    server = StubServer()
+
+    assert download_resumable(server, URL, target, {}) == len(BODY)
+
+    assert _read(target) == BODY
+    assert server.requests[0]["range"] == "bytes=0-"
+    assert "if-range" not in server.requests[0]
+    assert pop_announced_length(target) == len(BODY)
+
+
+def test_resumes_from_the_part_file(target):
+    _leave_part(target, BODY[:1000])
+    server = StubServer()
+    resumed = []
+
+    download_resumable(server, URL, target, {}, on_resume=resumed.append)
+
+    assert _read(target) == BODY
+    assert server.requests[0]["range"] == "bytes=1000-"
+    assert server.requests[0]["if-range"] == ETAG
+    assert resumed == [1000]
+
+
+def test_interrupted_body_keeps_the_part_for_the_next_attempt(target):
+    with pytest.raises(IncompleteTransfer):
+        download_resumable(StubServer(cut_at=1500), URL, target, {})
+
+    server = StubServer()
+    download_resumable(server, URL, target, {})
+
+    assert server.requests[0]["range"] == "bytes=1500-"
+    assert _read(target) == BODY
+
+
+def test_416_on_a_complete_part_finishes_without_a_body(target):
+    _leave_part(target, BODY)
+
+    assert download_resumable(StubServer(), URL, target, {}) == len(BODY)
+
+    assert _read(target) == BODY
+    assert pop_announced_length(target) == len(BODY)
+
+
+def test_416_on_a_stale_part_downloads_the_file_again(target):
+    _leave_part(target, BODY[:1000], expected_length=len(BODY))
+    server = StubServer(body=BODY[:500])
+
+    assert download_resumable(server, URL, target, {}) == 500
+
+    assert [request["range"] for request in server.requests] == ["bytes=1000-", "bytes=0-"]
+    assert "if-range" not in server.requests[1]
+    assert _read(target) == BODY[:500]
+
+
+def test_416_again_after_starting_over_is_an_error(target, tmp_path):
+    _leave_part(target, BODY[:1000], expected_length=len(BODY))
+
+    with pytest.raises(TransferError):
+        download_resumable(StubServer(body=b""), URL, target, {})
+
+    assert not (tmp_path / "video.mp4.part").exists()
+
+
+def test_server_ignoring_the_range_overwrites_the_part(target):
+    _leave_part(target, b"x" * 1000)
+    resumed = []
+
+    download_resumable(StubServer(honour_range=False), URL, target, {}, on_resume=resumed.append)
+
+    assert _read(target) == BODY
+    assert resumed == []
+
+
+def test_changed_file_comes_back_whole_through_if_range(target):
+    _leave_part(target, b"x" * 1000, validator='"old"')
+
+    download_resumable(StubServer(), URL, target, {})
+
+    assert _read(target) == BODY
+
+
+def test_changed_length_without_validator_refetches_from_the_start(target):
+    _leave_part(target, b"x" * 1000, expected_length=len(BODY) + 1, validator=None)
+    server = StubServer()
+
+    download_resumable(server, URL, target, {})
+
+    assert [request["range"] for request in server.requests] == ["bytes=1000-", "bytes=0-"]
+    assert _read(target) == BODY
+
+
+def test_part_from_another_url_is_not_continued(target):
+    _leave_part(target, b"x" * 1000, url="https://cdn.example/other.mp4")
+    server = StubServer()
+
+    download_resumable(server, URL, target, {})
+
+    assert server.requests[0]["range"] == "bytes=0-"
+    assert _read(target) == BODY
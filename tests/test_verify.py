@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+
+from src import config
+from src.image_downloader import image_structure_problem
+from src.verify import load_report, requeue_corrupt_media, save_report, verify_downloads
+
+from .media_builders import HD_SIZE, build_jpeg, build_mp4, build_png
+
+
+def _write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_intact_images_have_no_problem(tmp_path):
+    assert image_structure_problem(_write(tmp_path, "a.png", build_png(640, 480, 4096))) is None
+    assert image_structure_problem(_write(tmp_path, "b.jpg", build_jpeg(1024, 768, exif_kb=40, size=80 * 1024))) is None
+
+
+def test_image_problems_are_named(tmp_path):
+    png = build_png(640, 480, 4096)
+
+    assert image_structure_problem(_write(tmp_path, "empty.png", b"")) == "empty"
+    assert image_structure_problem(_write(tmp_path, "cut.png", png[:-100])) == "truncated"
+    assert image_structure_problem(_write(tmp_path, "junk.png", bytes(4096))) == "image_header_invalid"
+    assert image_structure_problem(str(tmp_path / "missing.png")) == "unreadable"
+
+
+def test_verify_reports_broken_and_wrong_sized_files_only(tmp_path):
+    video = build_mp4(*HD_SIZE, size=64 * 1024)
+    _write(tmp_path, "grok-video-ok.mp4", video)
+    _write(tmp_path, "grok-video-cut.mp4", video[:-1000])
+    _write(tmp_path, "grok-image-ok.png", build_png(640, 480, 4096))
+    _write(tmp_path, "grok-image-short.png", build_png(640, 480, 4096))
+    _write(tmp_path, "notes.txt", b"not media")
+
+    checked, corrupt = verify_downloads(str(tmp_path), {"grok-image-short.png": 8192}, workers=2)
+
+    assert checked == 4
+    assert [(item.name, item.reason) for item in corrupt] == [("grok-image-short.png", "size_mismatch"), ("grok-video-cut.mp4", "truncated")]
+
+
+def test_requeue_sets_aside_only_files_unchanged_since_the_check(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DOWNLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "VERIFY_REPORT_FILE", str(tmp_path / "verify.json"))
+    video = build_mp4(*HD_SIZE, size=64 * 1024)[:-1000]
+    _write(tmp_path, "grok-video-a.mp4", video)
+    _write(tmp_path, "grok-video-b.mp4", video)
+    _, corrupt = verify_downloads(str(tmp_path))
+    save_report(config.VERIFY_REPORT_FILE, corrupt)
+    assert load_report(config.VERIFY_REPORT_FILE) == corrupt
+    # Downloaded again after the check: must be left alone.
+    _write(tmp_path, "grok-video-b.mp4", build_mp4(*HD_SIZE, size=64 * 1024))
+
+    assert requeue_corrupt_media() == 1
+
+    assert os.path.exists(tmp_path / "grok-video-a.mp4.corrupt")
+    assert os.path.exists(tmp_path / "grok-video-b.mp4")
+    assert not os.path.exists(config.VERIFY_REPORT_FILE)
@@ -0,0 +1,4 @@
+from src.verify import main
+
+if __name__ == "__main__":
+    main()